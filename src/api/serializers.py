@@ -1,5 +1,20 @@
+from django.utils import timezone
 from rest_framework import serializers
-from crew.models import CrewInstance, Agent, Task
+from crew.models import (
+    CrewInstance, Agent, Task, BatchRun, CrewSchedule, TaskUsage, DailyUsage, ExportArtifact, TaskOutputVersion
+)
+from crew.search import highlight
+
+
+class SearchResultMixin:
+    """Adds ``search_rank`` and ``search_headline`` (HTML) to full-text search results."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_rank'):
+            data['search_rank'] = instance.search_rank
+            data['search_headline'] = highlight(instance.search_headline)
+        return data
 
 
 class CrewInstanceSerializer(serializers.ModelSerializer):
@@ -11,10 +26,24 @@ class CrewInstanceSerializer(serializers.ModelSerializer):
         model = CrewInstance
         fields = [
             'id', 'name', 'description', 'owner', 'is_flow',
-            'parent_crew', 'config', 'is_subcrew', 'agent_count',
-            'subcrew_count', 'created_at', 'updated_at'
+            'parent_crew', 'config', 'is_template', 'template', 'overrides',
+            'is_subcrew', 'agent_count', 'subcrew_count', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['owner', 'created_at', 'updated_at']
+        read_only_fields = ['owner', 'template', 'created_at', 'updated_at']
+
+    def validate_overrides(self, value):
+        from crew.cloning import validate_overrides
+        try:
+            validate_overrides(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_parent_crew(self, value):
+        request = self.context.get('request')
+        if request and value is not None and value.owner != request.user:
+            raise serializers.ValidationError("A sub-crew can only belong to one of your own crews")
+        return value
 
     def get_agent_count(self, obj):
         return obj.agents.count()
@@ -23,7 +52,25 @@ class CrewInstanceSerializer(serializers.ModelSerializer):
         return obj.sub_crews.count()
 
 
-class AgentSerializer(serializers.ModelSerializer):
+class InstantiateTemplateSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255, required=False)
+    overrides = serializers.JSONField(required=False, default=dict)
+    copy = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Copy the template's agents and tasks immediately instead of sharing them"
+    )
+
+    def validate_overrides(self, value):
+        from crew.cloning import validate_overrides
+        try:
+            validate_overrides(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
+class AgentSerializer(SearchResultMixin, serializers.ModelSerializer):
     task_count = serializers.SerializerMethodField()
     effective_role = serializers.CharField(read_only=True)
 
@@ -37,26 +84,134 @@ class AgentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate_crew(self, value):
+        request = self.context.get('request')
+        if request and value.owner != request.user:
+            raise serializers.ValidationError("You can only add agents to your own crews")
+        return value
+
     def get_task_count(self, obj):
         return obj.tasks.count()
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SearchResultMixin, serializers.ModelSerializer):
     dependent_tasks = serializers.PrimaryKeyRelatedField(
         many=True,
         read_only=True
     )
+    dependencies_complete = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = [
             'id', 'crew', 'agent', 'name', 'description',
             'expected_output', 'context', 'depends_on',
-            'dependent_tasks', 'status', 'input_data',
+            'dependent_tasks', 'dependencies_complete', 'status', 'input_data',
             'output_data', 'error_message', 'output_file',
             'started_at', 'completed_at', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'dependent_tasks', 'started_at', 'completed_at',
             'created_at', 'updated_at'
-        ] 
\ No newline at end of file
+        ]
+
+    def validate_crew(self, value):
+        request = self.context.get('request')
+        if request and value.owner != request.user:
+            raise serializers.ValidationError("You can only add tasks to your own crews")
+        return value
+
+    def validate_depends_on(self, value):
+        request = self.context.get('request')
+        if request and any(task.crew.owner_id != request.user.pk for task in value):
+            raise serializers.ValidationError("Tasks can only depend on tasks of your own crews")
+        return value
+
+    def get_dependencies_complete(self, obj):
+        # Annotated by Task.objects.with_readiness() on list endpoints
+        return obj.check_dependencies_complete()
+
+class TaskUsageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskUsage
+        fields = [
+            'id', 'task', 'execution', 'crew', 'agent', 'owner', 'model',
+            'prompt_tokens', 'completion_tokens', 'total_tokens', 'requests',
+            'cost', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class DailyUsageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyUsage
+        fields = [
+            'id', 'date', 'owner', 'crew', 'model', 'prompt_tokens',
+            'completion_tokens', 'total_tokens', 'requests', 'runs', 'cost'
+        ]
+        read_only_fields = fields
+
+
+class CrewScheduleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CrewSchedule
+        fields = [
+            'id', 'crew', 'cron_expression', 'is_active', 'priority',
+            'jitter_seconds', 'allow_overlap', 'next_run_at', 'last_run_at',
+            'last_execution', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['next_run_at', 'last_run_at', 'last_execution', 'created_at', 'updated_at']
+
+    def validate_cron_expression(self, value):
+        from crew.cron import CronExpression
+        try:
+            CronExpression(value).next_after(timezone.localtime())
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_crew(self, value):
+        request = self.context.get('request')
+        if request and value.owner != request.user:
+            raise serializers.ValidationError("You can only schedule your own crews")
+        return value
+
+    def update(self, instance, validated_data):
+        # Recompute the next run from the (possibly changed) expression
+        instance.next_run_at = None
+        return super().update(instance, validated_data)
+
+
+class BatchRunSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+    results = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BatchRun
+        fields = [
+            'id', 'crew', 'execution', 'status', 'concurrency', 'total_items',
+            'completed_items', 'failed_items', 'progress', 'results',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_results(self, obj):
+        return obj.execution.results if obj.execution else {}
+
+
+class ExportArtifactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExportArtifact
+        fields = [
+            'id', 'crew', 'format', 'status', 'content_hash', 'size', 'task_count',
+            'error', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+
+class TaskOutputVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskOutputVersion
+        fields = ['number', 'execution', 'size', 'checksum', 'created_at']
+        read_only_fields = fields
@@ -3,9 +3,14 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
-router.register(r'crews', views.CrewInstanceViewSet)
-router.register(r'agents', views.AgentViewSet)
-router.register(r'tasks', views.TaskViewSet)
+router.register(r'crews', views.CrewInstanceViewSet, basename='crewinstance')
+router.register(r'agents', views.AgentViewSet, basename='agent')
+router.register(r'tasks', views.TaskViewSet, basename='task')
+router.register(r'batches', views.BatchRunViewSet, basename='batchrun')
+router.register(r'exports', views.ExportArtifactViewSet, basename='exportartifact')
+router.register(r'schedules', views.CrewScheduleViewSet, basename='crewschedule')
+router.register(r'usage', views.TaskUsageViewSet, basename='taskusage')
+router.register(r'usage-daily', views.DailyUsageViewSet, basename='dailyusage')
 
 app_name = 'api'
 
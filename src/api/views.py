@@ -1,68 +1,46 @@
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters import rest_framework as filters
-from crew.models import CrewInstance, Agent, Task
-from .serializers import CrewInstanceSerializer, AgentSerializer, TaskSerializer
+from crew.models import (
+    CrewInstance, Agent, Task, BatchRun, CrewSchedule, TaskUsage, DailyUsage, ExportArtifact, TaskOutputVersion
+)
+from crew.filters import CrewInstanceFilter, AgentFilter, TaskFilter
+from crew.transfer import CrewImportError, import_crew, iter_export, iter_gzip
+from crew.cloning import clone_crew, instantiate_template, materialize
+from crew.artifacts import request_export
+from crew.batch import BatchInputError, create_batch
+from crew.streaming import MAX_READ, read_output
+from crew.usage import BudgetExceeded, usage_totals
+from crew.versions import diff_versions, get_version, rollback as rollback_output
+from .serializers import (
+    CrewInstanceSerializer, AgentSerializer, TaskSerializer, InstantiateTemplateSerializer,
+    TaskUsageSerializer, DailyUsageSerializer, CrewScheduleSerializer, BatchRunSerializer,
+    ExportArtifactSerializer, TaskOutputVersionSerializer
+)
 
 
-class CrewInstanceFilter(filters.FilterSet):
-    is_flow = filters.BooleanFilter()
-    is_subcrew = filters.BooleanFilter(method='filter_is_subcrew')
-    has_parent = filters.BooleanFilter(field_name='parent_crew', lookup_expr='isnull', exclude=True)
+class UsageFilter(filters.FilterSet):
+    since = filters.DateFilter(field_name='date', lookup_expr='gte')
+    until = filters.DateFilter(field_name='date', lookup_expr='lte')
 
     class Meta:
-        model = CrewInstance
-        fields = ['is_flow', 'is_subcrew', 'has_parent', 'owner']
-
-    def filter_is_subcrew(self, queryset, name, value):
-        if value:
-            return queryset.filter(parent_crew__isnull=False)
-        return queryset.filter(parent_crew__isnull=True)
-
-
-class AgentFilter(filters.FilterSet):
-    role = filters.CharFilter()
-    has_tools = filters.BooleanFilter(method='filter_has_tools')
-    crew_type = filters.CharFilter(field_name='crew__is_flow')
-
-    class Meta:
-        model = Agent
-        fields = ['role', 'has_tools', 'crew_type', 'crew', 'allow_delegation', 'verbose']
-
-    def filter_has_tools(self, queryset, name, value):
-        if value:
-            return queryset.exclude(tools=[])
-        return queryset.filter(tools=[])
-
-
-class TaskFilter(filters.FilterSet):
-    status = filters.CharFilter()
-    has_dependencies = filters.BooleanFilter(method='filter_has_dependencies')
-    has_output = filters.BooleanFilter(method='filter_has_output')
-
-    class Meta:
-        model = Task
-        fields = ['status', 'has_dependencies', 'has_output', 'crew', 'agent']
-
-    def filter_has_dependencies(self, queryset, name, value):
-        if value:
-            return queryset.filter(depends_on__isnull=False).distinct()
-        return queryset.filter(depends_on__isnull=True)
-
-    def filter_has_output(self, queryset, name, value):
-        if value:
-            return queryset.exclude(output_data={})
-        return queryset.filter(output_data={})
+        model = DailyUsage
+        fields = ['crew', 'model', 'since', 'until']
 
 
 class CrewInstanceViewSet(viewsets.ModelViewSet):
-    queryset = CrewInstance.objects.all()
+    """The current user's crews."""
     serializer_class = CrewInstanceSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = CrewInstanceFilter
 
+    def get_queryset(self):
+        return CrewInstance.objects.filter(owner=self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
@@ -76,7 +54,7 @@ class CrewInstanceViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def tasks(self, request, pk=None):
         crew = self.get_object()
-        tasks = Task.objects.filter(crew=crew)
+        tasks = Task.objects.filter(crew=crew).with_readiness()
         serializer = TaskSerializer(tasks, many=True)
         return Response(serializer.data)
 
@@ -87,27 +65,130 @@ class CrewInstanceViewSet(viewsets.ModelViewSet):
         serializer = CrewInstanceSerializer(subcrews, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def usage(self, request, pk=None):
+        crew = self.get_object()
+        daily = DailyUsage.objects.filter(crew=crew)
+        by_model = daily.values('model').order_by('model')
+        return Response({
+            'totals': usage_totals(daily),
+            'by_model': [
+                {'model': row['model'], **usage_totals(daily.filter(model=row['model']))}
+                for row in by_model.distinct()
+            ],
+        })
+
+    @action(detail=True, methods=['post'])
+    def instantiate(self, request, pk=None):
+        template = self.get_object()
+        if not template.is_template:
+            return Response({'detail': 'Crew is not a template'}, status=status.HTTP_400_BAD_REQUEST)
+        params = InstantiateTemplateSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        crew = instantiate_template(
+            template,
+            request.user,
+            name=params.validated_data.get('name'),
+            overrides=params.validated_data['overrides']
+        )
+        if params.validated_data['copy']:
+            materialize(crew)
+        return Response(CrewInstanceSerializer(crew).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        crew = self.get_object()
+        copy = clone_crew(crew, owner=request.user, name=request.data.get('name') or None)
+        return Response(CrewInstanceSerializer(copy).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        crew = self.get_object()
+        include_outputs = request.query_params.get('include_outputs') in ('1', 'true')
+        filename = f"crew-{crew.pk}.jsonl"
+        lines = iter_export(crew, include_outputs=include_outputs)
+        if request.query_params.get('compress') in ('1', 'true'):
+            response = StreamingHttpResponse(iter_gzip(lines), content_type='application/gzip')
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_crew(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'An export file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            crew, counts = import_crew(upload, request.user, name=request.data.get('name') or None)
+        except CrewImportError as e:
+            return Response({'file': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'crew': CrewInstanceSerializer(crew).data, 'counts': counts},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
+    def batch(self, request, pk=None):
+        crew = self.get_object()
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'A JSON Lines file of input records is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            concurrency = int(request.data.get('concurrency') or 4)
+        except (TypeError, ValueError):
+            return Response({'concurrency': 'Must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
+        # create_batch caps it at CREW_BATCH['max_concurrency']
+        concurrency = max(1, concurrency)
+        try:
+            batch = create_batch(crew, upload, concurrency=concurrency, name=upload.name)
+        except BatchInputError as e:
+            return Response({'file': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (BudgetExceeded, ValueError) as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(BatchRunSerializer(batch).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def artifacts(self, request, pk=None):
+        crew = self.get_object()
+        try:
+            artifact, created = request_export(crew, request.data.get('format') or 'html')
+        except ValueError as e:
+            return Response({'format': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if artifact.status in ('pending', 'running'):
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(ExportArtifactSerializer(artifact).data, status=response_status)
+
 
 class AgentViewSet(viewsets.ModelViewSet):
-    queryset = Agent.objects.all()
+    """Agents of the current user's crews."""
     serializer_class = AgentSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = AgentFilter
 
+    def get_queryset(self):
+        return Agent.objects.filter(crew__owner=self.request.user)
+
     @action(detail=True, methods=['get'])
     def tasks(self, request, pk=None):
         agent = self.get_object()
-        tasks = Task.objects.filter(agent=agent)
+        tasks = Task.objects.filter(agent=agent).with_readiness()
         serializer = TaskSerializer(tasks, many=True)
         return Response(serializer.data)
 
 
 class TaskViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+    """Tasks of the current user's crews."""
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = TaskFilter
 
+    def get_queryset(self):
+        return Task.objects.filter(crew__owner=self.request.user).with_readiness()
+
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
         task = self.get_object()
@@ -119,3 +200,134 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         # Task completion logic will be implemented here
         return Response({'status': 'task completed'})
+
+    @action(detail=True, methods=['get'])
+    def output(self, request, pk=None):
+        task = self.get_object()
+        try:
+            offset = max(0, int(request.query_params.get('offset') or 0))
+            limit = min(MAX_READ, max(1, int(request.query_params.get('limit') or MAX_READ)))
+        except ValueError:
+            return Response({'detail': 'offset and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        data = read_output(task, offset, limit)
+        data['status'] = task.status
+        data['complete'] = task.status in ('completed', 'failed') and not data['content']
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def versions(self, request, pk=None):
+        task = self.get_object()
+        return Response(TaskOutputVersionSerializer(task.output_versions.defer('data'), many=True).data)
+
+    @action(detail=True, methods=['get'], url_path=r'versions/(?P<number>\d+)')
+    def version(self, request, pk=None, number=None):
+        task = self.get_object()
+        try:
+            output = get_version(task, int(number))
+        except TaskOutputVersion.DoesNotExist as e:
+            return Response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'number': int(number), 'output_data': output})
+
+    @action(detail=True, methods=['get'])
+    def diff(self, request, pk=None):
+        task = self.get_object()
+        try:
+            old = int(request.query_params['from'])
+            new = int(request.query_params.get('to') or task.output_versions.values_list('number', flat=True)[0])
+        except (KeyError, ValueError, IndexError):
+            return Response(
+                {'detail': "Pass the versions to compare as ?from=<number>&to=<number>"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            diff = diff_versions(task, old, new)
+        except TaskOutputVersion.DoesNotExist as e:
+            return Response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'from': old, 'to': new, 'diff': diff})
+
+    @action(detail=True, methods=['post'])
+    def rollback(self, request, pk=None):
+        task = self.get_object()
+        try:
+            version = rollback_output(task, int(request.data.get('version')))
+        except (TypeError, ValueError):
+            return Response({'version': 'A version number is required'}, status=status.HTTP_400_BAD_REQUEST)
+        except TaskOutputVersion.DoesNotExist as e:
+            return Response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'task': TaskSerializer(task).data, 'version': TaskOutputVersionSerializer(version).data})
+
+
+class CrewScheduleViewSet(viewsets.ModelViewSet):
+    """Cron-style schedules of the current user's crews."""
+    serializer_class = CrewScheduleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['crew', 'is_active', 'priority']
+
+    def get_queryset(self):
+        return CrewSchedule.objects.filter(crew__owner=self.request.user).select_related('crew')
+
+
+class BatchRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """Batch runs of the current user's crews and their streamed results."""
+    serializer_class = BatchRunSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['crew']
+
+    def get_queryset(self):
+        return BatchRun.objects.filter(crew__owner=self.request.user).select_related('crew', 'execution')
+
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        batch = self.get_object()
+        if not batch.output_file:
+            return Response({'detail': 'The batch has not started yet'}, status=status.HTTP_404_NOT_FOUND)
+        response = StreamingHttpResponse(batch.output_file.open('rb'), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="batch-{batch.pk}-results.jsonl"'
+        return response
+
+
+class ExportArtifactViewSet(viewsets.ReadOnlyModelViewSet):
+    """Document exports of the current user's crews and their files."""
+    serializer_class = ExportArtifactSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['crew', 'format', 'status']
+    content_types = {'html': 'text/html', 'markdown': 'text/markdown', 'pdf': 'application/pdf'}
+
+    def get_queryset(self):
+        return ExportArtifact.objects.filter(crew__owner=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        artifact = self.get_object()
+        if artifact.status != 'completed':
+            return Response({'detail': f'The export is {artifact.status}'}, status=status.HTTP_404_NOT_FOUND)
+        content_type = self.content_types[artifact.format]
+        response = StreamingHttpResponse(artifact.file.open('rb'), content_type=content_type)
+        filename = artifact.file.name.rsplit('/', 1)[-1]
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Content-Length'] = artifact.size
+        return response
+
+
+class TaskUsageViewSet(viewsets.ReadOnlyModelViewSet):
+    """Per-run token usage of the current user's tasks."""
+    serializer_class = TaskUsageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['crew', 'task', 'execution', 'model']
+
+    def get_queryset(self):
+        return TaskUsage.objects.filter(owner=self.request.user)
+
+
+class DailyUsageViewSet(viewsets.ReadOnlyModelViewSet):
+    """Daily token and cost rollup of the current user's crews."""
+    serializer_class = DailyUsageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_class = UsageFilter
+
+    def get_queryset(self):
+        return DailyUsage.objects.filter(owner=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def totals(self, request):
+        return Response(usage_totals(self.filter_queryset(self.get_queryset())))
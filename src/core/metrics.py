@@ -0,0 +1,327 @@
+"""
+Prometheus-style metrics.
+
+A small in-process registry of counters, gauges and histograms rendered in
+the Prometheus text exposition format by ``MetricsView`` (``/metrics``)::
+
+    from core.metrics import REGISTRY
+
+    TASKS = REGISTRY.counter('scriptcrew_tasks_total', 'Tasks run', ['status'])
+    TASKS.labels(status='completed').inc()
+
+Recording is a dict update under a lock. For gunicorn and other
+multi-process servers set ``settings.METRICS_DIR`` (or the
+``METRICS_DIR`` environment variable) to a directory shared by the workers:
+each process then writes a snapshot of its counters and histograms to
+``<pid>.json`` at most every ``METRICS_FLUSH_INTERVAL`` seconds (and at
+exit), and a scrape adds up the snapshots of every process. Values that
+describe current state rather than events, such as queue depth, come from
+collector callbacks run at scrape time instead (see :meth:`Registry.collector`).
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class of the metric types; values are kept per label tuple."""
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return _Child(self, values)
+
+    def snapshot(self):
+        with self.registry.lock:
+            return {json.dumps(key): self._copy(value) for key, value in self.values.items()}
+
+    def _copy(self, value):
+        return value
+
+
+class _Child:
+    def __init__(self, metric, values):
+        self.metric = metric
+        self.values = values
+
+    def inc(self, amount=1):
+        self.metric.inc(self.values, amount)
+
+    def set(self, value):
+        self.metric.set(self.values, value)
+
+    def observe(self, value):
+        self.metric.observe(self.values, value)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, key=(), amount=1):
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def render(self, merged):
+        for key, value in sorted(merged.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+
+class Gauge(Metric):
+    """A value set directly; per-process gauges are added up across processes."""
+    kind = 'gauge'
+
+    def set(self, key=(), value=0):
+        with self.registry.lock:
+            self.values[key] = value
+        self.registry.maybe_flush()
+
+    def inc(self, key=(), amount=1):
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    render = Counter.render
+    merge = Counter.merge
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, key=(), value=0):
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['sum'] += value
+        self.registry.maybe_flush()
+
+    def time(self, *labels, **kwargs):
+        """Context manager observing the duration of the block."""
+        return _Timer(self.labels(*labels, **kwargs) if (labels or kwargs) else _Child(self, ()))
+
+    def _copy(self, value):
+        return {'counts': list(value['counts']), 'sum': value['sum']}
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return {'counts': list(value['counts']), 'sum': value['sum']}
+        total['counts'] = [a + b for a, b in zip(total['counts'], value['counts'])]
+        total['sum'] += value['sum']
+        return total
+
+    def render(self, merged):
+        for key, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(state["sum"])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class Registry:
+    """Holds metrics and renders them, merging the snapshots of other processes."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+        self._atexit = False
+
+    def _register(self, cls, name, *args, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(self, name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def collector(self, func):
+        """
+        Register ``func()`` to run at scrape time. It returns an iterable of
+        ``(name, documentation, {label tuple: value}, labelnames)`` gauges.
+        """
+        self.collectors.append(func)
+        return func
+
+    # Multi-process support
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None) or os.getenv('METRICS_DIR')
+
+    def maybe_flush(self):
+        directory = self.directory
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self.last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            return
+        self.last_flush = now
+        self.flush(directory)
+
+    def flush(self, directory=None):
+        """Write this process's values to ``<directory>/<pid>.json``."""
+        directory = directory or self.directory
+        if not directory:
+            return
+        if not self._atexit:
+            atexit.register(self.flush)
+            self._atexit = True
+        data = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as out:
+                json.dump(data, out)
+            os.replace(tmp, os.path.join(directory, f'{os.getpid()}.json'))
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def _snapshots(self):
+        directory = self.directory
+        own = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        if not directory or not os.path.isdir(directory):
+            return [own]
+        snapshots = [own]
+        own_file = f'{os.getpid()}.json'
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == own_file:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as snapshot:
+                    snapshots.append(json.load(snapshot))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        snapshots = self._snapshots()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            merged = {}
+            for snapshot in snapshots:
+                for key, value in snapshot.get(name, {}).items():
+                    key = tuple(json.loads(key))
+                    merged[key] = metric.merge(merged.get(key), value)
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.render(merged))
+        for collect in self.collectors:
+            try:
+                for name, documentation, values, labelnames in collect():
+                    lines.append(f'# HELP {name} {documentation}')
+                    lines.append(f'# TYPE {name} gauge')
+                    for key, value in sorted(values.items()):
+                        lines.append(f'{name}{_format_labels(labelnames, key)} {_format_value(value)}')
+            except Exception as e:
+                logger.error(f"Metrics collector {collect.__name__} failed: {str(e)}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Clear all recorded values (for tests)."""
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'scriptcrew_http_requests_total', 'HTTP requests by view, method and status', ['view', 'method', 'status']
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    'scriptcrew_http_request_duration_seconds', 'HTTP request latency by view', ['view']
+)
+DB_QUERIES = REGISTRY.histogram(
+    'scriptcrew_db_queries_per_request', 'Database queries per request by view', ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'scriptcrew_cache_requests_total', 'Application cache lookups by cache and result', ['cache', 'result']
+)
+
+
+def record_cache(cache, hit):
+    """Count a lookup in one of the application's caches."""
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
@@ -0,0 +1,185 @@
+"""
+Request middleware: metrics and SQL query budgets.
+
+:class:`QueryBudgetMiddleware` counts the queries and database time of
+every request and logs a report when a view goes over its budget::
+
+    QUERY_BUDGET = {
+        'queries': 50,        # default per-request query budget
+        'time': 0.5,          # default per-request database time, seconds
+        'slow_query': 0.1,    # log single queries slower than this
+        'views': {'crew:task_list': {'queries': 10}},
+        'raise': False,       # raise QueryBudgetExceeded instead of logging
+    }
+
+Class-based views can also declare ``query_budget = 10``. The report lists
+duplicated queries by fingerprint (the SQL with literals replaced by ``?``)
+together with the call stack that first repeated them, which is where an
+N+1 comes from. With ``raise`` set (as :class:`core.testing.QueryBudgetMixin`
+does) a view over budget fails the test that requested it.
+"""
+import logging
+import re
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import DB_QUERIES, HTTP_LATENCY, HTTP_REQUESTS
+
+logger = logging.getLogger('scriptcrew.queries')
+
+DEFAULT_QUERY_BUDGET = {
+    'queries': 50,
+    'time': 0.5,
+    'slow_query': 0.1,
+    'views': {},
+    'raise': False,
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised for a request over its query budget when budgets are enforced."""
+
+
+def view_name(request):
+    """A low-cardinality label for the view that handled ``request``."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route or '<unnamed>'
+
+
+class QueryCounter:
+    """A database execute wrapper that counts the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Record request count, latency and database queries per view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = view_name(request)
+        HTTP_REQUESTS.labels(view=view, method=request.method, status=response.status_code).inc()
+        HTTP_LATENCY.labels(view=view).observe(elapsed)
+        DB_QUERIES.labels(view=view).observe(counter.count)
+        return response
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so queries differing only in literal values compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _stack():
+    """The application frames of the current call stack, innermost last."""
+    base = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(base) and '/core/middleware.py' not in frame.filename
+    ]
+    return [f"{frame.filename[len(base) + 1:]}:{frame.lineno} in {frame.name}" for frame in frames[-8:]]
+
+
+class QueryRecorder:
+    """A database execute wrapper that records query count, time and repeats."""
+
+    def __init__(self, slow_query=None):
+        self.slow_query = slow_query
+        self.count = 0
+        self.time = 0.0
+        self.fingerprints = {}
+        self.stacks = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.time += elapsed
+            key = fingerprint(sql)
+            seen = self.fingerprints.get(key, 0) + 1
+            self.fingerprints[key] = seen
+            # Stacks are only taken once a query repeats, to keep the common path cheap
+            if seen == 2:
+                self.stacks[key] = _stack()
+            if self.slow_query is not None and elapsed >= self.slow_query:
+                self.slow.append((elapsed, sql))
+
+    def duplicates(self):
+        """Return ``(count, fingerprint, stack)`` of repeated queries, most repeated first."""
+        repeated = [(count, key, self.stacks.get(key, [])) for key, count in self.fingerprints.items() if count > 1]
+        return sorted(repeated, key=lambda item: -item[0])
+
+    def report(self, label, budget):
+        lines = [
+            f"{label}: {self.count} queries in {self.time * 1000:.1f}ms "
+            f"(budget {budget['queries']} queries, {budget['time'] * 1000:.0f}ms)"
+        ]
+        for count, key, stack in self.duplicates()[:10]:
+            lines.append(f"  {count}x {key[:300]}")
+            lines.extend(f"      {frame}" for frame in stack)
+        return '\n'.join(lines)
+
+
+def get_query_budget(view_name=None, view_class=None):
+    """Return the effective query budget for a view."""
+    config = {**DEFAULT_QUERY_BUDGET, **getattr(settings, 'QUERY_BUDGET', {})}
+    budget = {'queries': config['queries'], 'time': config['time']}
+    budget.update(config['views'].get(view_name, {}))
+    if getattr(view_class, 'query_budget', None) is not None:
+        budget['queries'] = view_class.query_budget
+    return {**config, **budget}
+
+
+class QueryBudgetMiddleware:
+    """Log, or with ``QUERY_BUDGET['raise']`` fail, requests over their query budget."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = {**DEFAULT_QUERY_BUDGET, **getattr(settings, 'QUERY_BUDGET', {})}
+        recorder = QueryRecorder(slow_query=config['slow_query'])
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view = view_name(request)
+        budget = get_query_budget(view, getattr(getattr(match, 'func', None), 'view_class', None))
+        label = f"{request.method} {request.path} ({view})"
+        for elapsed, sql in recorder.slow:
+            logger.warning(f"Slow query in {label}: {elapsed * 1000:.1f}ms {sql[:1000]}")
+        if recorder.count > budget['queries'] or recorder.time > budget['time']:
+            report = recorder.report(label, budget)
+            if budget['raise']:
+                raise QueryBudgetExceeded(report)
+            logger.warning(report)
+        return response
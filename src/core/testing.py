@@ -0,0 +1,19 @@
+"""Test helpers."""
+from django.conf import settings
+from django.test import override_settings
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that enforces query budgets: a request whose view goes
+    over its budget raises ``QueryBudgetExceeded`` with the report, failing
+    the test. ``query_budget`` overrides parts of ``settings.QUERY_BUDGET``.
+    """
+    query_budget = {}
+
+    def setUp(self):
+        super().setUp()
+        budget = {**getattr(settings, 'QUERY_BUDGET', {}), **self.query_budget, 'raise': True}
+        override = override_settings(QUERY_BUDGET=budget)
+        override.enable()
+        self.addCleanup(override.disable)
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from core.metrics import REGISTRY, Registry
+
+
+class RegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = self.registry.counter('app_requests_total', 'Requests', ['status'])
+        self.latency = self.registry.histogram('app_latency_seconds', 'Latency', buckets=(0.1, 1))
+
+    def test_renders_counters_and_histograms(self):
+        self.requests.labels(status='200').inc()
+        self.requests.labels(status='200').inc(2)
+        self.latency.labels().observe(0.05)
+        self.latency.labels().observe(0.5)
+        self.latency.labels().observe(5)
+        text = self.registry.render()
+        self.assertIn('# TYPE app_requests_total counter', text)
+        self.assertIn('app_requests_total{status="200"} 3', text)
+        self.assertIn('app_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('app_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('app_latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('app_latency_seconds_count 3', text)
+        self.assertIn('app_latency_seconds_sum 5.55', text)
+
+    def test_labels_must_match(self):
+        with self.assertRaises(ValueError):
+            self.requests.labels('200', 'GET')
+
+    def test_merges_snapshots_of_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.requests.labels(status='500').inc()
+            with open(os.path.join(directory, '999999.json'), 'w') as snapshot:
+                json.dump({
+                    'app_requests_total': {'["500"]': 4},
+                    'app_latency_seconds': {'[]': {'counts': [1, 0, 0], 'sum': 0.01}},
+                }, snapshot)
+            self.registry.flush()
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+            text = self.registry.render()
+        self.assertIn('app_requests_total{status="500"} 5', text)
+        self.assertIn('app_latency_seconds_count 1', text)
+
+    def test_collectors_run_at_scrape_time(self):
+        self.registry.collector(lambda: [('app_queue_depth', 'Queue', {('batch',): 3}, ('priority',))])
+        self.assertIn('app_queue_depth{priority="batch"} 3', self.registry.render())
+
+
+class MetricsViewTest(TestCase):
+    def setUp(self):
+        REGISTRY.reset()
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_exposes_request_and_execution_metrics(self):
+        self.client.get(reverse('core:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('scriptcrew_http_requests_total{view="core:index",method="GET",status="200"} 1', text)
+        self.assertIn('scriptcrew_db_queries_per_request_count{view="core:index"} 1', text)
+        self.assertIn('# TYPE scriptcrew_queue_depth gauge', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_restricted_by_address(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_denied_by_default(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_proxied_requests_are_not_trusted_by_address(self):
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_restricted_by_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
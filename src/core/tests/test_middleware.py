@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from core.middleware import QueryBudgetExceeded, QueryRecorder, fingerprint, get_query_budget
+from core.testing import QueryBudgetMixin
+from crew.models import CrewInstance
+
+User = get_user_model()
+
+
+class FingerprintTest(SimpleTestCase):
+    def test_literals_are_replaced(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM crew_task  WHERE id = 12 AND name = 'it''s'"),
+            'SELECT * FROM crew_task WHERE id = ? AND name = ?'
+        )
+
+    def test_in_lists_collapse(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM crew_task WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM crew_task WHERE id IN (%s)')
+        )
+
+    @override_settings(QUERY_BUDGET={'queries': 5, 'views': {'crew:crew_list': {'queries': 2}}})
+    def test_view_budget_overrides_default(self):
+        self.assertEqual(get_query_budget('crew:crew_list')['queries'], 2)
+        self.assertEqual(get_query_budget('crew:agent_list')['queries'], 5)
+        self.assertEqual(get_query_budget('crew:agent_list')['time'], 0.5)
+
+
+class QueryRecorderTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        for index in range(3):
+            CrewInstance.objects.create(name=f'Crew {index}', owner=self.user)
+
+    def test_reports_repeated_queries_with_stack(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for crew in CrewInstance.objects.all():
+                crew.owner.username
+        self.assertEqual(recorder.count, 4)
+        count, key, stack = recorder.duplicates()[0]
+        self.assertEqual(count, 3)
+        self.assertIn('auth_user', key)
+        self.assertTrue(any('test_middleware.py' in frame for frame in stack))
+        report = recorder.report('GET /crews/', {'queries': 2, 'time': 0.5})
+        self.assertIn('4 queries', report)
+        self.assertIn('3x', report)
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    @override_settings(QUERY_BUDGET={'views': {'crew:crew_list': {'queries': 1}}})
+    def test_logs_requests_over_budget(self):
+        with self.assertLogs('scriptcrew.queries', level='WARNING') as logs:
+            response = self.client.get(reverse('crew:crew_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('(crew:crew_list)', logs.output[0])
+
+    @override_settings(QUERY_BUDGET={'slow_query': 0})
+    def test_logs_slow_queries(self):
+        with self.assertLogs('scriptcrew.queries', level='WARNING') as logs:
+            self.client.get(reverse('crew:crew_list'))
+        self.assertIn('Slow query', logs.output[0])
+
+
+class QueryBudgetMixinTest(QueryBudgetMixin, TestCase):
+    query_budget = {'views': {'crew:crew_list': {'queries': 1}}}
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def test_fails_requests_over_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('crew:crew_list'))
+
+    def test_allows_requests_within_budget(self):
+        self.assertEqual(self.client.get(reverse('core:index')).status_code, 200)
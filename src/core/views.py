@@ -1,7 +1,36 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.views import View
 from django.views.generic import TemplateView
 
+from .metrics import CONTENT_TYPE, REGISTRY
+
 # Create your views here.
 
 class IndexView(TemplateView):
     template_name = 'core/index.html'
+
+
+class MetricsView(View):
+    """
+    Expose application metrics in the Prometheus text format.
+
+    Access needs the ``METRICS_TOKEN`` as a bearer token when one is set,
+    and otherwise a direct connection from an address in
+    ``METRICS_ALLOWED_IPS``, which is empty by default. Requests that came
+    through a proxy are refused in that case: their ``REMOTE_ADDR`` is the
+    proxy's, e.g. 127.0.0.1 behind nginx, not the client's.
+    """
+    FORWARDED_HEADERS = ('HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP', 'HTTP_FORWARDED')
+
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        if token:
+            if request.headers.get('Authorization') != f'Bearer {token}':
+                return HttpResponseForbidden()
+        elif any(header in request.META for header in self.FORWARDED_HEADERS):
+            return HttpResponseForbidden()
+        elif request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', []):
+            return HttpResponseForbidden()
+        return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -1,15 +1,48 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
-from .models import CrewInstance, Agent, Task
+from .models import (
+    CrewInstance, Agent, Task, Execution, BatchRun, CrewSchedule, TaskUsage, DailyUsage, ExportArtifact,
+    TaskOutputVersion
+)
+from .search import is_supported, search_agents, search_tasks
+
+# Relations each model's __str__ reads
+LABEL_RELATED = {
+    CrewInstance: ('parent_crew',),
+    Agent: ('crew',),
+    Task: ('agent',),
+}
+
+
+def is_listing(request):
+    """Whether an admin request only lists rows (changelist or autocomplete)."""
+    match = request.resolver_match
+    return match is not None and match.url_name.endswith(('_changelist', 'autocomplete'))
+
+
+class RelatedListFilter(admin.RelatedFieldListFilter):
+    """A related-object filter that loads its choices' labels in one query."""
+
+    def field_choices(self, field, request, model_admin):
+        model = field.related_model
+        queryset = model._default_manager.light().select_related(*LABEL_RELATED.get(model, ()))
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return [(obj.pk, str(obj)) for obj in queryset]
 
 
 @admin.register(CrewInstance)
 class CrewInstanceAdmin(admin.ModelAdmin):
-    list_display = ('name', 'owner', 'is_flow', 'subcrew_count', 'agent_count', 'created_at')
-    list_filter = ('owner', 'is_flow', 'created_at')
+    list_display = ('name', 'owner', 'is_flow', 'is_template', 'subcrew_count', 'agent_count', 'created_at')
+    list_filter = ('owner', 'is_flow', 'is_template', 'created_at')
     search_fields = ('name', 'description', 'owner__username')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'created_at'
+    list_select_related = ('owner', 'parent_crew')
+    autocomplete_fields = ('parent_crew', 'template')
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -18,29 +51,46 @@ class CrewInstanceAdmin(admin.ModelAdmin):
         ('Crew Configuration', {
             'fields': ('is_flow', 'parent_crew', 'config')
         }),
+        ('Template', {
+            'fields': ('is_template', 'template', 'overrides'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_queryset(self, request):
+        # Autocomplete lookups use this queryset too, and the changelist skips
+        # list_select_related once select_related() has been applied here
+        queryset = super().get_queryset(request).select_related('owner', 'parent_crew').annotate(
+            num_sub_crews=Count('sub_crews', distinct=True),
+            num_agents=Count('agents', distinct=True),
+        )
+        return queryset.light() if is_listing(request) else queryset
+
     def subcrew_count(self, obj):
-        return obj.sub_crews.count()
+        return obj.num_sub_crews
     subcrew_count.short_description = 'Number of Sub-crews'
+    subcrew_count.admin_order_field = 'num_sub_crews'
 
     def agent_count(self, obj):
-        return obj.agents.count()
+        return obj.num_agents
     agent_count.short_description = 'Number of Agents'
+    agent_count.admin_order_field = 'num_agents'
 
 
 @admin.register(Agent)
 class AgentAdmin(admin.ModelAdmin):
     list_display = ('name', 'crew_link', 'role', 'custom_role', 'task_count', 'allow_delegation', 'verbose')
-    list_filter = ('crew', 'role', 'allow_delegation', 'verbose', 'created_at')
+    list_filter = (('crew', RelatedListFilter), 'role', 'allow_delegation', 'verbose', 'created_at')
     search_fields = ('name', 'description', 'custom_role', 'crew__name')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'created_at'
     list_select_related = ('crew',)
+    autocomplete_fields = ('crew',)
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -65,19 +115,31 @@ class AgentAdmin(admin.ModelAdmin):
     crew_link.short_description = 'Crew'
     crew_link.admin_order_field = 'crew__name'
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('crew').annotate(num_tasks=Count('tasks'))
+        return queryset.light() if is_listing(request) else queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and is_supported(queryset):
+            return search_agents(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
     def task_count(self, obj):
-        return obj.tasks.count()
+        return obj.num_tasks
     task_count.short_description = 'Number of Tasks'
+    task_count.admin_order_field = 'num_tasks'
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ('name', 'crew_link', 'agent_link', 'status', 'started_at', 'completed_at')
-    list_filter = ('status', 'crew', 'agent', 'created_at')
+    list_filter = ('status', ('crew', RelatedListFilter), ('agent', RelatedListFilter), 'created_at')
     search_fields = ('name', 'description', 'error_message', 'crew__name', 'agent__name')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'created_at'
     list_select_related = ('crew', 'agent')
+    autocomplete_fields = ('crew', 'agent', 'depends_on')
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -110,3 +172,85 @@ class TaskAdmin(admin.ModelAdmin):
         return format_html('<a href="{}">{}</a>', url, obj.agent.name)
     agent_link.short_description = 'Agent'
     agent_link.admin_order_field = 'agent__name'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed full-text search instead of ILIKE scans where available
+        if search_term and is_supported(queryset):
+            return search_tasks(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_queryset(self, request):
+        # __str__ reads the agent, so autocomplete results need it joined
+        queryset = super().get_queryset(request).select_related('crew', 'agent')
+        return queryset.light() if is_listing(request) else queryset
+
+
+@admin.register(TaskOutputVersion)
+class TaskOutputVersionAdmin(admin.ModelAdmin):
+    list_display = ('task', 'number', 'is_delta', 'size', 'execution', 'created_at')
+    list_filter = ('is_delta',)
+    search_fields = ('task__name', 'checksum')
+    date_hierarchy = 'created_at'
+    list_select_related = ('task', 'task__agent')
+    raw_id_fields = ('task', 'execution')
+    readonly_fields = ('number', 'is_delta', 'size', 'checksum', 'created_at')
+    exclude = ('data',)
+
+
+@admin.register(CrewSchedule)
+class CrewScheduleAdmin(admin.ModelAdmin):
+    list_display = ('crew', 'cron_expression', 'priority', 'is_active', 'next_run_at', 'last_run_at')
+    list_filter = ('is_active', 'priority')
+    search_fields = ('crew__name', 'cron_expression')
+    list_select_related = ('crew', 'crew__parent_crew')
+    raw_id_fields = ('crew', 'last_execution')
+    readonly_fields = ('next_run_at', 'last_run_at', 'last_execution', 'created_at', 'updated_at')
+
+
+@admin.register(BatchRun)
+class BatchRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'crew', 'status', 'total_items', 'completed_items', 'failed_items', 'created_at')
+    search_fields = ('crew__name',)
+    date_hierarchy = 'created_at'
+    list_select_related = ('crew', 'crew__parent_crew', 'execution')
+    raw_id_fields = ('crew', 'execution')
+    readonly_fields = ('total_items', 'completed_items', 'failed_items', 'created_at', 'updated_at')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_listing(request):
+            # The execution is joined for the status column only
+            queryset = queryset.defer(*[f'execution__{name}' for name in Execution.HEAVY_FIELDS])
+        return queryset
+
+
+@admin.register(ExportArtifact)
+class ExportArtifactAdmin(admin.ModelAdmin):
+    list_display = ('id', 'crew', 'format', 'status', 'task_count', 'size', 'created_at', 'completed_at')
+    list_filter = ('format', 'status')
+    search_fields = ('crew__name', 'content_hash')
+    date_hierarchy = 'created_at'
+    list_select_related = ('crew', 'crew__parent_crew')
+    raw_id_fields = ('crew',)
+    readonly_fields = ('content_hash', 'size', 'task_count', 'error', 'created_at', 'completed_at')
+
+
+@admin.register(TaskUsage)
+class TaskUsageAdmin(admin.ModelAdmin):
+    list_display = ('task', 'crew', 'owner', 'model', 'prompt_tokens', 'completion_tokens', 'cost', 'created_at')
+    list_filter = ('model', 'created_at')
+    search_fields = ('task__name', 'crew__name', 'owner__username', 'model')
+    date_hierarchy = 'created_at'
+    list_select_related = ('task', 'task__agent', 'crew', 'owner')
+    raw_id_fields = ('task', 'execution', 'crew', 'agent', 'owner')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(DailyUsage)
+class DailyUsageAdmin(admin.ModelAdmin):
+    list_display = ('date', 'owner', 'crew', 'model', 'runs', 'total_tokens', 'cost')
+    list_filter = ('date', 'model')
+    search_fields = ('crew__name', 'owner__username', 'model')
+    date_hierarchy = 'date'
+    list_select_related = ('owner', 'crew')
+    raw_id_fields = ('owner', 'crew')
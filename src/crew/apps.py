@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CrewConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crew'
+
+    def ready(self):
+        # Register execution metrics and their scrape-time collector
+        from . import metrics  # noqa: F401
@@ -0,0 +1,356 @@
+"""
+Export of crew outputs as HTML, Markdown or PDF documents.
+
+An :class:`~crew.models.ExportArtifact` is one rendering of a crew's
+completed task outputs. Sections follow the ``depends_on`` graph (a flow
+contributes its sub-crews in execution order), and each section is the
+task's ``result``, or its whole output as JSON when there is no text result.
+
+Documents are written by generators that yield the output piece by piece:
+outputs are read ``CHUNK_SIZE`` tasks at a time and written straight to the
+artifact's file, so memory use does not grow with the number of tasks. The
+PDF writer buffers a single page and keeps only the byte offset of every
+object for the cross-reference table.
+
+Artifacts are keyed by a content hash of the format and the tasks' ids,
+names and ``updated_at``; requesting an export whose hash matches a pending
+or finished artifact returns that one instead of rendering again. With
+``CREW_EXPORTS['inline']`` set artifacts render in the request, otherwise
+the ``render_exports`` worker picks them up. An artifact still marked
+running ``CREW_EXPORTS['stale_after']`` seconds after its render started
+belongs to a renderer that died, and is rendered again.
+"""
+import hashlib
+import json
+import logging
+import os
+import textwrap
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import escape
+
+from core.metrics import record_cache
+
+from .models import ExportArtifact, Task
+from .utils import resolve_dependencies
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered output changes, so cached artifacts are not reused
+RENDERER_VERSION = 1
+CHUNK_SIZE = 50
+DEFAULT_STALE_AFTER = 600
+
+HTML_STYLE = (
+    'body{font-family:sans-serif;max-width:48em;margin:2em auto;line-height:1.5}'
+    'pre{white-space:pre-wrap}nav li{margin:.2em 0}'
+)
+
+
+def get_crews(crew):
+    """Return ``crew`` followed by its sub-crews, in execution order."""
+    sub_crews = {sub_crew.pk: sub_crew for sub_crew in crew.sub_crews.order_by('pk')}
+    order = [pk for pk in crew.config.get('execution_order', []) if pk in sub_crews]
+    order += [pk for pk in sub_crews if pk not in order]
+    crews = [crew]
+    for pk in order:
+        crews.extend(get_crews(sub_crews[pk]))
+    return crews
+
+
+def get_sections(crew):
+    """
+    Return the completed tasks of a crew tree in document order.
+
+    Only the fields needed to order and title the sections are loaded.
+
+    Returns:
+        list: ``(title, task)`` pairs.
+    """
+    crews = get_crews(crew)
+    sections = []
+    for part in crews:
+        tasks = Task.objects.filter(crew=part, status='completed').only('name', 'crew', 'updated_at')
+        for task in resolve_dependencies(tasks.order_by('pk')):
+            title = f"{part.name}: {task.name}" if len(crews) > 1 else task.name
+            sections.append((title, task))
+    return sections
+
+
+def content_hash(crew, format, sections=None):
+    """Hash the inputs of an export of ``crew``; equal hashes render the same document."""
+    digest = hashlib.sha256(f"{RENDERER_VERSION}:{format}:{crew.name}\n".encode('utf-8'))
+    for title, task in sections if sections is not None else get_sections(crew):
+        digest.update(f"{task.pk}:{task.updated_at.isoformat()}:{title}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def output_text(output_data):
+    """The text of a task output: its ``result``, or the output as JSON."""
+    result = output_data.get('result') if isinstance(output_data, dict) else None
+    if isinstance(result, str):
+        return result
+    return json.dumps(result if result is not None else output_data, indent=2, default=str)
+
+
+def iter_outputs(sections, chunk_size=CHUNK_SIZE):
+    """Yield ``(title, text)`` of each section, reading outputs ``chunk_size`` tasks at a time."""
+    for start in range(0, len(sections), chunk_size):
+        chunk = sections[start:start + chunk_size]
+        outputs = dict(Task.objects.filter(pk__in=[task.pk for _, task in chunk]).values_list('pk', 'output_data'))
+        for title, task in chunk:
+            yield title, output_text(outputs.get(task.pk))
+
+
+def iter_markdown(title, sections):
+    """Yield a Markdown document, as bytes, of the sections' outputs."""
+    yield f"# {title}\n".encode('utf-8')
+    for section_title, text in iter_outputs(sections):
+        yield f"\n## {section_title}\n\n{text.strip()}\n".encode('utf-8')
+
+
+def iter_html(title, sections):
+    """Yield an HTML document, as bytes, of the sections' outputs with a table of contents."""
+    yield (
+        f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{escape(title)}</title>'
+        f'<style>{HTML_STYLE}</style></head>\n<body>\n<h1>{escape(title)}</h1>\n<nav><ol>\n'
+    ).encode('utf-8')
+    for section_title, task in sections:
+        yield f'<li><a href="#task-{task.pk}">{escape(section_title)}</a></li>\n'.encode('utf-8')
+    yield b'</ol></nav>\n'
+    for (section_title, task), (_, text) in zip(sections, iter_outputs(sections)):
+        paragraphs = ''.join(
+            f'<p>{escape(paragraph)}</p>\n' for paragraph in text.strip().split('\n\n') if paragraph.strip()
+        )
+        yield (
+            f'<section id="task-{task.pk}">\n<h2>{escape(section_title)}</h2>\n{paragraphs}</section>\n'
+        ).encode('utf-8')
+    yield b'</body></html>\n'
+
+
+class PDFWriter:
+    """
+    A minimal streaming PDF writer for plain text.
+
+    Text is set in Helvetica with WinAnsi encoding (characters outside it
+    are replaced) and wrapped to the page width. Pages are written as soon
+    as they are full; the page tree and catalog, which reference every page,
+    are written last. Objects 1 and 2 are reserved for them, 3 and 4 are
+    the fonts.
+    """
+    PAGE_WIDTH = 612
+    PAGE_HEIGHT = 792
+    MARGIN = 54
+    STYLES = {'title': ('F2', 18), 'heading': ('F2', 13), 'body': ('F1', 10)}
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.next_id = 5
+        self.page_ids = []
+        self.lines = []
+        self.y = self.PAGE_HEIGHT - self.MARGIN
+
+    def _chunk(self, data):
+        self.position += len(data)
+        return data
+
+    def _object(self, body, object_id=None):
+        if object_id is None:
+            object_id = self.next_id
+            self.next_id += 1
+        self.offsets[object_id] = self.position
+        return object_id, self._chunk(f"{object_id} 0 obj\n".encode('latin-1') + body + b"\nendobj\n")
+
+    def start(self):
+        yield self._chunk(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for font_id, font in ((3, 'Helvetica'), (4, 'Helvetica-Bold')):
+            body = f"<< /Type /Font /Subtype /Type1 /BaseFont /{font} /Encoding /WinAnsiEncoding >>"
+            yield self._object(body.encode('latin-1'), font_id)[1]
+
+    def _escape(self, text):
+        data = text.encode('cp1252', 'replace')
+        return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+    def write(self, text, style='body'):
+        """Add wrapped text and yield the pages it fills."""
+        font, size = self.STYLES[style]
+        leading = size * 1.4
+        # Helvetica averages about half an em per character
+        width = int((self.PAGE_WIDTH - 2 * self.MARGIN) / (size * 0.5))
+        if style != 'body':
+            self.y -= leading / 2
+        for paragraph in text.replace('\r\n', '\n').split('\n'):
+            for line in textwrap.wrap(paragraph.expandtabs(4), width) or ['']:
+                if self.y - leading < self.MARGIN:
+                    yield from self.flush()
+                self.y -= leading
+                self.lines.append((font, size, self.y, line))
+
+    def flush(self):
+        """Yield the current page, if it has any text."""
+        if not self.lines:
+            return
+        content = b''.join(
+            b"BT /%s %d Tf %d %.1f Td (%s) Tj ET\n" % (font.encode(), size, self.MARGIN, y, self._escape(line))
+            for font, size, y, line in self.lines
+        )
+        stream = zlib.compress(content)
+        content_id, data = self._object(
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        yield data
+        page_id, data = self._object(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.PAGE_WIDTH} {self.PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>".encode('latin-1')
+        )
+        self.page_ids.append(page_id)
+        yield data
+        self.lines = []
+        self.y = self.PAGE_HEIGHT - self.MARGIN
+
+    def finish(self):
+        """Yield the last page, the page tree, the catalog and the trailer."""
+        yield from self.flush()
+        if not self.page_ids:
+            self.lines.append(('F1', 10, self.y - 14, ''))
+            yield from self.flush()
+        kids = ' '.join(f"{page_id} 0 R" for page_id in self.page_ids)
+        pages = f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>"
+        yield self._object(pages.encode('latin-1'), 2)[1]
+        yield self._object(b"<< /Type /Catalog /Pages 2 0 R >>", 1)[1]
+        xref = self.position
+        size = max(self.offsets) + 1
+        entries = ''.join(f"{self.offsets[object_id]:010d} 00000 n \n" for object_id in range(1, size))
+        yield self._chunk(
+            f"xref\n0 {size}\n0000000000 65535 f \n{entries}"
+            f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+        )
+
+
+def iter_pdf(title, sections):
+    """Yield a PDF document, as bytes, of the sections' outputs."""
+    writer = PDFWriter()
+    yield from writer.start()
+    yield from writer.write(title, 'title')
+    for section_title, text in iter_outputs(sections):
+        yield from writer.write(section_title, 'heading')
+        yield from writer.write(text.strip())
+    yield from writer.finish()
+
+
+WRITERS = {
+    'html': (iter_html, 'html'),
+    'markdown': (iter_markdown, 'md'),
+    'pdf': (iter_pdf, 'pdf'),
+}
+
+
+def get_settings():
+    return {'inline': True, 'stale_after': DEFAULT_STALE_AFTER, **getattr(settings, 'CREW_EXPORTS', {})}
+
+
+def renderable():
+    """Match artifacts waiting to be rendered: pending ones, and running ones whose renderer died."""
+    cutoff = timezone.now() - timedelta(seconds=get_settings()['stale_after'])
+    return Q(status='pending') | Q(status='running', started_at__lt=cutoff) | Q(
+        status='running', started_at__isnull=True, created_at__lt=cutoff
+    )
+
+
+def request_export(crew, format):
+    """
+    Return the artifact of an export of ``crew``, queuing one if none is cached.
+
+    Args:
+        crew: The crew whose outputs to export.
+        format: One of ``ExportArtifact.FORMAT_CHOICES``.
+
+    Returns:
+        tuple: ``(artifact, created)``.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"Unknown export format: {format}")
+    sections = get_sections(crew)
+    key = content_hash(crew, format, sections)
+    artifact = ExportArtifact.objects.filter(
+        crew=crew, format=format, content_hash=key, status__in=['pending', 'running', 'completed']
+    ).first()
+    record_cache('export_artifact', hit=artifact is not None)
+    inline = get_settings()['inline']
+    if artifact is not None:
+        # Claiming fails unless the renderer of a running artifact died
+        if artifact.status == 'running' and inline and render_artifact(artifact):
+            artifact.refresh_from_db()
+        return artifact, False
+
+    artifact = ExportArtifact.objects.create(crew=crew, format=format, content_hash=key, task_count=len(sections))
+    if inline:
+        render_artifact(artifact)
+    return artifact, True
+
+
+def render_artifact(artifact):
+    """
+    Render a pending artifact, or a stale running one, to its file.
+
+    The artifact is claimed first, so concurrent workers never render the
+    same one twice. Its content hash is recomputed from the sections that
+    are rendered, since outputs may have changed since it was requested.
+
+    Returns:
+        bool: Whether this call rendered the artifact.
+    """
+    now = timezone.now()
+    claimed = ExportArtifact.objects.filter(renderable(), pk=artifact.pk).update(status='running', started_at=now)
+    if not claimed:
+        return False
+    artifact.status = 'running'
+    artifact.started_at = now
+
+    crew = artifact.crew
+    writer, extension = WRITERS[artifact.format]
+    try:
+        sections = get_sections(crew)
+        artifact.content_hash = content_hash(crew, artifact.format, sections)
+        name = f"exports/crew-{crew.pk}-{artifact.content_hash[:12]}.{extension}"
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as out:
+            for data in writer(crew.name, sections):
+                out.write(data)
+    except Exception as e:
+        logger.error(f"Export {artifact.pk} of crew {crew.name} failed: {str(e)}")
+        artifact.status = 'failed'
+        artifact.error = str(e)
+        artifact.completed_at = timezone.now()
+        artifact.save(update_fields=['status', 'error', 'completed_at'])
+        return True
+
+    artifact.file.name = name
+    artifact.status = 'completed'
+    artifact.size = os.path.getsize(path)
+    artifact.task_count = len(sections)
+    artifact.completed_at = timezone.now()
+    artifact.save(update_fields=['file', 'content_hash', 'status', 'size', 'task_count', 'completed_at'])
+    logger.info(f"Rendered export {artifact.pk} of crew {crew.name}: {artifact.size} bytes")
+    return True
+
+
+def render_pending(limit=None):
+    """Render pending (and abandoned) artifacts, oldest first, and return those this call rendered."""
+    pending = ExportArtifact.objects.filter(renderable()).select_related('crew').order_by('created_at')
+    rendered = []
+    for artifact in pending[:limit] if limit else pending:
+        if render_artifact(artifact):
+            artifact.refresh_from_db()
+            rendered.append(artifact)
+    return rendered
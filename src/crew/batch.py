@@ -0,0 +1,336 @@
+"""
+Batch runs: one crew over many input records.
+
+A :class:`~crew.models.BatchRun` holds a JSON Lines file of input records
+and is executed as a single queued Execution, so the scheduler's quotas
+and fair sharing apply to the batch as a whole. :class:`BatchRunner` then
+
+* builds each CrewAI agent once per worker thread and reuses it for the
+  items that thread runs (CrewAI mutates agents while they run),
+* runs tasks whose prompts do not use any ``{placeholder}`` (and whose
+  dependencies do not either) once, and reuses their output for every item,
+* runs the remaining tasks per item, ``concurrency`` items at a time, with
+  the record (over the task's ``input_data``) as kickoff inputs and the
+  outputs of upstream tasks as context,
+* appends one JSON line per finished item to ``output_file``, which can be
+  streamed while the batch is still running.
+
+Task rows are only read: per-item state lives in memory and in the
+results file, so items never overwrite each other's output.
+"""
+import contextvars
+import json
+import logging
+import os
+import string
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import F
+
+from core.metrics import record_cache
+
+from .context import fit_outputs, get_settings, render
+from .models import BatchRun, Task
+from .profiling import span
+from .usage import check_budget, extract_usage, record_abandoned_usage, record_usage
+from .utils import resolve_dependencies
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class BatchInputError(ValueError):
+    """Raised when a batch input file is not valid JSON Lines of objects."""
+
+
+def max_concurrency():
+    """Most items a batch may run at once, from ``CREW_BATCH['max_concurrency']``."""
+    return getattr(settings, 'CREW_BATCH', {}).get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
+
+
+def iter_records(stream):
+    """
+    Yield the input records of a JSON Lines stream, skipping blank lines.
+
+    Raises:
+        BatchInputError: If a line is not a JSON object.
+    """
+    for number, line in enumerate(stream, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise BatchInputError(f"Line {number} is not valid JSON: {str(e)}")
+        if not isinstance(record, dict):
+            raise BatchInputError(f"Line {number} is not a JSON object")
+        yield record
+
+
+def count_records(stream):
+    """Validate a JSON Lines stream and return its number of records."""
+    return sum(1 for _ in iter_records(stream))
+
+
+def placeholders(task):
+    """Return the names of ``{placeholders}`` in the task's prompts."""
+    names = set()
+    for text in (task.description, task.expected_output):
+        try:
+            names.update(field for _, field, _, _ in string.Formatter().parse(text or '') if field)
+        except ValueError:
+            # Unbalanced braces are literal text to CrewAI as well.
+            continue
+    return names
+
+
+def with_context(description, upstream):
+    """Append the outputs of upstream tasks, fitted to the context budget, to a task description."""
+    if not upstream:
+        return description
+    config = get_settings()
+    outputs = [(name, str(output)) for name, output in upstream]
+    return render(description, [], fit_outputs(outputs, config['max_tokens'], config['strategy']))
+
+
+class BatchRunner:
+    """Execute a BatchRun within its Execution."""
+
+    def __init__(self, batch, execution=None):
+        self.batch = batch
+        self.execution = execution or batch.execution
+        self.crew = batch.crew
+        self.local = threading.local()
+        self.output_lock = threading.Lock()
+
+    def get_agent(self, agent):
+        """Build the CrewAI agent for ``agent`` once per thread and reuse it for the thread's items."""
+        agents = getattr(self.local, 'agents', None)
+        if agents is None:
+            agents = self.local.agents = {}
+        if agent.pk not in agents:
+            crewai_agent = agent.create_crewai_agent()
+            if not crewai_agent:
+                raise ValueError(f"Failed to create CrewAI agent for {agent.name}")
+            agents[agent.pk] = crewai_agent
+        return agents[agent.pk]
+
+    def run_task(self, task, inputs, upstream):
+        """
+        Run one task for one item and return its output.
+
+        Args:
+            task: The Task to run.
+            inputs: Values for the task's ``{placeholders}``.
+            upstream: ``(task name, output)`` pairs of its dependencies.
+        """
+        from crewai import Crew, Task as CrewAITask
+        from .llm import kickoff
+
+        with span('agent.build', agent=task.agent.name):
+            agent = self.get_agent(task.agent)
+        description = with_context(task.description, upstream)
+
+        def build(agent):
+            return Crew(
+                agents=[agent],
+                tasks=[CrewAITask(
+                    description=description,
+                    expected_output=task.expected_output,
+                    agent=agent,
+                    async_execution=False
+                )],
+                verbose=False
+            )
+
+        def build_hedge(llm_config):
+            hedge_agent = task.agent.create_crewai_agent(llm_config)
+            if not hedge_agent:
+                raise ValueError(f"Failed to create CrewAI agent for {task.agent.name}")
+            return build(hedge_agent)
+
+        def record_abandoned(result, abandoned_crew, llm_config):
+            return record_abandoned_usage(
+                task, result, abandoned_crew, llm_config, prompt=description, execution=self.execution
+            )
+
+        crew = build(agent)
+        results = kickoff(
+            crew,
+            task.agent.llm_config,
+            prompt=description,
+            inputs=inputs,
+            build_hedge=build_hedge,
+            on_abandoned=record_abandoned,
+        )
+        record_usage(task, extract_usage(results, crew), execution=self.execution)
+        if not results or len(results) == 0:
+            raise ValueError("No results returned from CrewAI execution")
+        return results[0]
+
+    def plan(self):
+        """
+        Return the tasks in dependency order, their dependencies by id, and
+        the ids of the tasks that do not depend on the input record.
+        """
+        order = resolve_dependencies(list(self.crew.tasks.select_related('agent', 'crew').order_by('created_at', 'pk')))
+        dependencies = {task.pk: set() for task in order}
+        edges = Task.depends_on.through.objects.filter(from_task__in=order).values_list('from_task_id', 'to_task_id')
+        for task_id, dependency_id in edges:
+            dependencies[task_id].add(dependency_id)
+        shared = set()
+        for task in order:
+            if not placeholders(task) and dependencies[task.pk] <= shared:
+                shared.add(task.pk)
+        return order, dependencies, shared
+
+    def run_item(self, index, record, order, dependencies, shared_outputs):
+        names = {task.pk: task.name for task in order}
+        outputs = dict(shared_outputs)
+        item = {'index': index, 'input': record, 'status': 'completed', 'outputs': {}}
+        try:
+            check_budget(self.crew)
+            for task in order:
+                if task.pk in outputs:
+                    record_cache('batch_shared_output', hit=True)
+                    continue
+                upstream = [(names[dep], outputs[dep]) for dep in sorted(dependencies[task.pk])]
+                inputs = {**(task.input_data or {}), **record}
+                with span('task', task=task.name, task_id=task.pk):
+                    outputs[task.pk] = self.run_task(task, inputs, upstream)
+        except Exception as e:
+            logger.error(f"Batch {self.batch.pk} item {index} failed: {str(e)}")
+            item['status'] = 'failed'
+            item['error'] = str(e)
+        item['outputs'] = {names[pk]: str(output) for pk, output in outputs.items() if pk not in shared_outputs}
+        return item
+
+    def _write(self, out, item):
+        with self.output_lock:
+            out.write(json.dumps(item, default=str) + '\n')
+            out.flush()
+        counter = 'completed_items' if item['status'] == 'completed' else 'failed_items'
+        BatchRun.objects.filter(pk=self.batch.pk).update(**{counter: F(counter) + 1})
+
+    def _output_path(self):
+        name = f"batches/results/batch-{self.batch.pk}.jsonl"
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.batch.output_file.name = name
+        self.batch.completed_items = self.batch.failed_items = 0
+        self.batch.save(update_fields=['output_file', 'completed_items', 'failed_items', 'updated_at'])
+        return path
+
+    def run(self):
+        """
+        Run every item of the batch.
+
+        Returns:
+            dict: ``success``, item counts and, by task name, the outputs
+            that were shared across items (they are not repeated per item).
+
+        Raises:
+            ValueError: If the crew is a flow or has no tasks.
+            BudgetExceeded: If the crew has used up its daily budget.
+        """
+        crew = self.crew
+        if crew.is_flow:
+            raise ValueError("Batch runs need a crew, not a flow")
+        if not crew.is_materialized:
+            from .cloning import materialize
+            materialize(crew)
+
+        order, dependencies, shared = self.plan()
+        if not order:
+            raise ValueError(f"Crew {crew.name} has no tasks to execute.")
+
+        # Input-independent tasks run once; a failure there fails every item.
+        names = {task.pk: task.name for task in order}
+        shared_outputs = {}
+        for task in order:
+            if task.pk in shared:
+                upstream = [(names[dep], shared_outputs[dep]) for dep in sorted(dependencies[task.pk])]
+                record_cache('batch_shared_output', hit=False)
+                with span('task', task=task.name, task_id=task.pk, shared=True):
+                    shared_outputs[task.pk] = self.run_task(task, task.input_data or {}, upstream)
+        if shared:
+            logger.info(f"Batch {self.batch.pk}: sharing output of {len(shared)} task(s) across items")
+
+        concurrency = min(max(1, self.batch.concurrency), max_concurrency())
+        with self.batch.input_file.open('rb') as stream, open(self._output_path(), 'w', encoding='utf-8') as out:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                pending = set()
+
+                def run(index, record):
+                    try:
+                        with span('batch.item', index=index):
+                            return self.run_item(index, record, order, dependencies, shared_outputs)
+                    finally:
+                        close_old_connections()
+
+                for index, record in enumerate(iter_records(stream)):
+                    # Keep only a bounded number of items in flight so large
+                    # inputs are never read into memory at once.
+                    if len(pending) >= concurrency * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._write(out, future.result())
+                    # Each item runs in a copy of this context so its spans
+                    # land in the execution's profile.
+                    pending.add(pool.submit(contextvars.copy_context().run, run, index, record))
+                for future in wait(pending).done:
+                    self._write(out, future.result())
+
+        self.batch.refresh_from_db()
+        return {
+            'success': self.batch.failed_items == 0,
+            'items': self.batch.completed_items + self.batch.failed_items,
+            'completed_items': self.batch.completed_items,
+            'failed_items': self.batch.failed_items,
+            'shared_outputs': {names[pk]: str(output) for pk, output in shared_outputs.items()},
+        }
+
+
+def create_batch(crew, stream, concurrency=4, name='inputs.jsonl', scheduler=None):
+    """
+    Store the input records of a batch run and queue it.
+
+    Args:
+        crew: The crew to run for every record.
+        stream: A binary JSON Lines stream, or a Django ``File``.
+        concurrency: Number of items run at once, at most ``CREW_BATCH['max_concurrency']``.
+
+    Returns:
+        BatchRun: The queued batch.
+
+    Raises:
+        BatchInputError: If the input is not JSON Lines of objects.
+        BudgetExceeded: If the crew or its owner has no budget left today.
+        ValueError: If the crew is a flow.
+    """
+    from django.core.files import File
+    from django.db import transaction
+    from .scheduler import ExecutionScheduler
+
+    if crew.is_flow:
+        raise ValueError("Batch runs need a crew, not a flow")
+    concurrency = min(max(1, concurrency), max_concurrency())
+    total = count_records(stream)
+    if not total:
+        raise BatchInputError("The input contains no records")
+    stream.seek(0)
+
+    with transaction.atomic():
+        execution = (scheduler or ExecutionScheduler()).submit(crew, priority='batch')
+        batch = BatchRun(crew=crew, execution=execution, concurrency=concurrency, total_items=total)
+        batch.input_file.save(name, stream if isinstance(stream, File) else File(stream), save=False)
+        batch.save()
+    return batch
@@ -0,0 +1,277 @@
+"""
+Crew templates and cloning.
+
+A crew marked ``is_template`` can be instantiated cheaply: the new crew
+only stores a reference to the template plus the fields it overrides, and
+reads its agents and tasks through the template. The rows are copied the
+first time the crew needs its own (see :func:`materialize`), using
+``INSERT ... SELECT`` so large ``backstory``/``llm_config``/``description``
+values never travel through Python. Rows are copied one statement each, so
+every new id is known to belong to the row it was copied from.
+
+Overrides are keyed by the id of the template row::
+
+    {
+        "agents": {"12": {"backstory": "...", "llm_config": {"model": "gpt-4o"}}},
+        "tasks": {"40": {"expected_output": "..."}}
+    }
+"""
+import copy
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import CrewInstance, Agent, Task
+
+AGENT_OVERRIDE_FIELDS = {
+    'name', 'role', 'custom_role', 'description', 'goals', 'backstory',
+    'tools', 'allow_delegation', 'verbose', 'llm_config',
+}
+TASK_OVERRIDE_FIELDS = {'name', 'description', 'expected_output', 'context', 'input_data', 'output_file'}
+
+# Run state that is reset rather than copied when tasks are cloned.
+TASK_RESET_VALUES = {
+    'status': 'pending',
+    'output_data': '{}',
+    'error_message': '',
+    'started_at': None,
+    'completed_at': None,
+}
+
+MAP_TABLE = 'crew_clone_id_map'
+
+
+def validate_overrides(overrides):
+    """
+    Check an overrides dict for unknown sections or fields.
+
+    Raises:
+        ValueError: If the overrides are not in the expected shape.
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError("Overrides must be a dictionary")
+    allowed = {'agents': AGENT_OVERRIDE_FIELDS, 'tasks': TASK_OVERRIDE_FIELDS}
+    for section, rows in overrides.items():
+        if section not in allowed:
+            raise ValueError(f"Unknown override section '{section}'")
+        if not isinstance(rows, dict):
+            raise ValueError(f"Overrides for '{section}' must map ids to field values")
+        for row_id, fields in rows.items():
+            if not str(row_id).isdigit():
+                raise ValueError(f"Overrides for '{section}' must be keyed by row id, not '{row_id}'")
+            if not isinstance(fields, dict):
+                raise ValueError(f"Overrides for {section[:-1]} {row_id} must map field names to values")
+            unknown = set(fields) - allowed[section]
+            if unknown:
+                raise ValueError(
+                    f"Cannot override {', '.join(sorted(unknown))} on {section[:-1]} {row_id}"
+                )
+
+
+def apply_overrides(objects, overrides):
+    """
+    Return copies of ``objects`` with ``overrides`` applied.
+
+    The copies keep the template primary keys so they can be matched back
+    to template rows; they are read-only views and must not be saved.
+    """
+    if not overrides:
+        return list(objects)
+    result = []
+    for obj in objects:
+        fields = overrides.get(str(obj.pk))
+        if fields:
+            obj = copy.copy(obj)
+            for name, value in fields.items():
+                setattr(obj, name, value)
+        result.append(obj)
+    return result
+
+
+def instantiate_template(template, owner, name=None, overrides=None, parent_crew=None):
+    """
+    Create a crew that reads its agents and tasks from ``template``.
+
+    Only crew rows are written: one for the template and one for each of its
+    sub-crews, which are instantiated recursively from their own templates.
+
+    Args:
+        template: A CrewInstance with ``is_template`` set.
+        owner: Owner of the new crew.
+        name: Name of the new crew; defaults to the template name.
+        overrides: Per-agent/per-task field overrides (see module docstring).
+        parent_crew: Parent of the new crew when instantiating a sub-crew.
+
+    Returns:
+        CrewInstance: The new, unmaterialized crew.
+    """
+    if not template.is_template and parent_crew is None:
+        raise ValueError(f"Crew '{template.name}' is not a template")
+    overrides = overrides or {}
+    validate_overrides(overrides)
+
+    with transaction.atomic():
+        instance = CrewInstance.objects.create(
+            owner=owner,
+            name=name or template.name,
+            description=template.description,
+            is_flow=template.is_flow,
+            config=template.config,
+            template=template,
+            overrides=overrides,
+            materialized=False,
+            parent_crew=parent_crew,
+        )
+        for sub_template in template.sub_crews.all():
+            instantiate_template(sub_template, owner, parent_crew=instance)
+    return instance
+
+
+def _columns(model):
+    return [f.column for f in model._meta.concrete_fields if not f.primary_key]
+
+
+def _copy_rows(cursor, model, kind, source_crew_id, target_crew_id, replacements, join=''):
+    """
+    Copy the rows of ``model`` belonging to ``source_crew_id``, each with an
+    ``INSERT ... SELECT``, and record the old-to-new id pairs in the map table.
+
+    ``replacements`` maps column names to ``(sql, params)`` used instead of
+    the source column; ``crew_id`` is always set to ``target_crew_id``.
+    Returns the number of copied rows.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = _columns(model)
+    replacements = {**replacements, 'crew_id': ('%s', [target_crew_id])}
+    select, params = [], []
+    for column in columns:
+        if column in replacements:
+            sql, value = replacements[column]
+            select.append(sql)
+            params.extend(value)
+        else:
+            select.append(f'src.{connection.ops.quote_name(column)}')
+
+    old_ids = list(model.objects.filter(crew_id=source_crew_id).order_by('pk').values_list('pk', flat=True))
+    insert = (
+        f"INSERT INTO {table} ({', '.join(connection.ops.quote_name(c) for c in columns)}) "
+        f"SELECT {', '.join(select)} FROM {table} src {join} WHERE src.id = %s"
+    )
+    # Neither SQLite nor PostgreSQL promise that one INSERT ... SELECT of many
+    # rows assigns ids in the order of the SELECT, so copy one row at a time
+    # and read back the id each row got.
+    pairs = []
+    for old_id in old_ids:
+        cursor.execute(insert, params + [old_id])
+        if cursor.rowcount != 1:
+            raise RuntimeError(f"Could not copy {kind} {old_id}")
+        pairs.append((kind, old_id, connection.ops.last_insert_id(cursor, model._meta.db_table, 'id')))
+    cursor.executemany(f"INSERT INTO {MAP_TABLE} (kind, old_id, new_id) VALUES (%s, %s, %s)", pairs)
+    return len(pairs)
+
+
+def _copy_crew_rows(source_crew_id, target_crew_id):
+    """Copy agents, tasks and dependencies of one crew into another in SQL."""
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    counts = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {MAP_TABLE} "
+            f"(kind varchar(10), old_id bigint, new_id bigint)"
+        )
+        cursor.execute(f"DELETE FROM {MAP_TABLE}")
+
+        stamps = {'created_at': ('%s', [now]), 'updated_at': ('%s', [now])}
+        counts['agents'] = _copy_rows(cursor, Agent, 'agent', source_crew_id, target_crew_id, stamps)
+
+        task_reset = {column: ('%s', [value]) for column, value in TASK_RESET_VALUES.items()}
+        counts['tasks'] = _copy_rows(cursor, Task, 'task', source_crew_id, target_crew_id, {
+            'agent_id': ('m.new_id', []),
+            **task_reset,
+            **stamps,
+        }, join=f"JOIN {MAP_TABLE} m ON m.kind = 'agent' AND m.old_id = src.agent_id")
+
+        through = connection.ops.quote_name(Task.depends_on.through._meta.db_table)
+        cursor.execute(
+            f"INSERT INTO {through} (from_task_id, to_task_id) "
+            f"SELECT f.new_id, t.new_id FROM {through} src "
+            f"JOIN {MAP_TABLE} f ON f.kind = 'task' AND f.old_id = src.from_task_id "
+            f"JOIN {MAP_TABLE} t ON t.kind = 'task' AND t.old_id = src.to_task_id"
+        )
+        counts['dependencies'] = cursor.rowcount
+
+        id_map = {'agent': {}, 'task': {}}
+        cursor.execute(f"SELECT kind, old_id, new_id FROM {MAP_TABLE}")
+        for kind, old_id, new_id in cursor.fetchall():
+            id_map[kind][old_id] = new_id
+        cursor.execute(f"DROP TABLE {MAP_TABLE}")
+    return counts, id_map
+
+
+def _apply_row_overrides(model, id_map, overrides, allowed):
+    """Apply the ``allowed`` fields of ``overrides`` to the copies of the template rows they are keyed by."""
+    for old_id, fields in overrides.items():
+        if not str(old_id).isdigit() or not isinstance(fields, dict):
+            continue
+        new_id = id_map.get(int(old_id))
+        fields = {name: value for name, value in fields.items() if name in allowed}
+        if new_id is not None and fields:
+            model.objects.filter(pk=new_id).update(**fields)
+
+
+def materialize(instance):
+    """
+    Give a template-backed crew its own copies of the template's agents and tasks.
+
+    Overrides are applied to the copies, after which the crew behaves like
+    any other crew; the overrides are kept for reference. Sub-crews are not
+    materialized: each is copied when it is itself executed or edited.
+
+    Returns:
+        dict: Number of copied agents, tasks and dependencies.
+    """
+    if instance.is_materialized:
+        return {'agents': 0, 'tasks': 0, 'dependencies': 0}
+
+    with transaction.atomic():
+        # Lock the crew so two concurrent runs do not both copy the template.
+        locked = CrewInstance.objects.select_for_update().get(pk=instance.pk)
+        if locked.is_materialized:
+            return {'agents': 0, 'tasks': 0, 'dependencies': 0}
+        counts, id_map = _copy_crew_rows(instance.template_id, instance.pk)
+        _apply_row_overrides(Agent, id_map['agent'], instance.overrides.get('agents', {}), AGENT_OVERRIDE_FIELDS)
+        _apply_row_overrides(Task, id_map['task'], instance.overrides.get('tasks', {}), TASK_OVERRIDE_FIELDS)
+        CrewInstance.objects.filter(pk=instance.pk).update(materialized=True)
+    instance.materialized = True
+    return counts
+
+
+def clone_crew(crew, owner=None, name=None, parent_crew=None):
+    """
+    Make a full, independent copy of ``crew`` and its sub-crews.
+
+    The crew rows go through the ORM; agents, tasks and dependencies are
+    copied with ``INSERT ... SELECT``. Tasks of the copy start out pending.
+    A template-backed crew is copied from its template with its overrides
+    applied.
+
+    Returns:
+        CrewInstance: The new crew.
+    """
+    source = crew if crew.is_materialized else crew.template
+    with transaction.atomic():
+        clone = CrewInstance.objects.create(
+            owner=owner or crew.owner,
+            name=name or (f"{crew.name} (copy)" if parent_crew is None else crew.name),
+            description=crew.description,
+            is_flow=crew.is_flow,
+            config=crew.config,
+            parent_crew=parent_crew,
+        )
+        _, id_map = _copy_crew_rows(source.pk, clone.pk)
+        if source is not crew:
+            _apply_row_overrides(Agent, id_map['agent'], crew.overrides.get('agents', {}), AGENT_OVERRIDE_FIELDS)
+            _apply_row_overrides(Task, id_map['task'], crew.overrides.get('tasks', {}), TASK_OVERRIDE_FIELDS)
+        for sub_crew in crew.sub_crews.all():
+            clone_crew(sub_crew, owner=clone.owner, parent_crew=clone)
+    return clone
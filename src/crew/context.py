@@ -0,0 +1,389 @@
+"""
+Prompt context of a task, assembled from the outputs of its dependencies.
+
+:func:`assemble_context` builds the description CrewAI receives: the task's
+description, its ``context`` entries and one section per completed
+dependency holding that task's output, oldest first.
+
+The outputs are fitted into a token budget. An agent whose ``llm_config``
+sets ``max_context_tokens`` gets that window less the description, the
+entries and the completion's ``max_tokens``; other agents get
+``CREW_CONTEXT['max_tokens']``. Tokens are counted with the model's
+tiktoken encoding when tiktoken is installed (it comes with CrewAI), and
+estimated from the text length otherwise. How outputs that do not fit are
+trimmed is the agent's ``context_strategy`` or ``CREW_CONTEXT['strategy']``:
+
+``quota``
+    The budget is split evenly between the outputs, a short output passes
+    its unused share on to the others, and an output over its share keeps
+    its opening and closing parts around a note of how much was left out.
+``summary``
+    Shares as for ``quota``, but an output over its share is replaced by an
+    extractive summary: its most representative sentences, in order.
+``recent``
+    The most recently completed outputs are kept whole while they fit;
+    the next one is shortened to what is left and older ones are dropped.
+
+Every section records what happened to it (``kept``, ``shortened``,
+``summarized`` or ``dropped``) and how many tokens were omitted; trimming
+is logged and counted in ``scriptcrew_context_omitted_tokens_total``.
+
+Assembled contexts are memoized in the Django cache under a key made of the
+task's prompt fields, the budget, the strategy and a hash of each
+dependency's output, so an unchanged chain never rebuilds a prompt and a
+re-run dependency invalidates exactly the prompts that include it. The
+size of every assembled prompt is recorded in the
+``scriptcrew_prompt_tokens`` histogram and on the ``prompt.build`` span of
+the execution profile.
+"""
+import hashlib
+import json
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.metrics import record_cache
+
+from .llm import CHARS_PER_TOKEN, estimate_tokens
+from .metrics import CONTEXT_OMITTED_TOKENS, PROMPT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_SETTINGS = {
+    'max_tokens': 8000,
+    'strategy': 'quota',
+    'cache': 'default',
+    'cache_timeout': 3600,
+}
+
+# Keys of Agent.llm_config read by ScriptCrew (here and in crew.hedging)
+# rather than passed on to CrewAI
+LLM_CONFIG_KEYS = ('max_context_tokens', 'context_strategy', 'hedge')
+
+CONTEXT_HEADING = "Context from previous tasks:"
+
+# The ``recent`` strategy drops an output rather than keep less of it than this
+MIN_SECTION_TOKENS = 64
+
+_SENTENCE = re.compile(r'[^.!?\n]+(?:[.!?]+|\n+|$)\s*')
+_WORD = re.compile(r'\w{4,}')
+
+
+class Tokenizer:
+    """Counts and cuts text in the tokens of one model."""
+
+    def __init__(self, model=None):
+        self.encoding = None
+        try:
+            import tiktoken
+        except ImportError:
+            return
+        try:
+            self.encoding = tiktoken.encoding_for_model(model or '')
+        except KeyError:
+            self.encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception as e:
+            # The encodings are downloaded on first use
+            logger.warning(f"No tokenizer for model {model}, estimating tokens instead: {str(e)}")
+
+    def count(self, text):
+        if self.encoding is None:
+            return estimate_tokens(text)
+        return len(self.encoding.encode(text or '', disallowed_special=()))
+
+    def head(self, text, tokens):
+        """The opening ``tokens`` of ``text``, ending on a word boundary where there is one."""
+        if self.encoding is None:
+            head = text[:tokens * CHARS_PER_TOKEN]
+        else:
+            head = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:tokens])
+        cut = max(head.rfind(' '), head.rfind('\n'))
+        return head[:cut] if cut > 0 and len(head) < len(text) else head
+
+    def tail(self, text, tokens):
+        """The closing ``tokens`` of ``text``."""
+        if tokens <= 0:
+            return ''
+        if self.encoding is None:
+            return text[-tokens * CHARS_PER_TOKEN:]
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[-tokens:])
+
+
+@lru_cache(maxsize=32)
+def get_tokenizer(model=None):
+    """Return the (shared) tokenizer of ``model``."""
+    return Tokenizer(model)
+
+
+@dataclass
+class AssembledContext:
+    """A task's prompt and how its dependency outputs were fitted into it."""
+    text: str
+    tokens: int
+    budget: int = 0
+    strategy: str = 'quota'
+    # One dict per dependency: task id, name, action, tokens kept and omitted
+    sections: list = field(default_factory=list)
+
+    @property
+    def omitted_tokens(self):
+        return sum(section['omitted'] for section in self.sections)
+
+    @property
+    def trimmed(self):
+        """The sections that were not kept whole."""
+        return [section for section in self.sections if section['action'] != 'kept']
+
+
+def get_settings():
+    return {**DEFAULT_CONTEXT_SETTINGS, **getattr(settings, 'CREW_CONTEXT', {})}
+
+
+def output_text(output_data):
+    """The text a dependency contributes: its ``result``, or its output as JSON."""
+    result = output_data.get('result') if isinstance(output_data, dict) else None
+    if isinstance(result, str):
+        return result
+    return json.dumps(result if result is not None else output_data, indent=2, default=str)
+
+
+def shorten(text, max_tokens, tokenizer=None):
+    """
+    Cut ``text`` down to about ``max_tokens``, keeping its opening and closing parts.
+
+    Returns:
+        tuple: ``(text, omitted tokens)``.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    tokens = tokenizer.count(text)
+    if tokens <= max_tokens:
+        return text, 0
+    if max_tokens <= 0:
+        return '', tokens
+    head = tokenizer.head(text, max_tokens * 2 // 3)
+    tail = tokenizer.tail(text, max_tokens // 3)
+    omitted = max(0, tokens - tokenizer.count(head) - tokenizer.count(tail))
+    return f"{head}\n[... {omitted} tokens omitted ...]\n{tail}", omitted
+
+
+def summarize(text, max_tokens, tokenizer=None):
+    """
+    Reduce ``text`` to an extractive summary of about ``max_tokens``.
+
+    Sentences are scored by how frequent their words are in the whole text,
+    and the best scoring ones are kept, in their original order, until the
+    next one would not fit.
+    Text without sentences to choose from is shortened instead.
+
+    Returns:
+        tuple: ``(text, omitted tokens)``.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    tokens = tokenizer.count(text)
+    if tokens <= max_tokens:
+        return text, 0
+    sentences = _SENTENCE.findall(text)
+    if len(sentences) < 3:
+        return shorten(text, max_tokens, tokenizer)
+
+    frequency = Counter(word.lower() for word in _WORD.findall(text))
+
+    def score(index):
+        words = [word.lower() for word in _WORD.findall(sentences[index])]
+        # The opening sentence usually states what the output is about
+        return sum(frequency[word] for word in words) / (len(words) + 1) + (1 if index == 0 else 0)
+
+    chosen = set()
+    used = 0
+    for index in sorted(range(len(sentences)), key=score, reverse=True):
+        size = tokenizer.count(sentences[index])
+        if used + size > max_tokens:
+            # Filling the rest with lower ranked sentences would add noise
+            break
+        chosen.add(index)
+        used += size
+    if not chosen:
+        return shorten(text, max_tokens, tokenizer)
+    summary = ''.join(sentences[index] for index in sorted(chosen)).strip()
+    omitted = max(0, tokens - tokenizer.count(summary))
+    return f"{summary}\n[... summarized, {omitted} tokens omitted ...]", omitted
+
+
+def _section(name, text, tokenizer, action='kept', omitted=0):
+    return {'name': name, 'text': text, 'tokens': tokenizer.count(text), 'omitted': omitted, 'action': action}
+
+
+def _fit_shares(outputs, sizes, max_tokens, tokenizer, trim, action):
+    shares = [0] * len(outputs)
+    remaining = max_tokens
+    by_size = sorted(range(len(outputs)), key=sizes.__getitem__)
+    for position, index in enumerate(by_size):
+        shares[index] = min(sizes[index], remaining // (len(outputs) - position))
+        remaining -= shares[index]
+
+    fitted = []
+    for (name, text), size, share in zip(outputs, sizes, shares):
+        if size <= share:
+            fitted.append(_section(name, text, tokenizer))
+        elif share <= 0:
+            fitted.append(_section(name, '', tokenizer, 'dropped', size))
+        else:
+            fitted.append(_trimmed(name, text, share, tokenizer, trim, action))
+    return fitted
+
+
+def _trimmed(name, text, share, tokenizer, trim, action):
+    kept, omitted = trim(text, share, tokenizer)
+    return _section(name, kept, tokenizer, action, omitted)
+
+
+def _fit_recent(outputs, sizes, max_tokens, tokenizer):
+    fitted = [None] * len(outputs)
+    remaining = max_tokens
+    for index in reversed(range(len(outputs))):
+        name, text = outputs[index]
+        if sizes[index] <= remaining:
+            fitted[index] = _section(name, text, tokenizer)
+            remaining -= sizes[index]
+        elif remaining >= MIN_SECTION_TOKENS:
+            fitted[index] = _trimmed(name, text, remaining, tokenizer, shorten, 'shortened')
+            remaining = 0
+        else:
+            fitted[index] = _section(name, '', tokenizer, 'dropped', sizes[index])
+    return fitted
+
+
+STRATEGIES = ('quota', 'summary', 'recent')
+
+
+def fit_outputs(outputs, max_tokens, strategy='quota', tokenizer=None):
+    """
+    Fit dependency outputs into ``max_tokens``.
+
+    Args:
+        outputs: ``(name, text)`` pairs, oldest first.
+        max_tokens: The budget of all outputs together.
+        strategy: One of ``STRATEGIES``; see the module documentation.
+        tokenizer: The :class:`Tokenizer` to count with.
+
+    Returns:
+        list: One section dict per output, in input order, with the
+        ``name``, the ``text`` kept, its ``tokens``, the tokens ``omitted``
+        and the ``action`` taken.
+
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown context strategy: {strategy}")
+    tokenizer = tokenizer or get_tokenizer()
+    sizes = [tokenizer.count(text) for _, text in outputs]
+    if strategy == 'recent':
+        return _fit_recent(outputs, sizes, max_tokens, tokenizer)
+    if strategy == 'summary':
+        return _fit_shares(outputs, sizes, max_tokens, tokenizer, summarize, 'summarized')
+    return _fit_shares(outputs, sizes, max_tokens, tokenizer, shorten, 'shortened')
+
+
+def render(description, entries, fitted):
+    """Join a description, static context entries and fitted outputs into one prompt."""
+    parts = [description]
+    if entries:
+        parts.append(render_entries(entries))
+    sections = '\n\n'.join(f"## {section['name']}\n{section['text']}" for section in fitted if section['text'])
+    if sections:
+        parts.append(f"{CONTEXT_HEADING}\n\n{sections}")
+    return '\n\n'.join(parts)
+
+
+def render_entries(entries):
+    return '\n'.join(entry if isinstance(entry, str) else json.dumps(entry) for entry in entries)
+
+
+def get_budget(llm_config, base_tokens, config=None):
+    """
+    Return the tokens dependency outputs may use in a prompt.
+
+    Args:
+        llm_config: The agent's ``llm_config``.
+        base_tokens: Tokens of the prompt without the outputs.
+    """
+    config = config or get_settings()
+    window = (llm_config or {}).get('max_context_tokens')
+    if not window:
+        return config['max_tokens']
+    return max(0, int(window) - base_tokens - int((llm_config or {}).get('max_tokens') or 0))
+
+
+def _cache_key(task, budget, strategy, model, parents):
+    digest = hashlib.sha256(json.dumps(
+        [task.description, task.context, budget, strategy, model], sort_keys=True, default=str
+    ).encode('utf-8'))
+    for pk, name, output_data in parents:
+        output = json.dumps(output_data, sort_keys=True, default=str)
+        digest.update(f"{pk}:{name}:{hashlib.sha1(output.encode('utf-8')).hexdigest()}\n".encode('utf-8'))
+    return f"crew:context:{task.pk}:{digest.hexdigest()}"
+
+
+def assemble_context(task, max_tokens=None, strategy=None):
+    """
+    Return the prompt of ``task`` with the outputs of its completed dependencies.
+
+    Args:
+        task: The Task to build the prompt for.
+        max_tokens: Budget of the dependency outputs, instead of the one
+            derived from the agent's ``llm_config`` and ``CREW_CONTEXT``.
+        strategy: Trimming strategy, instead of the configured one.
+
+    Returns:
+        AssembledContext: The prompt, its tokens, and what was kept of each
+        dependency's output.
+    """
+    config = get_settings()
+    llm_config = task.agent.llm_config if isinstance(task.agent.llm_config, dict) else {}
+    strategy = strategy or llm_config.get('context_strategy') or config['strategy']
+    model = llm_config.get('model')
+    tokenizer = get_tokenizer(model)
+
+    entries = task.context if isinstance(task.context, list) else []
+    if max_tokens is None:
+        max_tokens = get_budget(llm_config, tokenizer.count(render(task.description, entries, [])), config)
+    parents = list(
+        task.depends_on.filter(status='completed').order_by('completed_at', 'pk')
+        .values_list('pk', 'name', 'output_data')
+    )
+
+    cache = caches[config['cache']]
+    key = _cache_key(task, max_tokens, strategy, model, parents)
+    assembled = cache.get(key)
+    record_cache('task_context', hit=assembled is not None)
+    if assembled is None:
+        fitted = fit_outputs(
+            [(name, output_text(output_data)) for _, name, output_data in parents], max_tokens, strategy, tokenizer
+        )
+        text = render(task.description, entries, fitted)
+        assembled = AssembledContext(
+            text=text,
+            tokens=tokenizer.count(text),
+            budget=max_tokens,
+            strategy=strategy,
+            sections=[
+                {'task': pk, **{name: value for name, value in section.items() if name != 'text'}}
+                for (pk, _, _), section in zip(parents, fitted)
+            ],
+        )
+        if assembled.trimmed:
+            CONTEXT_OMITTED_TOKENS.labels(strategy=strategy).inc(assembled.omitted_tokens)
+            report = ', '.join(
+                f"{section['name']} {section['action']} (-{section['omitted']} tokens)"
+                for section in assembled.trimmed
+            )
+            logger.info(f"Context of task {task.name} trimmed to {max_tokens} tokens with {strategy}: {report}")
+        cache.set(key, assembled, config['cache_timeout'])
+    PROMPT_TOKENS.labels().observe(assembled.tokens)
+    return assembled
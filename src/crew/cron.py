@@ -0,0 +1,135 @@
+"""
+Cron expressions for scheduled crew runs.
+
+Supports the usual five fields (minute, hour, day of month, month, day of
+week) with ``*``, lists, ranges, steps and three-letter month and weekday
+names, plus the ``@hourly``, ``@daily``/``@midnight``, ``@weekly``,
+``@monthly`` and ``@yearly`` shortcuts. As in cron, when both day of month
+and day of week are restricted a day matching either one matches.
+"""
+from datetime import datetime, timedelta
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+WEEKDAYS = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+# (name, minimum, maximum, names)
+FIELDS = (
+    ('minute', 0, 59, None),
+    ('hour', 0, 23, None),
+    ('day of month', 1, 31, None),
+    ('month', 1, 12, MONTHS),
+    ('day of week', 0, 7, WEEKDAYS),
+)
+
+# Searching minute by minute would be slow; no valid expression needs more
+# than a few years of days to find its next match.
+MAX_DAYS = 366 * 5
+
+
+def _value(token, minimum, names):
+    if names and token.lower() in names:
+        return names.index(token.lower()) + (minimum if names is MONTHS else 0)
+    return int(token)
+
+
+def _parse_field(text, name, minimum, maximum, names):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid step in {name} field: '{text}'")
+        if part == '*':
+            start, end = minimum, maximum
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = _value(start_text, minimum, names), _value(end_text, minimum, names)
+        else:
+            start = _value(part, minimum, names)
+            end = maximum if step > 1 else start
+        if not minimum <= start <= end <= maximum:
+            raise ValueError(f"Value out of range in {name} field: '{text}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A parsed cron expression."""
+
+    def __init__(self, expression):
+        """
+        Args:
+            expression: Five space-separated fields or an ``@`` shortcut.
+
+        Raises:
+            ValueError: If the expression cannot be parsed.
+        """
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, got {len(fields)}: '{expression}'")
+        try:
+            parsed = [_parse_field(text, *spec) for text, spec in zip(fields, FIELDS)]
+        except ValueError as e:
+            if 'field' in str(e):
+                raise
+            raise ValueError(f"Invalid cron expression '{expression}': {str(e)}")
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Both 0 and 7 mean Sunday; store Python weekdays (Monday is 0).
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def __str__(self):
+        return self.expression
+
+    def matches_day(self, day):
+        if day.month not in self.months:
+            return False
+        in_month = day.day in self.days
+        in_week = day.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """
+        Return the first time after ``moment`` that matches the expression.
+
+        The result keeps ``moment``'s timezone, so schedules follow local
+        wall-clock time when given an aware local datetime.
+
+        Raises:
+            ValueError: If nothing matches within the next few years
+                (e.g. ``0 0 31 2 *``).
+        """
+        tzinfo = moment.tzinfo
+        local = moment.replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        day = local.date()
+        for _ in range(MAX_DAYS):
+            if self.matches_day(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = datetime(day.year, day.month, day.day, hour, minute)
+                        if candidate >= local:
+                            return _localize(candidate, tzinfo) if tzinfo else candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+def _localize(naive, tzinfo):
+    if hasattr(tzinfo, 'localize'):
+        return tzinfo.localize(naive)
+    return naive.replace(tzinfo=tzinfo)
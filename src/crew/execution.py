@@ -0,0 +1,278 @@
+"""
+Crew execution.
+
+:class:`CrewExecutor` runs a CrewInstance and records the run as an
+:class:`~crew.models.Execution`. Flows run their sub-crews in the order
+given by ``config['execution_order']`` (or creation order); crews run their
+tasks one at a time in dependency order, so every finished task's output is
+persisted before the next one starts. That is what makes a failed run
+resumable: ``execute(resume=True)`` keeps completed tasks and only re-runs
+the rest, and it is what lets the scheduler preempt a batch run between
+tasks through the ``checkpoint`` callback. While it runs the execution
+sends heartbeats (see :mod:`crew.heartbeat`), so a run whose worker died
+can be told from one that is still going.
+"""
+import logging
+import time
+from contextlib import nullcontext
+
+from django.utils import timezone
+
+from . import profiling
+from .heartbeat import Heartbeat
+from .metrics import EXECUTIONS_FINISHED, TASK_DURATION
+from .models import CrewInstance, Task, Execution
+from .profiling import span
+from .usage import check_budget
+from .utils import resolve_dependencies
+
+logger = logging.getLogger(__name__)
+
+
+class CrewExecutor:
+    """Execute a single CrewInstance."""
+
+    def __init__(self, crew, checkpoint=None, parent=None):
+        self.crew = crew
+        self.checkpoint = checkpoint
+        # The executor of the flow this sub-crew runs under, if any
+        self.parent = parent
+        self.execution = None
+        self.heartbeat = None
+        self.profiler = None
+
+    def get_agents(self):
+        return list(self.crew.agents.all())
+
+    def get_tasks(self):
+        return list(self.crew.tasks.select_related('agent', 'crew').order_by('created_at', 'pk'))
+
+    def get_execution_order(self):
+        return resolve_dependencies(self.get_tasks())
+
+    def execute(self, resume=False, resumed_from=None, execution=None, task=None, batch=None):
+        """
+        Run the crew and record the run as an Execution.
+
+        Args:
+            resume: Keep the output of tasks that already completed and only
+                run the remaining ones. Otherwise every task runs again.
+            resumed_from: The earlier Execution being resumed, if any.
+            execution: An Execution created by the scheduler to run under,
+                instead of creating a new one.
+            task: Run only this task of the crew.
+            batch: Run the crew over the records of this BatchRun.
+
+        Returns:
+            dict: ``success`` plus the ids of completed, failed and blocked
+            tasks (or sub-crew executions for flows). ``preempted`` is set if
+            the run gave up its place to interactive work or was reaped and
+            is being continued elsewhere; the Execution is then left as it
+            is, except that of a sub-crew, which is stopped.
+
+        Raises:
+            BudgetExceeded: If the crew has used up its daily budget.
+        """
+        crew = self.crew
+        logger.info(f"Starting execution of crew: {crew.name}")
+        check_budget(crew)
+
+        if execution is None:
+            parent = self.parent.execution if self.parent else None
+            execution = Execution.objects.create(
+                crew=crew,
+                status='running',
+                keep_completed=resume,
+                resumed_from=resumed_from,
+                task=task,
+                parent=parent,
+                priority=parent.priority if parent else 'batch',
+            )
+        elif execution.status != 'running':
+            execution.status = 'running'
+            execution.started_at = timezone.now()
+            execution.save(update_fields=['status', 'started_at'])
+        self.execution = execution
+        crew.status = 'running'
+        crew.last_executed = timezone.now()
+        crew.save(update_fields=['status', 'last_executed', 'updated_at'])
+
+        self.profiler = profiling.Profiler() if profiling.is_enabled() else None
+        try:
+            with Heartbeat(execution) as self.heartbeat, \
+                    profiling.activate(self.profiler) if self.profiler else nullcontext(), \
+                    span('crew.execute', crew=crew.name, resume=resume):
+                if batch is not None:
+                    from .batch import BatchRunner
+                    results = BatchRunner(batch, execution).run()
+                elif task is not None:
+                    results = self._execute_task(task)
+                elif crew.is_flow:
+                    results = self._execute_flow(resume)
+                else:
+                    results = self._execute_crew(resume)
+        except Exception as e:
+            logger.error(f"Failed to execute crew {crew.name}: {str(e)}")
+            self._finish('failed', {'error': str(e)})
+            raise
+
+        if results.get('preempted'):
+            if self.parent is not None:
+                # The flow continues this sub-crew in a new execution when it resumes
+                self._finish('stopped', results)
+            return results
+        self._finish('completed' if results['success'] else 'failed', results)
+        return results
+
+    def _yield_to_scheduler(self):
+        """Whether the run should stop before its next unit of work."""
+        if self.heartbeat and not self.heartbeat.beat():
+            # The reaper took the execution away from this worker
+            logger.warning(f"Execution {self.execution.pk} is no longer running here; stopping")
+            return True
+        if self.parent is not None:
+            # Sub-crews hold no slot of their own; the flow yields for them
+            return self.parent._yield_to_scheduler()
+        if not self.checkpoint:
+            return False
+        with span('scheduler.checkpoint'):
+            return bool(self.checkpoint(self.execution))
+
+    def _finish(self, status, results):
+        fields = {
+            'status': status,
+            'ended_at': timezone.now(),
+            'results': {**self.execution.results, **results},
+        }
+        if self.profiler:
+            fields['profile'] = self.profiler.as_dict()
+        # Only finish the execution if it is still ours: a worker that was
+        # slow, not dead, must not overwrite what the reaper recorded
+        current = Execution.objects.filter(pk=self.execution.pk, status='running')
+        if self.heartbeat:
+            current = current.filter(worker=self.heartbeat.worker)
+        if not current.update(**fields):
+            logger.warning(f"Execution {self.execution.pk} was taken from this worker; not marking it {status}")
+            self.execution.refresh_from_db()
+            return
+        for name, value in fields.items():
+            setattr(self.execution, name, value)
+        if self.profiler:
+            profiling.export_if_configured(self.execution)
+        EXECUTIONS_FINISHED.labels(status=status).inc()
+        CrewInstance.objects.filter(pk=self.crew.pk).update(status=status, updated_at=timezone.now())
+        self.crew.status = status
+
+    def _execute_flow(self, resume):
+        """Execute sub-crews in sequence or as defined in config."""
+        crew = self.crew
+        logger.info(f"Executing flow: {crew.name}")
+        results = {'success': True, 'completed_crews': [], 'failed_crews': []}
+
+        sub_crews = {sub_crew.pk: sub_crew for sub_crew in crew.sub_crews.all()}
+        if not sub_crews:
+            logger.warning(f"Flow {crew.name} has no sub-crews to execute.")
+            return results
+
+        execution_order = crew.config.get('execution_order', []) or list(sub_crews)
+        for subcrew_id in execution_order:
+            subcrew = sub_crews.get(subcrew_id)
+            if subcrew is None:
+                logger.error(f"Could not find sub-crew with ID {subcrew_id}")
+                continue
+            if self._yield_to_scheduler():
+                results['preempted'] = True
+                return results
+            try:
+                with span('subcrew', crew=subcrew.name):
+                    outcome = CrewExecutor(subcrew, parent=self).execute(resume=resume)
+            except Exception as e:
+                logger.error(f"Error executing sub-crew {subcrew_id}: {str(e)}")
+                outcome = {'success': False}
+            if outcome.get('preempted'):
+                results['preempted'] = True
+                return results
+            key = 'completed_crews' if outcome['success'] else 'failed_crews'
+            results[key].append(subcrew_id)
+
+        results['success'] = not results['failed_crews']
+        return results
+
+    def _reset_tasks(self, resume):
+        tasks = self.crew.tasks.all()
+        if resume:
+            tasks = tasks.exclude(status='completed')
+        tasks.update(
+            status='pending',
+            error_message='',
+            started_at=None,
+            completed_at=None,
+            attempts=0,
+            updated_at=timezone.now(),
+        )
+
+    def _run_task(self, task, check_dependencies=True):
+        started = time.perf_counter()
+        try:
+            with span('task', task=task.name, task_id=task.pk):
+                task.execute(execution=self.execution, check_dependencies=check_dependencies)
+        except Exception as e:
+            logger.error(f"Error executing task {task.name}: {str(e)}")
+        TASK_DURATION.labels(status=task.status).observe(time.perf_counter() - started)
+
+    def _execute_task(self, task):
+        """Execute a single task of the crew."""
+        results = {'success': True, 'completed_tasks': [], 'failed_tasks': [], 'blocked_tasks': []}
+        self._run_task(task)
+        key = 'completed_tasks' if task.status == 'completed' else 'failed_tasks'
+        results[key].append(task.pk)
+        results['success'] = task.status == 'completed'
+        return results
+
+    def _execute_crew(self, resume):
+        """Execute the crew's tasks in dependency order, one at a time."""
+        crew = self.crew
+        results = {'success': True, 'completed_tasks': [], 'failed_tasks': [], 'blocked_tasks': []}
+
+        # Crews instantiated from a template share its rows until they
+        # run; execution writes task state, so take a private copy now.
+        if not crew.is_materialized:
+            from .cloning import materialize
+            with span('db.materialize'):
+                materialize(crew)
+
+        with span('db.load_tasks'):
+            self._reset_tasks(resume)
+            order = self.get_execution_order()
+            dependencies = {task.pk: set() for task in order}
+            edges = Task.depends_on.through.objects.filter(from_task__in=order).values_list(
+                'from_task_id', 'to_task_id'
+            )
+            for task_id, dependency_id in edges:
+                dependencies[task_id].add(dependency_id)
+        if not order:
+            logger.warning(f"Crew {crew.name} has no tasks to execute.")
+            return results
+        status = {task.pk: task.status for task in order}
+
+        for task in order:
+            if task.status == 'completed':
+                results['completed_tasks'].append(task.pk)
+                continue
+            if any(status.get(dep) != 'completed' for dep in dependencies[task.pk]):
+                logger.warning(f"Skipping task {task.name}: dependencies did not complete")
+                results['blocked_tasks'].append(task.pk)
+                continue
+            if self._yield_to_scheduler():
+                results['preempted'] = True
+                return results
+            # Dependencies were checked against the statuses above
+            self._run_task(task, check_dependencies=False)
+            status[task.pk] = task.status
+            key = 'completed_tasks' if task.status == 'completed' else 'failed_tasks'
+            results[key].append(task.pk)
+
+        results['success'] = not (results['failed_tasks'] or results['blocked_tasks'])
+        if results['success']:
+            logger.info(f"Successfully executed crew: {crew.name}")
+        return results
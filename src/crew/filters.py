@@ -0,0 +1,146 @@
+"""
+Filters of crews, agents and tasks, shared by the REST API and the HTML
+list views so both accept the same query parameters.
+
+JSON columns are filtered by containment: ``?llm_config={"model": "gpt-4o"}``
+matches agents whose ``llm_config`` includes that key and value. On
+PostgreSQL this is the indexed ``@>`` operator (migration 0012).
+"""
+import json
+
+from django import forms
+from django.db import connections
+from django.db.models import Q
+from django_filters import rest_framework as filters
+
+from .models import CrewInstance, Agent, Task
+from .search import search_agents, search_tasks
+
+
+class JSONObjectField(forms.CharField):
+    """A form field for a JSON object given as a string."""
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if not value:
+            return None
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise forms.ValidationError('Enter valid JSON.')
+        if not isinstance(value, dict):
+            raise forms.ValidationError('Enter a JSON object.')
+        return value
+
+
+def _key_paths(prefix, value):
+    for key, item in value.items():
+        if isinstance(item, dict) and item:
+            yield from _key_paths(f'{prefix}__{key}', item)
+        else:
+            yield f'{prefix}__{key}', item
+
+
+class JSONContainsFilter(filters.Filter):
+    """
+    Match rows whose JSON column contains the given JSON object. Databases
+    without JSON containment (SQLite) compare each nested key instead.
+    """
+    field_class = JSONObjectField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        if connections[qs.db].vendor == 'postgresql':
+            return qs.filter(**{f'{self.field_name}__contains': value})
+        return qs.filter(**dict(_key_paths(self.field_name, value)))
+
+
+class SearchFilterMixin:
+    """Adds ``search``: a case-insensitive match on any of ``search_fields``."""
+    search_fields = ()
+
+    def filter_search(self, queryset, name, value):
+        if not value:
+            return queryset
+        query = Q()
+        for field in self.search_fields:
+            query |= Q(**{f'{field}__icontains': value})
+        return queryset.filter(query)
+
+
+class CrewInstanceFilter(SearchFilterMixin, filters.FilterSet):
+    search = filters.CharFilter(method='filter_search')
+    is_flow = filters.BooleanFilter()
+    is_subcrew = filters.BooleanFilter(method='filter_is_subcrew')
+    has_parent = filters.BooleanFilter(field_name='parent_crew', lookup_expr='isnull', exclude=True)
+    search_fields = ('name', 'description')
+
+    class Meta:
+        model = CrewInstance
+        fields = ['search', 'is_flow', 'is_subcrew', 'has_parent', 'owner', 'status']
+
+    def filter_is_subcrew(self, queryset, name, value):
+        if value:
+            return queryset.filter(parent_crew__isnull=False)
+        return queryset.filter(parent_crew__isnull=True)
+
+
+class AgentFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search')
+    role = filters.CharFilter()
+    has_tools = filters.BooleanFilter(method='filter_has_tools')
+    crew_type = filters.CharFilter(field_name='crew__is_flow')
+    # Indexed by agent_llm_model_idx
+    llm_model = filters.CharFilter(field_name='llm_config__model')
+    llm_config = JSONContainsFilter()
+
+    class Meta:
+        model = Agent
+        fields = [
+            'search', 'role', 'has_tools', 'crew_type', 'crew', 'allow_delegation', 'verbose',
+            'llm_model', 'llm_config'
+        ]
+
+    def filter_search(self, queryset, name, value):
+        # Full-text search, best matches first (see crew.search)
+        return search_agents(queryset, value)
+
+    def filter_has_tools(self, queryset, name, value):
+        if value:
+            return queryset.exclude(tools=[])
+        return queryset.filter(tools=[])
+
+
+class TaskFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search')
+    status = filters.CharFilter()
+    has_dependencies = filters.BooleanFilter(method='filter_has_dependencies')
+    has_output = filters.BooleanFilter(method='filter_has_output')
+    ready = filters.BooleanFilter(method='filter_ready')
+    input_data = JSONContainsFilter()
+    input_key = filters.CharFilter(field_name='input_data', lookup_expr='has_key')
+
+    class Meta:
+        model = Task
+        fields = [
+            'search', 'status', 'has_dependencies', 'has_output', 'ready', 'crew', 'agent', 'input_data', 'input_key'
+        ]
+
+    def filter_search(self, queryset, name, value):
+        return search_tasks(queryset, value)
+
+    def filter_has_dependencies(self, queryset, name, value):
+        if value:
+            return queryset.filter(depends_on__isnull=False).distinct()
+        return queryset.filter(depends_on__isnull=True)
+
+    def filter_has_output(self, queryset, name, value):
+        if value:
+            return queryset.exclude(output_data={})
+        return queryset.filter(output_data={})
+
+    def filter_ready(self, queryset, name, value):
+        # Not yet completed, with every dependency completed
+        ready = queryset.ready()
+        return ready if value else queryset.exclude(pk__in=ready.values('pk'))
@@ -0,0 +1,215 @@
+"""
+Worker heartbeats and recovery of orphaned executions.
+
+A running :class:`~crew.models.Execution` records the ``worker`` (host and
+process id) running it, and a :class:`Heartbeat` thread in that worker
+refreshes ``heartbeat_at`` every ``CREW_REAPER['heartbeat_interval']``
+seconds, including while a task waits on its LLM. When a worker dies in
+the middle of a run, for instance when gunicorn kills it at its timeout,
+nothing sets the execution, its crew and its in-progress tasks to a final
+state, and the running execution keeps holding a slot of the scheduler's
+concurrency limits.
+
+:func:`reap_stale_executions`, run periodically by the ``reap_executions``
+command, finds running executions whose heartbeat is older than
+``stale_after`` seconds and recovers them according to ``policy``:
+
+* ``'fail'`` marks the execution, its crew and its in-progress tasks failed;
+* ``'requeue'`` puts the execution back in the queue, keeping the tasks
+  that completed, at most ``max_requeues`` times before failing it.
+
+Only executions that came through the scheduler's queue are requeued; the
+executions of sub-crews, which their flow runs in-process, are failed, and
+go with their flow's: failed when it fails, stopped when it is requeued.
+Either way the execution stops counting as running, which frees its slot
+of the global and per-owner limits, and its run time is counted up to the
+last heartbeat. A worker that was only slow, not dead, notices at its next
+task boundary that the execution was taken from it and stops.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .metrics import EXECUTIONS_REAPED
+from .models import CrewInstance, Execution, Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REAPER_SETTINGS = {
+    'heartbeat_interval': 30,
+    'stale_after': 180,
+    'policy': 'fail',
+    'max_requeues': 1,
+}
+POLICIES = ('fail', 'requeue')
+
+
+def get_settings():
+    return {**DEFAULT_REAPER_SETTINGS, **getattr(settings, 'CREW_REAPER', {})}
+
+
+def worker_id():
+    """Identify this worker process as ``host:pid``."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Heartbeat:
+    """
+    Keeps ``heartbeat_at`` of a running execution fresh from a background
+    thread while the block runs.
+    """
+
+    def __init__(self, execution, interval=None):
+        self.execution = execution
+        self.worker = worker_id()
+        self.interval = get_settings()['heartbeat_interval'] if interval is None else interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def beat(self):
+        """
+        Record a heartbeat.
+
+        Returns:
+            bool: False if the execution is no longer running in this
+            worker, e.g. because it was reaped.
+        """
+        now = timezone.now()
+        beaten = Execution.objects.filter(pk=self.execution.pk, status='running', worker=self.worker).update(
+            heartbeat_at=now
+        )
+        if beaten:
+            self.execution.heartbeat_at = now
+        return bool(beaten)
+
+    def _run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.beat()
+                except Exception as e:
+                    logger.error(f"Could not record the heartbeat of execution {self.execution.pk}: {str(e)}")
+        finally:
+            close_old_connections()
+
+    def __enter__(self):
+        now = timezone.now()
+        Execution.objects.filter(pk=self.execution.pk).update(worker=self.worker, heartbeat_at=now)
+        self.execution.worker = self.worker
+        self.execution.heartbeat_at = now
+        self.thread = threading.Thread(
+            target=self._run, name=f'heartbeat-{self.execution.pk}', daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        return False
+
+
+def stale_executions(now=None, config=None):
+    """Return the running executions whose worker has not been heard from in ``stale_after`` seconds."""
+    config = config or get_settings()
+    cutoff = (now or timezone.now()) - timedelta(seconds=config['stale_after'])
+    return Execution.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+
+def reap(execution, policy='fail', max_requeues=1, now=None):
+    """
+    Recover ``execution`` after its worker died.
+
+    Returns:
+        str: ``'requeued'`` or ``'failed'``, or None if the execution changed
+        in the meantime (it finished, or its worker came back) and was left alone.
+    """
+    now = now or timezone.now()
+    last_seen = execution.heartbeat_at or execution.started_at
+    message = f"Worker {execution.worker or 'unknown'} stopped responding during the run"
+    # Only act if nobody touched the execution since it was found stale
+    current = Execution.objects.filter(pk=execution.pk, status='running', heartbeat_at=execution.heartbeat_at)
+    requeue = policy == 'requeue' and execution.queued_at is not None and execution.requeue_count < max_requeues
+    if requeue:
+        action = 'requeued'
+        updated = current.update(
+            status='queued',
+            keep_completed=True,
+            worker='',
+            heartbeat_at=None,
+            requeue_count=F('requeue_count') + 1,
+        )
+        crew_status = 'idle'
+        task_status = 'pending'
+    else:
+        action = 'failed'
+        updated = current.update(
+            status='failed',
+            ended_at=last_seen,
+            results={**execution.results, 'success': False, 'error': message},
+        )
+        crew_status = 'failed'
+        task_status = 'failed'
+    if not updated:
+        return None
+
+    tasks = Task.objects.filter(pk=execution.task_id) if execution.task_id else Task.objects.filter(
+        crew_id=execution.crew_id
+    )
+    tasks.filter(status='in_progress').update(status=task_status, error_message=message, updated_at=now)
+    CrewInstance.objects.filter(pk=execution.crew_id, status='running').update(status=crew_status, updated_at=now)
+    for child in Execution.objects.filter(parent=execution, status='running'):
+        _reap_child(child, action, message, last_seen, now)
+    EXECUTIONS_REAPED.labels(action=action).inc()
+    logger.warning(f"Execution {execution.pk} {action}: {message}")
+    return action
+
+
+def _reap_child(execution, action, message, last_seen, now):
+    """End a running sub-crew execution of a flow execution that was reaped."""
+    status = 'failed' if action == 'failed' else 'stopped'
+    updated = Execution.objects.filter(pk=execution.pk, status='running').update(
+        status=status,
+        ended_at=last_seen,
+        results={**execution.results, 'success': False, 'error': message},
+    )
+    if not updated:
+        return
+    task_status = 'failed' if action == 'failed' else 'pending'
+    Task.objects.filter(crew_id=execution.crew_id, status='in_progress').update(
+        status=task_status, error_message=message, updated_at=now
+    )
+    crew_status = 'failed' if action == 'failed' else 'idle'
+    CrewInstance.objects.filter(pk=execution.crew_id, status='running').update(status=crew_status, updated_at=now)
+    for child in Execution.objects.filter(parent=execution, status='running'):
+        _reap_child(child, action, message, last_seen, now)
+
+
+def reap_stale_executions(now=None, config=None):
+    """
+    Recover every running execution with a stale heartbeat.
+
+    Returns:
+        list: ``(execution, action)`` pairs of the executions recovered.
+
+    Raises:
+        ValueError: If the configured policy is not known.
+    """
+    config = {**get_settings(), **(config or {})}
+    if config['policy'] not in POLICIES:
+        raise ValueError(f"Unknown reaper policy '{config['policy']}'")
+    reaped = []
+    for execution in stale_executions(now, config).select_related('crew'):
+        action = reap(execution, config['policy'], config['max_requeues'], now)
+        if action:
+            reaped.append((execution, action))
+    return reaped
@@ -0,0 +1,241 @@
+"""
+Hedged LLM requests.
+
+Most LLM calls of a model finish within a narrow band, but a few take many
+times the median, and because tasks run in dependency order one straggler
+holds up everything after it. For agents that opt in, :func:`hedged` sends
+a duplicate of a request that has been running longer than the model's
+recent ``percentile`` latency and uses whichever answer arrives first.
+
+Hedging is enabled per agent with ``llm_config['hedge']``: ``True`` for the
+defaults of ``settings.CREW_HEDGING`` (which hedges every agent when its
+``enabled`` is set), or a dict overriding them, e.g.::
+
+    {'model': 'gpt-4o', 'hedge': {'percentile': 90, 'fallback_model': 'gpt-4o-mini'}}
+
+The duplicate goes to ``fallback_model`` if one is set, else to the same
+model. Latencies are tracked per model and process over the last
+``window`` successful requests; no request is hedged before ``min_samples``
+of them were seen, nor earlier than ``min_delay`` seconds. Duplicates cost
+tokens, so spending is capped: at most ``max_ratio`` of a model's recent
+requests are hedged, the tokens spent by losing requests may be at most
+``max_ratio`` of the tokens of all of them, and requests estimated at more
+than ``max_tokens`` tokens never are.
+
+A request already sent cannot be withdrawn from the provider. The losing
+request is abandoned: it finishes in its background thread, holding its
+rate-limit slot until then, and its answer is discarded. Its tokens are
+still paid for, so once it finishes they are reported to ``on_abandoned``,
+which records them as usage, and counted against the budget; when it does
+not report its usage, the request's estimate counts instead. Only the
+original request streams its output (see :mod:`crew.streaming`).
+"""
+import contextvars
+import logging
+import queue
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGING_SETTINGS = {
+    'enabled': False,
+    'percentile': 95,
+    'min_samples': 20,
+    'min_delay': 2.0,
+    'window': 200,
+    'max_ratio': 0.1,
+    'max_tokens': 32000,
+    'fallback_model': None,
+}
+
+
+def get_settings():
+    return {**DEFAULT_HEDGING_SETTINGS, **getattr(settings, 'CREW_HEDGING', {})}
+
+
+def get_config(llm_config):
+    """Return the hedging settings for an agent's ``llm_config``, or None if it does not hedge."""
+    config = get_settings()
+    option = (llm_config or {}).get('hedge', config['enabled'])
+    if not option:
+        return None
+    if isinstance(option, dict):
+        config.update(option)
+    return config
+
+
+class LatencyTracker:
+    """Recent request latencies, hedging decisions and wasted tokens, per model."""
+
+    def __init__(self, window=None):
+        self.window = window
+        self.latencies = {}
+        self.decisions = {}
+        self.lock = threading.Lock()
+
+    def _recent(self, values, model):
+        if model not in values:
+            values[model] = deque(maxlen=self.window or get_settings()['window'])
+        return values[model]
+
+    def record(self, model, seconds):
+        """Add the latency of a successful request to ``model``."""
+        with self.lock:
+            self._recent(self.latencies, model).append(seconds)
+
+    def threshold(self, model, percentile, min_samples=1):
+        """Return the ``percentile`` latency of ``model``, or None with fewer than ``min_samples`` samples."""
+        with self.lock:
+            latencies = sorted(self.latencies.get(model, ()))
+        if not latencies or len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def allow(self, model, max_ratio):
+        """
+        Whether another hedge keeps ``model`` within ``max_ratio`` hedges per
+        request, and within ``max_ratio`` tokens wasted on losing requests per
+        token requested.
+        """
+        with self.lock:
+            decisions = list(self.decisions.get(model, ()))
+        hedges = sum(hedged for hedged, _, _ in decisions)
+        if hedges + 1 > max_ratio * max(len(decisions), 1):
+            return False
+        return sum(wasted for _, _, wasted in decisions) <= max_ratio * sum(tokens for _, tokens, _ in decisions)
+
+    def count(self, model, hedged, tokens=0):
+        """
+        Note whether a request to ``model`` of about ``tokens`` tokens was hedged.
+
+        Returns:
+            list: The request's record, to pass to :meth:`waste`.
+        """
+        record = [hedged, tokens, 0]
+        with self.lock:
+            self._recent(self.decisions, model).append(record)
+        return record
+
+    def waste(self, record, tokens):
+        """Add ``tokens`` spent by the abandoned request of the hedged request ``record``."""
+        with self.lock:
+            record[2] += tokens
+
+    def reset(self):
+        with self.lock:
+            self.latencies.clear()
+            self.decisions.clear()
+
+
+TRACKER = LatencyTracker()
+
+
+def _start(name, fn, results, context):
+    def target():
+        try:
+            results.put((name, True, context.run(fn)))
+        except Exception as e:
+            results.put((name, False, e))
+        finally:
+            close_old_connections()
+
+    thread = threading.Thread(target=target, name=f'llm-{name}', daemon=True)
+    thread.start()
+    return thread
+
+
+def _settle(results, record, tokens, on_abandoned):
+    """Wait in the background for the losing request and account for its tokens."""
+    def target():
+        name, ok, value = results.get()
+        used = None
+        try:
+            if on_abandoned is not None:
+                used = on_abandoned(name, ok, value)
+        except Exception as e:
+            logger.error(f"Could not record the usage of an abandoned {name} request: {str(e)}")
+        finally:
+            close_old_connections()
+        TRACKER.waste(record, tokens if used is None else used)
+
+    thread = threading.Thread(target=target, name='llm-abandoned', daemon=True)
+    thread.start()
+    return thread
+
+
+def hedged(request, model, hedge_request, hedge_model, config, tokens=0, on_abandoned=None):
+    """
+    Run ``request`` and, if it is slow, ``hedge_request`` alongside it.
+
+    Args:
+        request: Callable making the original request.
+        model: Name the original request's latency is tracked under.
+        hedge_request: Callable making the duplicate request.
+        hedge_model: Name of the model the duplicate goes to.
+        config: Hedging settings, as returned by :func:`get_config`.
+        tokens: Estimated tokens of the request, checked against ``max_tokens``.
+        on_abandoned: Callable run once the losing request finishes, with its
+            name, whether it succeeded, and its result or error. It returns
+            the tokens the request used, or None to count ``tokens``.
+
+    Returns:
+        tuple: The first successful result, and ``'primary'`` or ``'hedge'``
+        for the request it came from.
+
+    Raises:
+        Exception: What the original request raised, if no request succeeded.
+    """
+    threshold = TRACKER.threshold(model, config['percentile'], config['min_samples'])
+    if threshold is None or (config['max_tokens'] and tokens > config['max_tokens']):
+        TRACKER.count(model, False, tokens)
+        return request(), 'primary'
+    delay = max(threshold, config['min_delay'])
+
+    results = queue.Queue()
+    # The original request keeps the caller's context, so its output streams
+    # and its spans nest as they would without hedging
+    _start('primary', request, results, contextvars.copy_context())
+    try:
+        first = results.get(timeout=delay)
+    except queue.Empty:
+        first = None
+    if first is not None:
+        TRACKER.count(model, False, tokens)
+        name, ok, value = first
+        if ok:
+            return value, name
+        raise value
+    if not TRACKER.allow(model, config['max_ratio']):
+        TRACKER.count(model, False, tokens)
+        logger.info(f"Not hedging a {delay:.1f}s {model} request: hedge budget used up")
+        name, ok, value = results.get()
+        if ok:
+            return value, name
+        raise value
+
+    record = TRACKER.count(model, True, tokens)
+    logger.info(f"{model} request running over {delay:.1f}s; hedging with {hedge_model}")
+
+    def detached():
+        from .streaming import paused
+        with paused():
+            return hedge_request()
+
+    _start('hedge', detached, results, contextvars.copy_context())
+    errors = {}
+    for _ in range(2):
+        name, ok, value = results.get()
+        if ok:
+            LLM_HEDGES.labels(model=model, winner=name).inc()
+            if not errors:
+                _settle(results, record, tokens, on_abandoned)
+            return value, name
+        errors[name] = value
+    LLM_HEDGES.labels(model=model, winner='none').inc()
+    raise errors['primary']
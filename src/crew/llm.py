@@ -0,0 +1,116 @@
+"""
+Entry point for running CrewAI crews.
+
+Every LLM-bound ``Crew.kickoff()`` goes through :func:`kickoff`, so rate
+limiting applies uniformly to single-task runs and whole-crew runs, and
+agents that opt in get their slow calls hedged (see :mod:`crew.hedging`).
+"""
+import time
+
+from .metrics import LLM_ERRORS, LLM_LATENCY
+from .profiling import span
+from .ratelimit import get_limiter, limit_key
+
+# Rough characters-per-token ratio used when no tokenizer is involved.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheaply estimate the number of tokens in ``text``."""
+    return len(text or '') // CHARS_PER_TOKEN
+
+
+def kickoff(crew, llm_configs, prompt='', inputs=None, build_hedge=None, on_abandoned=None):
+    """
+    Run ``crew.kickoff()`` within the rate limits of its agents' models.
+
+    Args:
+        crew: A ``crewai.Crew`` ready to run.
+        llm_configs: The ``llm_config`` of the agent doing the work, or a
+            list of them (one per task) when a whole crew is kicked off.
+        prompt: Prompt text used to estimate the tokens the call will use.
+        inputs: Values for ``{placeholders}`` in task descriptions, passed
+            to ``crew.kickoff(inputs=...)``.
+        build_hedge: Callable returning a copy of ``crew`` whose agent uses
+            the ``llm_config`` it is given. When set and the agent's
+            ``llm_config`` opts in, slow calls are hedged with a duplicate
+            run of that copy (see :mod:`crew.hedging`).
+        on_abandoned: Callable run in the background once the request that
+            lost a hedge finishes, with its result (None if it failed), its
+            crew and its ``llm_config``. It returns the tokens the request
+            used, or None if they are not known.
+
+    Returns:
+        The result of ``crew.kickoff()``, or of the hedge if it answered first.
+    """
+    if isinstance(llm_configs, dict):
+        llm_configs = [llm_configs]
+    llm_configs = list(llm_configs) or [{}]
+    limiter = get_limiter()
+
+    def tokens_for(config):
+        return estimate_tokens(prompt) + int(config.get('max_tokens') or 0)
+
+    def request(crew, config):
+        model = model_label(config)
+
+        def run():
+            started = time.perf_counter()
+            try:
+                with span('llm.request', model=model):
+                    result = crew.kickoff(inputs=inputs) if inputs else crew.kickoff()
+            except Exception:
+                LLM_ERRORS.labels(model=model).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                LLM_LATENCY.labels(model=model).observe(elapsed)
+            if hedge_config is not None:
+                hedging.TRACKER.record(model, elapsed)
+            return result
+
+        return limiter.call(run, config, tokens=tokens_for(config))
+
+    config = llm_configs[0]
+    model = model_label(config)
+    hedge_config = None
+    if build_hedge is not None and len(llm_configs) == 1:
+        from . import hedging
+        hedge_config = hedging.get_config(config)
+
+    with span('llm.kickoff', model=model) as attributes:
+        # Each additional task is at least one more request against its model.
+        for other in llm_configs[1:]:
+            limiter.acquire(other, tokens_for(other))
+        if hedge_config is None:
+            return request(crew, config)
+
+        fallback = {**config, 'model': hedge_config['fallback_model']} if hedge_config['fallback_model'] else config
+        hedge_crews = []
+
+        def hedge_request():
+            hedge_crews.append(build_hedge(fallback))
+            return request(hedge_crews[0], fallback)
+
+        def abandoned(name, ok, value):
+            if on_abandoned is None:
+                return None
+            if name == 'primary':
+                return on_abandoned(value if ok else None, crew, config)
+            return on_abandoned(value if ok else None, hedge_crews[0] if hedge_crews else None, fallback)
+
+        result, attributes['answered_by'] = hedging.hedged(
+            lambda: request(crew, config),
+            model,
+            hedge_request,
+            model_label(fallback),
+            hedge_config,
+            tokens=tokens_for(config),
+            on_abandoned=abandoned,
+        )
+        return result
+
+
+def model_label(llm_config):
+    """Return the ``provider/model`` name an ``llm_config`` is measured under."""
+    return '/'.join(filter(None, limit_key(llm_config)))
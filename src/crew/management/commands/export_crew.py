@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crew.models import CrewInstance
+from crew.transfer import export_crew
+
+
+class Command(BaseCommand):
+    help = "Export a crew or flow, with its sub-crews, agents and tasks, as JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('crew_id', type=int, help="ID of the root CrewInstance to export")
+        parser.add_argument('-o', '--output', help="Output file (defaults to stdout)")
+        parser.add_argument('--gzip', action='store_true', help="Gzip the export")
+        parser.add_argument(
+            '--include-outputs',
+            action='store_true',
+            help="Include task status and outputs instead of exporting pending tasks",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            crew = CrewInstance.objects.get(pk=options['crew_id'])
+        except CrewInstance.DoesNotExist:
+            raise CommandError(f"Crew {options['crew_id']} does not exist")
+
+        if options['output']:
+            with open(options['output'], 'wb') as stream:
+                export_crew(crew, stream, options['include_outputs'], options['gzip'])
+            self.stdout.write(self.style.SUCCESS(f"Exported crew '{crew.name}' to {options['output']}"))
+        else:
+            export_crew(crew, sys.stdout.buffer, options['include_outputs'], options['gzip'])
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crew.models import Execution
+from crew.profiling import export_execution
+
+
+class Command(BaseCommand):
+    help = "Append the recorded timing spans of executions to a file as OTLP/JSON, one trace per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument('execution_ids', nargs='*', type=int, help="Executions to export")
+        parser.add_argument('--crew', type=int, help="Export every profiled execution of this crew")
+        parser.add_argument('-o', '--output', required=True, help="File to append the traces to")
+
+    def handle(self, *args, **options):
+        executions = Execution.objects.select_related('crew').exclude(profile={})
+        if options['execution_ids']:
+            executions = executions.filter(pk__in=options['execution_ids'])
+        elif options['crew']:
+            executions = executions.filter(crew_id=options['crew'])
+        else:
+            raise CommandError("Give execution ids or --crew")
+
+        count = 0
+        for execution in executions.order_by('pk'):
+            export_execution(execution, options['output'])
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} trace(s) to {options['output']}"))
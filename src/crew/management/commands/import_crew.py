@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from crew.transfer import CrewImportError, import_crew
+
+
+class Command(BaseCommand):
+    help = "Import a crew export written by export_crew."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Export file, plain or gzipped JSON Lines")
+        parser.add_argument('--owner', required=True, help="Username of the owner of the imported crews")
+        parser.add_argument('--name', help="New name for the root crew")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['owner']}' does not exist")
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                crew, counts = import_crew(stream, owner, options['name'], options['batch_size'])
+        except (OSError, CrewImportError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported crew '{crew.name}' (id {crew.pk}): {counts['crews']} crews, "
+            f"{counts['agents']} agents, {counts['tasks']} tasks, {counts['dependencies']} dependencies"
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crew.heartbeat import get_settings, reap_stale_executions
+
+
+class Command(BaseCommand):
+    help = "Fail or requeue running executions whose worker stopped sending heartbeats."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help="Seconds between checks for stale executions",
+        )
+        parser.add_argument('--policy', choices=['fail', 'requeue'], help="Override CREW_REAPER['policy']")
+        parser.add_argument('--once', action='store_true', help="Check once and exit")
+
+    def handle(self, *args, **options):
+        config = get_settings()
+        if options['policy']:
+            config['policy'] = options['policy']
+        while True:
+            for execution, action in reap_stale_executions(config=config):
+                self.stdout.write(f"Execution {execution.pk} of '{execution.crew.name}' {action}")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crew.artifacts import render_pending
+
+
+class Command(BaseCommand):
+    help = "Render pending exports of crew outputs to HTML, Markdown or PDF documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help="Seconds between checks for pending exports",
+        )
+        parser.add_argument('--once', action='store_true', help="Render pending exports once and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            for artifact in render_pending():
+                self.stdout.write(f"{artifact}: {artifact.status}")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from crew.scheduler import ExecutionScheduler
+
+
+class Command(BaseCommand):
+    help = "Run queued crew executions, picking fairly across owners within the configured limits."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-c', '--concurrency',
+            type=int,
+            default=1,
+            help="Number of executions this worker runs at once",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help="Seconds to wait before checking the queue again when it is empty",
+        )
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is runnable")
+
+    def handle(self, *args, **options):
+        scheduler = ExecutionScheduler()
+        concurrency = max(1, options['concurrency'])
+        self.stdout.write(f"Running queued executions with concurrency {concurrency}")
+
+        def work():
+            ran = 0
+            try:
+                while True:
+                    execution = scheduler.run_next()
+                    if execution is not None:
+                        ran += 1
+                        self.stdout.write(f"Execution {execution.pk} of '{execution.crew.name}' finished")
+                        continue
+                    if options['once']:
+                        return ran
+                    time.sleep(options['poll_interval'])
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            ran = sum(future.result() for future in [pool.submit(work) for _ in range(concurrency)])
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} execution(s)"))
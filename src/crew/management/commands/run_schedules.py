@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crew.schedules import run_due_schedules
+
+
+class Command(BaseCommand):
+    help = "Queue executions of crews whose schedules are due; run_executions runs them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30.0,
+            help="Seconds between checks for due schedules",
+        )
+        parser.add_argument('--once', action='store_true', help="Check once and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            for execution in run_due_schedules():
+                self.stdout.write(f"Queued execution {execution.pk} of '{execution.crew.name}'")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
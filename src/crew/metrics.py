@@ -0,0 +1,68 @@
+"""
+Metrics of crew execution, registered with :data:`core.metrics.REGISTRY`.
+
+Events (finished executions, task and LLM durations, queue waits) are
+recorded where they happen; current state (executions by status, queue
+depth) is read from the database when ``/metrics`` is scraped.
+"""
+from django.db.models import Count
+
+from core.metrics import REGISTRY
+
+EXECUTIONS_FINISHED = REGISTRY.counter(
+    'scriptcrew_executions_finished_total', 'Finished executions by status', ['status']
+)
+TASK_DURATION = REGISTRY.histogram(
+    'scriptcrew_task_duration_seconds', 'Task run time, including retries, by status', ['status']
+)
+LLM_LATENCY = REGISTRY.histogram(
+    'scriptcrew_llm_request_duration_seconds', 'LLM request latency by model', ['model']
+)
+LLM_ERRORS = REGISTRY.counter(
+    'scriptcrew_llm_request_errors_total', 'Failed LLM requests by model', ['model']
+)
+EXECUTIONS_REAPED = REGISTRY.counter(
+    'scriptcrew_executions_reaped_total', 'Executions recovered after their worker died, by action', ['action']
+)
+LLM_HEDGES = REGISTRY.counter(
+    'scriptcrew_llm_hedged_requests_total', 'Hedged LLM requests by model and the request that answered first',
+    ['model', 'winner']
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    'scriptcrew_llm_rate_limit_wait_seconds',
+    'Time LLM calls waited for rate limit capacity, by limit and what they waited for (budget or slot)',
+    ['limit', 'kind']
+)
+RATE_LIMITED = REGISTRY.counter(
+    'scriptcrew_llm_rate_limited_total', 'LLM calls the provider rejected as rate limited and that were retried',
+    ['limit']
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    'scriptcrew_queue_wait_seconds', 'Time executions spent queued before starting, by priority', ['priority']
+)
+CONTEXT_OMITTED_TOKENS = REGISTRY.counter(
+    'scriptcrew_context_omitted_tokens_total', 'Dependency output tokens trimmed from prompts, by strategy',
+    ['strategy']
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    'scriptcrew_prompt_tokens', 'Estimated tokens of assembled task prompts',
+    buckets=(256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+)
+
+
+@REGISTRY.collector
+def execution_state():
+    from .models import Execution
+
+    by_status = {
+        (row['status'],): row['count']
+        for row in Execution.objects.values('status').annotate(count=Count('id')).order_by()
+    }
+    queued = {
+        (row['priority'],): row['count']
+        for row in Execution.objects.filter(status='queued').values('priority').annotate(count=Count('id')).order_by()
+    }
+    return [
+        ('scriptcrew_executions', 'Executions by status', by_status, ('status',)),
+        ('scriptcrew_queue_depth', 'Queued executions by priority', queued, ('priority',)),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0002_crewinstance_last_executed_crewinstance_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crewinstance',
+            name='is_template',
+            field=models.BooleanField(default=False, help_text='Whether this crew is a template that other crews are instantiated from'),
+        ),
+        migrations.AddField(
+            model_name='crewinstance',
+            name='overrides',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-agent and per-task field overrides applied on top of the template'),
+        ),
+        migrations.AddField(
+            model_name='crewinstance',
+            name='template',
+            field=models.ForeignKey(blank=True, help_text='Template this crew was instantiated from; its agents and tasks are shared until copied', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='instances', to='crew.crewinstance'),
+        ),
+    ]
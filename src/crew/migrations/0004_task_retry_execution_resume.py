@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0003_crewinstance_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='resumed_from',
+            field=models.ForeignKey(blank=True, help_text='Earlier execution this one resumed', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumptions', to='crew.execution'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Attempts made in the current run'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='retry_policy',
+            field=models.JSONField(blank=True, default=dict, help_text='Overrides of the crew\'s retry policy, e.g. {"max_attempts": 3, "base_delay": 2}'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('crew', '0004_task_retry_execution_resume'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('total_tokens', models.PositiveIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('cost', models.DecimalField(decimal_places=6, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usage', to='crew.agent')),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='crew.crewinstance')),
+                ('execution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usage', to='crew.execution')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='llm_usage', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='crew.task')),
+            ],
+            options={
+                'verbose_name': 'Task Usage',
+                'verbose_name_plural': 'Task Usage',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['owner', 'created_at'], name='crew_taskus_owner_i_a70b03_idx'), models.Index(fields=['crew', 'created_at'], name='crew_taskus_crew_id_187079_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('model', models.CharField(max_length=255)),
+                ('prompt_tokens', models.PositiveBigIntegerField(default=0)),
+                ('completion_tokens', models.PositiveBigIntegerField(default=0)),
+                ('total_tokens', models.PositiveBigIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('cost', models.DecimalField(decimal_places=6, default=0, max_digits=14)),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to='crew.crewinstance')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_llm_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Usage',
+                'verbose_name_plural': 'Daily Usage',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['owner', 'date'], name='crew_dailyu_owner_i_156355_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyusage',
+            constraint=models.UniqueConstraint(fields=('date', 'owner', 'crew', 'model'), name='unique_daily_usage'),
+        ),
+    ]
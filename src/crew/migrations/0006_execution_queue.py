@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0005_usage_accounting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='keep_completed',
+            field=models.BooleanField(default=False, help_text='Keep completed tasks and only run the remaining ones'),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='execution',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('stopped', 'Stopped')], default='running', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='execution',
+            index=models.Index(fields=['status', 'queued_at'], name='crew_execut_status_992941_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0006_execution_queue'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='execution',
+            name='crew_execut_status_992941_idx',
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='priority',
+            field=models.CharField(choices=[('interactive', 'Interactive'), ('batch', 'Batch')], default='batch', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='task',
+            field=models.ForeignKey(blank=True, help_text='Set when only this task is run instead of the whole crew', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='executions', to='crew.task'),
+        ),
+        migrations.AddIndex(
+            model_name='execution',
+            index=models.Index(fields=['status', 'priority', 'queued_at'], name='crew_execut_status_f700ef_idx'),
+        ),
+    ]
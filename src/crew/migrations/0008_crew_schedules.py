@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0007_execution_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrewSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cron_expression', models.CharField(help_text='Five-field cron expression (minute hour day month weekday) or a shortcut such as @daily', max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('priority', models.CharField(choices=[('interactive', 'Interactive'), ('batch', 'Batch')], default='batch', max_length=20)),
+                ('jitter_seconds', models.PositiveIntegerField(default=300, help_text='Spread the start over up to this many seconds after the scheduled time')),
+                ('allow_overlap', models.BooleanField(default=False, help_text='Queue a run even if the previous one is still queued or running')),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='crew.crewinstance')),
+                ('last_execution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crew.execution')),
+            ],
+            options={
+                'ordering': ['next_run_at'],
+                'indexes': [models.Index(fields=['is_active', 'next_run_at'], name='crew_crewsc_is_acti_e1e29c_idx')],
+            },
+        ),
+    ]
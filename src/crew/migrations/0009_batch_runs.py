@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0008_crew_schedules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_file', models.FileField(help_text='JSON Lines, one input record per line', upload_to='batches/inputs/')),
+                ('output_file', models.FileField(blank=True, upload_to='batches/results/')),
+                ('concurrency', models.PositiveIntegerField(default=4)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('completed_items', models.PositiveIntegerField(default=0)),
+                ('failed_items', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_runs', to='crew.crewinstance')),
+                ('execution', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batch', to='crew.execution')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0009_batch_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='profile',
+            field=models.JSONField(blank=True, default=dict, help_text='Timing spans recorded during the run'),
+        ),
+    ]
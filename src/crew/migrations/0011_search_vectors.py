@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# tsvector columns maintained by triggers (see crew/search.py). PostgreSQL
+# only: on other databases search falls back to substring matching.
+SEARCH_VECTORS = {
+    'crew_task': """
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.expected_output, '')), 'C') ||
+        setweight(jsonb_to_tsvector('english', coalesce(NEW.output_data, '{}'::jsonb), '["string"]'), 'D')
+    """,
+    'crew_agent': """
+        setweight(to_tsvector('english', coalesce(NEW.name, '') || ' ' || coalesce(NEW.custom_role, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.backstory, '')), 'C')
+    """,
+}
+SEARCHED_COLUMNS = {
+    'crew_task': ('name', 'description', 'expected_output', 'output_data'),
+    'crew_agent': ('name', 'custom_role', 'description', 'backstory'),
+}
+
+
+def create_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, vector in SEARCH_VECTORS.items():
+        columns = SEARCHED_COLUMNS[table]
+        changed = ' OR '.join(f'OLD.{column} IS DISTINCT FROM NEW.{column}' for column in columns)
+        schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector')
+        schema_editor.execute(f"""
+            CREATE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' OR {changed} THEN
+                    NEW.search_vector := {vector};
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        schema_editor.execute(
+            f'CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()'
+        )
+        # Fill the column for existing rows; the trigger leaves it alone as no searched column changes
+        schema_editor.execute(f"UPDATE {table} SET search_vector = {vector.replace('NEW.', '')}")
+        schema_editor.execute(f'CREATE INDEX {table}_search_vector ON {table} USING gin (search_vector)')
+
+
+def drop_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in SEARCH_VECTORS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_search_vector ON {table}')
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS {table}_search_vector()')
+        schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0010_execution_profile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vectors, drop_search_vectors),
+    ]
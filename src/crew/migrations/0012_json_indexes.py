@@ -0,0 +1,48 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:47
+
+from django.db import migrations, models
+import django.db.models.fields.json
+
+# GIN indexes for the JSON containment (@>) filters; PostgreSQL only. The
+# input_data index uses jsonb_ops, which also serves the has-key (?) filter.
+GIN_INDEXES = {
+    'agent_llm_config_gin': ('crew_agent', 'llm_config', 'jsonb_path_ops'),
+    'task_input_data_gin': ('crew_task', 'input_data', 'jsonb_ops'),
+}
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, (table, column, opclass) in GIN_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX {name} ON {table} USING gin ({column} {opclass})')
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0011_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(django.db.models.fields.json.KeyTransform('model', 'llm_config'), name='agent_llm_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(condition=models.Q(('tools', []), _negated=True), fields=['crew'], name='agent_has_tools_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('output_data', {}), _negated=True), fields=['crew'], name='task_has_output_idx'),
+        ),
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0012_json_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('html', 'HTML'), ('markdown', 'Markdown'), ('pdf', 'PDF')], max_length=20)),
+                ('content_hash', models.CharField(help_text='SHA-256 of the format and the exported tasks', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('file', models.FileField(blank=True, upload_to='exports/')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('task_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to='crew.crewinstance')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['crew', 'format', 'content_hash'], name='crew_export_crew_id_22dc60_idx'), models.Index(fields=['status', 'created_at'], name='crew_export_status_ddc6e8_idx')],
+            },
+        ),
+    ]
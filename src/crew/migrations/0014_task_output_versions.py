@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0013_export_artifacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOutputVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('is_delta', models.BooleanField(default=False, help_text='Stored as a delta from the next version')),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0, help_text='Size of the uncompressed output in bytes')),
+                ('checksum', models.CharField(help_text='SHA-1 of the serialized output', max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('execution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='output_versions', to='crew.execution')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='output_versions', to='crew.task')),
+            ],
+            options={
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskoutputversion',
+            constraint=models.UniqueConstraint(fields=('task', 'number'), name='unique_task_output_version'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0014_task_output_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOutputChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('start', models.PositiveBigIntegerField(help_text="Offset of the first character in the run's output")),
+                ('end', models.PositiveBigIntegerField(help_text='Offset after the last character')),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('execution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='output_chunks', to='crew.execution')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='output_chunks', to='crew.task')),
+            ],
+            options={
+                'ordering': ['task', 'sequence'],
+                'indexes': [models.Index(fields=['task', 'end'], name='crew_taskou_task_id_14fd32_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskoutputchunk',
+            constraint=models.UniqueConstraint(fields=('task', 'sequence'), name='unique_task_output_chunk'),
+        ),
+    ]
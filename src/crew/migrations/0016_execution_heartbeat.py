@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0015_task_output_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last sign of life from the worker', null=True),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='requeue_count',
+            field=models.PositiveIntegerField(default=0, help_text='Times the execution was put back in the queue after its worker died'),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='worker',
+            field=models.CharField(blank=True, help_text='Host and process id of the worker running it', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='execution',
+            index=models.Index(fields=['status', 'heartbeat_at'], name='crew_execut_status_4533ab_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:19
+
+from django.db import migrations, models
+
+
+def mark_unmaterialized(apps, schema_editor):
+    # Template-backed crews without agents of their own have not been copied yet
+    CrewInstance = apps.get_model('crew', 'CrewInstance')
+    CrewInstance.objects.filter(template__isnull=False, agents__isnull=True).update(materialized=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0016_execution_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crewinstance',
+            name='materialized',
+            field=models.BooleanField(default=True, help_text='Whether the crew has its own agents and tasks; false until a template-backed crew is copied'),
+        ),
+        migrations.RunPython(mark_unmaterialized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0017_crewinstance_materialized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportartifact',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When rendering was last claimed', null=True),
+        ),
+    ]
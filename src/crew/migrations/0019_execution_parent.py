@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew', '0018_exportartifact_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Flow execution this sub-crew execution runs under', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='crew.execution'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.fields.json import KeyTransform
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 import json
@@ -7,6 +11,18 @@ from django.conf import settings
 User = get_user_model()
 
 
+class LightQuerySet(models.QuerySet):
+    """
+    QuerySet of a model with large JSON and text columns listed in its
+    ``HEAVY_FIELDS``. Querysets load every column by default; pages and
+    loops that only show names and statuses call :meth:`light` instead.
+    """
+
+    def light(self, *keep):
+        """Defer the model's heavy columns, except the ``keep`` ones the caller reads."""
+        return self.defer(*[name for name in self.model.HEAVY_FIELDS if name not in keep])
+
+
 class CrewInstance(models.Model):
     """
     A CrewAI instance that can represent:
@@ -43,11 +59,35 @@ class CrewInstance(models.Model):
         help_text="Configuration including routing and state management for flows",
         blank=True
     )
+    is_template = models.BooleanField(
+        default=False,
+        help_text="Whether this crew is a template that other crews are instantiated from"
+    )
+    template = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='instances',
+        help_text="Template this crew was instantiated from; its agents and tasks are shared until copied"
+    )
+    overrides = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Per-agent and per-task field overrides applied on top of the template"
+    )
+    materialized = models.BooleanField(
+        default=True,
+        help_text="Whether the crew has its own agents and tasks; false until a template-backed crew is copied"
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='idle')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_executed = models.DateTimeField(null=True, blank=True)
 
+    objects = LightQuerySet.as_manager()
+    HEAVY_FIELDS = ('config', 'overrides')
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Crew Instance'
@@ -67,6 +107,31 @@ class CrewInstance(models.Model):
     @property
     def is_running(self):
         return self.status == 'running'
+
+    @property
+    def is_materialized(self) -> bool:
+        """Whether this crew owns its agents and tasks rather than sharing its template's."""
+        return self.template_id is None or self.materialized
+
+    def get_agents(self):
+        """
+        Return the agents of this crew.
+
+        For a crew instantiated from a template that has not been copied yet,
+        these are the template's agents with this crew's overrides applied.
+        They are unsaved views of the template rows and must not be saved.
+        """
+        if self.is_materialized:
+            return list(self.agents.all())
+        from .cloning import apply_overrides
+        return apply_overrides(self.template.get_agents(), self.overrides.get('agents', {}))
+
+    def get_tasks(self):
+        """Return the tasks of this crew, resolved through the template like :meth:`get_agents`."""
+        if self.is_materialized:
+            return list(self.tasks.all())
+        from .cloning import apply_overrides
+        return apply_overrides(self.template.get_tasks(), self.overrides.get('tasks', {}))
     
     @property
     def status_display(self):
@@ -93,6 +158,9 @@ class CrewInstance(models.Model):
             except json.JSONDecodeError:
                 raise ValidationError({'config': 'Invalid JSON format'})
                 
+        if self.template_id and self.template_id == self.id:
+            raise ValidationError({'template': 'A crew cannot be its own template'})
+
         # Prevent circular parent-child relationships
         if self.parent_crew and self.parent_crew.id == self.id:
             raise ValidationError({'parent_crew': 'A crew cannot be its own parent'})
@@ -110,123 +178,20 @@ class CrewInstance(models.Model):
         self.clean()
         super().save(*args, **kwargs)
         
-    def execute(self):
+    def execute(self, resume=False):
         """
         Execute this crew instance using CrewAI.
         For flows, execute sub-crews in the defined order.
+
+        Args:
+            resume: Keep the output of tasks that already completed and only
+                run the remaining ones.
+
+        Returns:
+            dict: Summary of the run (see ``CrewExecutor.execute``).
         """
-        from django.utils import timezone
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        logger.info(f"Starting execution of crew: {self.name}")
-        
-        try:
-            if self.is_flow:
-                # For flows, execute sub-crews in sequence or as defined in config
-                logger.info(f"Executing flow: {self.name}")
-                
-                # Get all sub-crews
-                sub_crews = self.sub_crews.all()
-                if not sub_crews.exists():
-                    logger.warning(f"Flow {self.name} has no sub-crews to execute.")
-                    return
-                
-                # Check if execution order is specified in config
-                execution_order = self.config.get('execution_order', [])
-                if execution_order:
-                    # Execute in specified order
-                    for subcrew_id in execution_order:
-                        try:
-                            subcrew = self.sub_crews.get(id=subcrew_id)
-                            subcrew.execute()
-                        except CrewInstance.DoesNotExist:
-                            logger.error(f"Could not find sub-crew with ID {subcrew_id}")
-                        except Exception as e:
-                            logger.error(f"Error executing sub-crew {subcrew_id}: {str(e)}")
-                else:
-                    # Execute all sub-crews in sequence
-                    for subcrew in sub_crews:
-                        try:
-                            subcrew.execute()
-                        except Exception as e:
-                            logger.error(f"Error executing sub-crew {subcrew.id}: {str(e)}")
-            else:
-                # For regular crews, create a CrewAI instance
-                try:
-                    # Placeholder for CrewAI integration
-                    # This is where we would create a CrewAI Crew instance
-                    # and execute it with the configured agents and tasks
-                    
-                    # Import CrewAI (assuming it's installed)
-                    from crewai import Crew, Agent, Task as CrewAITask
-                    
-                    # Create CrewAI agents from our Agent models
-                    agents = []
-                    for agent_model in self.agents.all():
-                        agent = agent_model.create_crewai_agent()
-                        if agent:
-                            agents.append(agent)
-                    
-                    if not agents:
-                        logger.warning(f"Crew {self.name} has no agents to execute.")
-                        return
-                    
-                    # Create CrewAI tasks from our Task models
-                    tasks = []
-                    task_mapping = {}  # Map our Task models to CrewAI Task objects
-                    
-                    for task_model in self.tasks.all():
-                        if task_model.status != 'pending':
-                            continue
-                            
-                        # Update status to in_progress
-                        task_model.status = 'in_progress'
-                        task_model.started_at = timezone.now()
-                        task_model.save()
-                        
-                        # Create CrewAI task
-                        crewai_task = task_model.create_crewai_task()
-                        if crewai_task:
-                            tasks.append(crewai_task)
-                            task_mapping[crewai_task] = task_model
-                    
-                    if not tasks:
-                        logger.warning(f"Crew {self.name} has no tasks to execute.")
-                        return
-                    
-                    # Create and run the CrewAI Crew
-                    crew = Crew(
-                        agents=agents,
-                        tasks=tasks,
-                        verbose=self.config.get('verbose', True)
-                    )
-                    
-                    # Execute the crew
-                    results = crew.kickoff()
-                    
-                    # Process results and update task models
-                    for i, result in enumerate(results):
-                        if i < len(tasks):
-                            crewai_task = tasks[i]
-                            task_model = task_mapping.get(crewai_task)
-                            if task_model:
-                                task_model.status = 'completed'
-                                task_model.output_data = {'result': result}
-                                task_model.completed_at = timezone.now()
-                                task_model.save()
-                                
-                    logger.info(f"Successfully executed crew: {self.name}")
-                    
-                except ImportError:
-                    logger.error("CrewAI library not installed")
-                except Exception as e:
-                    logger.error(f"Error executing crew {self.name}: {str(e)}")
-                    raise
-                
-        except Exception as e:
-            logger.error(f"Failed to execute crew {self.name}: {str(e)}")
-            raise
+        from .execution import CrewExecutor
+        return CrewExecutor(self).execute(resume=resume)
 
 
 class Agent(models.Model):
@@ -259,10 +224,18 @@ class Agent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LightQuerySet.as_manager()
+    HEAVY_FIELDS = ('description', 'goals', 'backstory', 'tools', 'llm_config')
+
     class Meta:
         ordering = ['crew', 'role', 'name']
         verbose_name = 'Agent'
         verbose_name_plural = 'Agents'
+        # Index the predicates of AgentFilter's llm_model and has_tools filters
+        indexes = [
+            models.Index(KeyTransform('model', 'llm_config'), name='agent_llm_model_idx'),
+            models.Index(fields=['crew'], condition=~Q(tools=[]), name='agent_has_tools_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.get_role_display()} in {self.crew.name})"
@@ -301,9 +274,12 @@ class Agent(models.Model):
         self.clean()
         super().save(*args, **kwargs)
         
-    def create_crewai_agent(self):
+    def create_crewai_agent(self, llm_config=None):
         """
         Create a CrewAI Agent instance from this model.
+
+        Args:
+            llm_config: LLM settings to use instead of ``self.llm_config``.
         
         Returns:
             crewai.Agent: A CrewAI Agent instance
@@ -315,7 +291,8 @@ class Agent(models.Model):
         try:
             # Import CrewAI (assuming it's installed)
             from crewai import Agent as CrewAIAgent
-            
+            from .context import LLM_CONFIG_KEYS
+
             # Create and return a CrewAI Agent instance
             agent = CrewAIAgent(
                 role=self.effective_role,
@@ -323,8 +300,12 @@ class Agent(models.Model):
                 backstory=self.backstory,
                 verbose=self.verbose,
                 allow_delegation=self.allow_delegation,
-                # Convert JSON config to proper kwargs
-                **self.llm_config
+                # Convert JSON config to proper kwargs, less the keys that
+                # configure prompt assembly
+                **{
+                    key: value for key, value in (llm_config or self.llm_config).items()
+                    if key not in LLM_CONFIG_KEYS
+                }
             )
             
             # If additional goals exist, add them as secondary goals
@@ -346,6 +327,24 @@ class Agent(models.Model):
             return None
 
 
+class TaskQuerySet(LightQuerySet):
+
+    def with_readiness(self):
+        """
+        Annotate ``dependencies_complete``: whether every task this one
+        depends on has completed. Computed in the same query, with a
+        ``NOT EXISTS`` over the dependency table.
+        """
+        blocking = Task.depends_on.through.objects.filter(from_task=OuterRef('pk')).exclude(
+            to_task__status='completed'
+        )
+        return self.annotate(dependencies_complete=~Exists(blocking))
+
+    def ready(self):
+        """Tasks that have not completed and whose dependencies all have."""
+        return self.with_readiness().filter(dependencies_complete=True).exclude(status='completed')
+
+
 class Task(models.Model):
     """A task assigned to an agent within a crew."""
     STATUS_CHOICES = [
@@ -385,6 +384,12 @@ class Task(models.Model):
     input_data = models.JSONField(default=dict)
     output_data = models.JSONField(default=dict, blank=True)
     error_message = models.TextField(blank=True)
+    retry_policy = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Overrides of the crew's retry policy, e.g. {\"max_attempts\": 3, \"base_delay\": 2}"
+    )
+    attempts = models.PositiveIntegerField(default=0, help_text="Attempts made in the current run")
     output_file = models.CharField(
         max_length=255,
         blank=True,
@@ -395,10 +400,18 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+    HEAVY_FIELDS = (
+        'description', 'expected_output', 'context', 'input_data', 'output_data', 'error_message', 'retry_policy'
+    )
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
+        indexes = [
+            models.Index(fields=['crew'], condition=~Q(output_data={}), name='task_has_output_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.status} - {self.agent.name})"
@@ -450,10 +463,14 @@ class Task(models.Model):
         self.clean()
         super().save(*args, **kwargs)
         
-    def create_crewai_task(self):
+    def create_crewai_task(self, description=None):
         """
         Create a CrewAI Task instance from this model.
-        
+
+        Args:
+            description: The prompt to use; defaults to the task's assembled
+                context (see :mod:`crew.context`).
+
         Returns:
             crewai.Task: A CrewAI Task instance
         """
@@ -471,12 +488,16 @@ class Task(models.Model):
                 logger.error(f"Could not create CrewAI agent for task {self.name}")
                 return None
                 
-            # Create the task
+            if description is None:
+                from .context import assemble_context
+                description = assemble_context(self).text
+
+            # Create the task; dependency outputs and context entries are
+            # already part of the description
             task = CrewAITask(
-                description=self.description,
+                description=description,
                 expected_output=self.expected_output,
                 agent=crewai_agent,
-                context=self.context,
                 async_execution=False
             )
             
@@ -489,19 +510,32 @@ class Task(models.Model):
             logger.error(f"Error creating CrewAI task for {self.name}: {str(e)}")
             return None
         
-    def execute(self):
+    def execute(self, retry_policy=None, execution=None, check_dependencies=True):
         """
         Execute this task using CrewAI.
-        Updates the status, output_data, and error_message.
+        Updates the status, output_data, and error_message, and records the
+        output as a new output version.
+
+        Transient failures (timeouts, rate limits, 5xx responses) are retried
+        with jittered exponential backoff according to the task's retry policy.
+
+        Args:
+            retry_policy: A ``RetryPolicy`` to use instead of the task's own.
+            execution: The crew Execution this run is part of, if any.
+            check_dependencies: Fail the task if its dependencies have not
+                completed. Callers that already checked pass False.
         """
         from django.utils import timezone
+        from .profiling import span
+        from .retry import RetryPolicy
         import logging
+        import time
         
         logger = logging.getLogger(__name__)
         logger.info(f"Starting execution of task: {self.name}")
         
         # Validate dependencies
-        if not self.check_dependencies_complete():
+        if check_dependencies and not self.check_dependencies_complete():
             msg = f"Cannot execute task {self.name} because dependencies are not complete."
             logger.error(msg)
             self.status = 'failed'
@@ -509,74 +543,222 @@ class Task(models.Model):
             self.completed_at = timezone.now()
             self.save()
             return
-            
-        try:
-            # Update status to in_progress
-            self.status = 'in_progress'
-            self.started_at = timezone.now()
+
+        policy = retry_policy or RetryPolicy.for_task(self)
+        # Every run gets the full number of attempts
+        self.attempts = 0
+        while True:
+            self.attempts += 1
+            try:
+                with span('task.attempt', attempt=self.attempts):
+                    self._execute_attempt(execution)
+                break
+            except ImportError:
+                msg = "CrewAI library not installed"
+                logger.error(msg)
+                self.status = 'failed'
+                self.error_message = msg
+                self.completed_at = timezone.now()
+                self.save()
+                return
+            except Exception as e:
+                if policy.should_retry(e, self.attempts):
+                    delay = policy.delay(self.attempts)
+                    logger.warning(
+                        f"Attempt {self.attempts} of task {self.name} failed ({str(e)}); "
+                        f"retrying in {delay:.1f}s"
+                    )
+                    self.error_message = f"Attempt {self.attempts} failed: {str(e)}"
+                    self.save(update_fields=['attempts', 'error_message', 'updated_at'])
+                    time.sleep(delay)
+                    continue
+                msg = f"Error executing task: {str(e)}"
+                logger.error(msg)
+                self.status = 'failed'
+                self.error_message = msg
+                self.completed_at = timezone.now()
+                self.save()
+                raise
+
+        if self.status == 'completed':
+            from .versions import record_version
+            with span('version.record'):
+                record_version(self, self.output_data, execution=execution)
+
+    def _execute_attempt(self, execution=None):
+        """Run the task once, marking it completed on success and recording token usage."""
+        from django.utils import timezone
+        from .profiling import span
+        import logging
+
+        logger = logging.getLogger(__name__)
+
+        # Update status to in_progress
+        self.status = 'in_progress'
+        self.started_at = timezone.now()
+        self.completed_at = None
+        with span('db.save'):
             self.save()
-            
-            # Import CrewAI (assuming it's installed)
-            from crewai import Crew, Task as CrewAITask
-            
-            # Create CrewAI agent
+
+        # Import CrewAI (assuming it's installed)
+        from crewai import Crew, Task as CrewAITask
+
+        # Create CrewAI agent
+        with span('agent.build', agent=self.agent.name):
             agent = self.agent.create_crewai_agent()
-            if not agent:
+        if not agent:
+            raise ValueError(f"Failed to create CrewAI agent for {self.agent.name}")
+
+        # Create CrewAI task
+        from .context import assemble_context
+        with span('prompt.build') as attributes:
+            context = assemble_context(self)
+            attributes.update(
+                tokens=context.tokens,
+                omitted_tokens=context.omitted_tokens,
+                trimmed=[section['name'] for section in context.trimmed],
+            )
+            task = self.create_crewai_task(description=context.text)
+        if not task:
+            raise ValueError(f"Failed to create CrewAI task for {self.name}")
+
+        # Create a simple Crew with just this task
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            verbose=True
+        )
+
+        def build_hedge(llm_config):
+            # A second crew for a duplicate request, possibly to another model
+            hedge_agent = self.agent.create_crewai_agent(llm_config)
+            if not hedge_agent:
                 raise ValueError(f"Failed to create CrewAI agent for {self.agent.name}")
-                
-            # Create CrewAI task
-            task = self.create_crewai_task()
-            if not task:
-                raise ValueError(f"Failed to create CrewAI task for {self.name}")
-                
-            # Create a simple Crew with just this task
-            crew = Crew(
-                agents=[agent],
-                tasks=[task],
+            return Crew(
+                agents=[hedge_agent],
+                tasks=[CrewAITask(
+                    description=context.text,
+                    expected_output=self.expected_output,
+                    agent=hedge_agent,
+                    async_execution=False
+                )],
                 verbose=True
             )
-            
-            # Execute the crew to run the task
-            results = crew.kickoff()
-            
-            # Process results
-            if results and len(results) > 0:
-                result = results[0]
-                
-                # Update task status
-                self.status = 'completed'
-                self.output_data = {'result': result}
-                self.completed_at = timezone.now()
-                self.save()
-                
-                logger.info(f"Successfully executed task: {self.name}")
-            else:
-                raise ValueError("No results returned from CrewAI execution")
-                
-        except ImportError:
-            msg = "CrewAI library not installed"
-            logger.error(msg)
-            self.status = 'failed'
-            self.error_message = msg
-            self.completed_at = timezone.now()
-            self.save()
-        except Exception as e:
-            msg = f"Error executing task: {str(e)}"
-            logger.error(msg)
-            self.status = 'failed'
-            self.error_message = msg
+
+        def record_abandoned(result, abandoned_crew, llm_config):
+            # The request that lost a hedge was paid for all the same
+            return record_abandoned_usage(
+                self, result, abandoned_crew, llm_config, prompt=context.text, execution=execution
+            )
+
+        # Execute the crew to run the task within the model's rate limits,
+        # persisting streamed output as it arrives
+        from .llm import kickoff
+        from .streaming import stream_output
+        from .usage import extract_usage, record_abandoned_usage, record_usage
+        with stream_output(self, execution):
+            results = kickoff(
+                crew,
+                self.agent.llm_config,
+                prompt=context.text,
+                build_hedge=build_hedge,
+                on_abandoned=record_abandoned,
+            )
+
+        with span('usage.record'):
+            record_usage(self, extract_usage(results, crew), execution=execution)
+
+        # Process results
+        if results and len(results) > 0:
+            result = results[0]
+
+            # Update task status
+            self.status = 'completed'
+            self.output_data = {'result': result}
+            self.error_message = ''
             self.completed_at = timezone.now()
-            self.save()
-            raise
+            with span('db.save'):
+                self.save()
+
+            logger.info(f"Successfully executed task: {self.name}")
+        else:
+            raise ValueError("No results returned from CrewAI execution")
         
     def check_dependencies_complete(self):
         """
         Check if all dependencies are complete.
-        
+
+        Uses the ``dependencies_complete`` annotation of
+        ``Task.objects.with_readiness()`` when present, and otherwise a
+        single ``EXISTS`` query.
+
         Returns:
             bool: True if all dependencies are complete, False otherwise
         """
-        return all(task.status == 'completed' for task in self.depends_on.all())
+        if hasattr(self, 'dependencies_complete'):
+            return self.dependencies_complete
+        return not self.depends_on.exclude(status='completed').exists()
+
+
+class TaskOutputVersion(models.Model):
+    """
+    One recorded output of a task, compressed.
+
+    All but the latest version may be stored as a delta from the next one;
+    see :mod:`crew.versions` for reading and writing versions.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='output_versions')
+    execution = models.ForeignKey(
+        'Execution',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='output_versions'
+    )
+    number = models.PositiveIntegerField()
+    is_delta = models.BooleanField(default=False, help_text="Stored as a delta from the next version")
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(default=0, help_text="Size of the uncompressed output in bytes")
+    checksum = models.CharField(max_length=40, help_text="SHA-1 of the serialized output")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'number'], name='unique_task_output_version'),
+        ]
+
+    def __str__(self):
+        return f"Output v{self.number} of task {self.task_id}"
+
+
+class TaskOutputChunk(models.Model):
+    """A piece of the output a task's LLM streamed during its latest run; see :mod:`crew.streaming`."""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='output_chunks')
+    execution = models.ForeignKey(
+        'Execution',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='output_chunks'
+    )
+    sequence = models.PositiveIntegerField()
+    start = models.PositiveBigIntegerField(help_text="Offset of the first character in the run's output")
+    end = models.PositiveBigIntegerField(help_text="Offset after the last character")
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['task', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'sequence'], name='unique_task_output_chunk'),
+        ]
+        indexes = [
+            models.Index(fields=['task', 'end']),
+        ]
+
+    def __str__(self):
+        return f"Output chunk {self.sequence} of task {self.task_id}"
 
 
 class Execution(models.Model):
@@ -584,17 +766,68 @@ class Execution(models.Model):
     Records details of a specific crew execution
     """
     STATUS_CHOICES = (
+        ('queued', 'Queued'),
         ('running', 'Running'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('stopped', 'Stopped'),
     )
+    PRIORITY_CHOICES = (
+        ('interactive', 'Interactive'),
+        ('batch', 'Batch'),
+    )
     
     crew = models.ForeignKey(CrewInstance, on_delete=models.CASCADE, related_name='executions')
+    task = models.ForeignKey(
+        Task,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='executions',
+        help_text="Set when only this task is run instead of the whole crew"
+    )
+    priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='batch')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
     started_at = models.DateTimeField(auto_now_add=True)
     ended_at = models.DateTimeField(null=True, blank=True)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    keep_completed = models.BooleanField(
+        default=False,
+        help_text="Keep completed tasks and only run the remaining ones"
+    )
     results = models.JSONField(default=dict, blank=True)
+    profile = models.JSONField(default=dict, blank=True, help_text="Timing spans recorded during the run")
+    resumed_from = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='resumptions',
+        help_text="Earlier execution this one resumed"
+    )
+    parent = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='children',
+        help_text="Flow execution this sub-crew execution runs under"
+    )
+    worker = models.CharField(max_length=255, blank=True, help_text="Host and process id of the worker running it")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last sign of life from the worker")
+    requeue_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the execution was put back in the queue after its worker died"
+    )
+
+    objects = LightQuerySet.as_manager()
+    HEAVY_FIELDS = ('results', 'profile')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'queued_at']),
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
     
     @property
     def duration(self):
@@ -609,6 +842,7 @@ class Execution(models.Model):
     @property
     def status_class(self):
         status_classes = {
+            'queued': 'info',
             'running': 'primary',
             'completed': 'success',
             'failed': 'danger',
@@ -616,5 +850,245 @@ class Execution(models.Model):
         }
         return status_classes.get(self.status, 'secondary')
     
+    @property
+    def can_resume(self):
+        # Batch runs keep per-item results in their output file, not in tasks
+        return self.status in ('failed', 'stopped') and not hasattr(self, 'batch')
+
+    @property
+    def timeline(self):
+        """The recorded spans as Gantt chart rows (see ``profiling.timeline``)."""
+        from .profiling import timeline
+        return timeline(self.profile)
+
+    @property
+    def wait_time(self):
+        """Time spent queued before the execution was dispatched."""
+        if self.queued_at and self.status != 'queued':
+            return self.started_at - self.queued_at
+        return None
+
+    def resume(self):
+        """
+        Re-run the crew of this execution, keeping the output of every task
+        that already completed.
+
+        Returns:
+            dict: Summary of the new run (see ``CrewExecutor.execute``).
+        """
+        from .execution import CrewExecutor
+        return CrewExecutor(self.crew).execute(resume=True, resumed_from=self)
+
     def __str__(self):
         return f"Execution {self.id} of {self.crew.name}"
+
+
+class CrewSchedule(models.Model):
+    """A cron-style schedule on which a crew is queued for execution."""
+    crew = models.ForeignKey(CrewInstance, on_delete=models.CASCADE, related_name='schedules')
+    cron_expression = models.CharField(
+        max_length=100,
+        help_text="Five-field cron expression (minute hour day month weekday) or a shortcut such as @daily"
+    )
+    is_active = models.BooleanField(default=True)
+    priority = models.CharField(max_length=20, choices=Execution.PRIORITY_CHOICES, default='batch')
+    jitter_seconds = models.PositiveIntegerField(
+        default=300,
+        help_text="Spread the start over up to this many seconds after the scheduled time"
+    )
+    allow_overlap = models.BooleanField(
+        default=False,
+        help_text="Queue a run even if the previous one is still queued or running"
+    )
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_execution = models.ForeignKey(
+        Execution,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_run_at']
+        indexes = [
+            models.Index(fields=['is_active', 'next_run_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.crew.name} ({self.cron_expression})"
+
+    def clean(self):
+        from .cron import CronExpression
+        try:
+            CronExpression(self.cron_expression).next_after(self._now())
+        except ValueError as e:
+            raise ValidationError({'cron_expression': str(e)})
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        if self.next_run_at is None and self.is_active:
+            self.next_run_at = self.compute_next_run()
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def _now():
+        from django.utils import timezone
+        return timezone.localtime()
+
+    def compute_next_run(self, after=None):
+        """
+        Return the next scheduled time after ``after`` (default now), in
+        local time, plus this schedule's jitter.
+
+        The jitter is derived from the schedule and the slot rather than
+        drawn at random, so every scheduler process computes the same time.
+        """
+        import random
+        from django.utils import timezone
+        from .cron import CronExpression
+
+        after = timezone.localtime(after) if after else self._now()
+        slot = CronExpression(self.cron_expression).next_after(after)
+        offset = random.Random(f"{self.crew_id}:{self.cron_expression}:{slot.isoformat()}").uniform(
+            0, self.jitter_seconds
+        )
+        return slot + timedelta(seconds=offset)
+
+
+class BatchRun(models.Model):
+    """One crew run over many input records, executed as a single Execution."""
+    crew = models.ForeignKey(CrewInstance, on_delete=models.CASCADE, related_name='batch_runs')
+    execution = models.OneToOneField(
+        Execution,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='batch'
+    )
+    input_file = models.FileField(upload_to='batches/inputs/', help_text="JSON Lines, one input record per line")
+    output_file = models.FileField(upload_to='batches/results/', blank=True)
+    concurrency = models.PositiveIntegerField(default=4)
+    total_items = models.PositiveIntegerField(default=0)
+    completed_items = models.PositiveIntegerField(default=0)
+    failed_items = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Batch {self.id} of {self.crew.name}"
+
+    @property
+    def status(self):
+        return self.execution.status if self.execution else 'queued'
+
+    @property
+    def progress(self):
+        if not self.total_items:
+            return 0
+        return int((self.completed_items + self.failed_items) * 100 / self.total_items)
+
+
+class ExportArtifact(models.Model):
+    """A rendered document of a crew's completed task outputs, cached by content hash."""
+    FORMAT_CHOICES = [
+        ('html', 'HTML'),
+        ('markdown', 'Markdown'),
+        ('pdf', 'PDF'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    crew = models.ForeignKey(CrewInstance, on_delete=models.CASCADE, related_name='exports')
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES)
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the format and the exported tasks")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    task_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, help_text="When rendering was last claimed")
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['crew', 'format', 'content_hash']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_format_display()} export {self.id} of {self.crew.name}"
+
+
+class TaskUsage(models.Model):
+    """Token usage and cost of one LLM-backed task run."""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='usage')
+    execution = models.ForeignKey(
+        Execution,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='usage'
+    )
+    crew = models.ForeignKey(CrewInstance, on_delete=models.CASCADE, related_name='usage')
+    agent = models.ForeignKey(Agent, null=True, on_delete=models.SET_NULL, related_name='usage')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='llm_usage')
+    model = models.CharField(max_length=255)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    total_tokens = models.PositiveIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+    cost = models.DecimalField(max_digits=12, decimal_places=6, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Task Usage'
+        verbose_name_plural = 'Task Usage'
+        indexes = [
+            models.Index(fields=['owner', 'created_at']),
+            models.Index(fields=['crew', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.total_tokens} tokens on {self.model} for task {self.task_id}"
+
+
+class DailyUsage(models.Model):
+    """Pre-aggregated token usage and cost per day, owner, crew and model."""
+    date = models.DateField()
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_llm_usage')
+    crew = models.ForeignKey(CrewInstance, on_delete=models.CASCADE, related_name='daily_usage')
+    model = models.CharField(max_length=255)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    total_tokens = models.PositiveBigIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+    runs = models.PositiveIntegerField(default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=6, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily Usage'
+        verbose_name_plural = 'Daily Usage'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'owner', 'crew', 'model'], name='unique_daily_usage'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.model}: {self.total_tokens} tokens"
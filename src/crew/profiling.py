@@ -0,0 +1,243 @@
+"""
+Execution timeline profiling.
+
+A :class:`Profiler` records nested timing spans while a crew runs. Code
+on the execution path marks its phases with :func:`span`, which is a no-op
+unless a profiler is active in the current context::
+
+    with span('llm.kickoff', model='gpt-4o'):
+        ...
+
+:class:`~crew.execution.CrewExecutor` activates a profiler per run and
+stores the spans in ``Execution.profile``; the execution history page
+renders them as a timeline. :func:`to_otlp` converts a stored profile to
+OpenTelemetry's OTLP/JSON trace format, and with
+``settings.CREW_PROFILE_EXPORT_PATH`` set every run is appended to that
+file, one JSON document per line, as the OpenTelemetry Collector's file
+exporter writes them.
+"""
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Spans beyond this are dropped so a huge run cannot bloat its Execution row.
+MAX_SPANS = 5000
+
+_current = contextvars.ContextVar('crew_profiler', default=None)
+_parent = contextvars.ContextVar('crew_profiler_span', default=None)
+
+
+class Profiler:
+    """Collects the spans of one execution."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.spans = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter() - self.started
+
+    def add(self, name, parent, start, end, attributes):
+        with self.lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return None
+            span_id = len(self.spans) + 1
+            self.spans.append({
+                'id': span_id,
+                'parent': parent,
+                'name': name,
+                'start': round(start, 6),
+                'duration': None if end is None else round(end - start, 6),
+                'thread': threading.current_thread().name,
+                'attributes': attributes,
+            })
+            return span_id
+
+    def finish(self, span_id, end, error=None):
+        if span_id is None:
+            return
+        with self.lock:
+            record = self.spans[span_id - 1]
+            record['duration'] = round(end - record['start'], 6)
+            if error is not None:
+                record['attributes']['error'] = error
+
+    def as_dict(self):
+        """Return the profile in the form stored in ``Execution.profile``."""
+        with self.lock:
+            return {
+                'started_at': self.started_wall,
+                'duration': round(self.now(), 6),
+                'spans': list(self.spans),
+                'dropped': self.dropped,
+            }
+
+
+def is_enabled():
+    return getattr(settings, 'CREW_PROFILING', True)
+
+
+def current():
+    """Return the profiler active in this context, or None."""
+    return _current.get()
+
+
+@contextmanager
+def activate(profiler):
+    """Make ``profiler`` the active profiler for the duration of the block."""
+    token = _current.set(profiler)
+    parent_token = _parent.set(None)
+    try:
+        yield profiler
+    finally:
+        _parent.reset(parent_token)
+        _current.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the block as a span nested under the enclosing span, if profiling.
+
+    Yields the span's attributes, so the block can add what it learns.
+    """
+    profiler = _current.get()
+    if profiler is None:
+        yield attributes
+        return
+    span_id = profiler.add(name, _parent.get(), profiler.now(), None, attributes)
+    token = _parent.set(span_id)
+    error = None
+    try:
+        yield attributes
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+        raise
+    finally:
+        _parent.reset(token)
+        profiler.finish(span_id, profiler.now(), error)
+
+
+def timeline(profile):
+    """
+    Return the spans of a stored profile as rows for a Gantt chart.
+
+    Each row carries its nesting ``depth`` and ``left``/``width`` as
+    percentages of the run's duration, in start order with children under
+    their parent.
+    """
+    spans = (profile or {}).get('spans') or []
+    total = (profile or {}).get('duration') or max(
+        ((s['start'] + (s['duration'] or 0)) for s in spans), default=0
+    )
+    if not spans or not total:
+        return []
+    children = {}
+    for record in spans:
+        children.setdefault(record['parent'], []).append(record)
+
+    rows = []
+
+    def walk(parent, depth):
+        for record in sorted(children.get(parent, []), key=lambda s: s['start']):
+            duration = record['duration'] or 0
+            rows.append({
+                'name': record['name'],
+                'depth': depth,
+                'start': record['start'],
+                'duration': duration,
+                'left': round(record['start'] * 100 / total, 2),
+                'width': max(round(duration * 100 / total, 2), 0.2),
+                'attributes': record['attributes'],
+            })
+            walk(record['id'], depth + 1)
+
+    walk(None, 0)
+    return rows
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def to_otlp(profile, name='crew.execution', attributes=None, trace_id=None):
+    """
+    Convert a stored profile to an OTLP/JSON ``ExportTraceServiceRequest``.
+
+    Args:
+        profile: An ``Execution.profile`` dict.
+        name: Instrumentation scope name.
+        attributes: Resource attributes, e.g. the execution and crew ids.
+        trace_id: 32 hex digits; random if not given.
+    """
+    trace_id = trace_id or secrets.token_hex(16)
+    started_ns = int(profile['started_at'] * 1e9)
+    span_ids = {record['id']: secrets.token_hex(8) for record in profile['spans']}
+    spans = []
+    for record in profile['spans']:
+        start = started_ns + int(record['start'] * 1e9)
+        attrs = {**record['attributes'], 'thread.name': record['thread']}
+        otlp_span = {
+            'traceId': trace_id,
+            'spanId': span_ids[record['id']],
+            'name': record['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(start),
+            'endTimeUnixNano': str(start + int((record['duration'] or 0) * 1e9)),
+            'attributes': [_attribute(key, value) for key, value in attrs.items()],
+            'status': {'code': 2, 'message': attrs['error']} if 'error' in attrs else {},
+        }
+        if record['parent'] in span_ids:
+            otlp_span['parentSpanId'] = span_ids[record['parent']]
+        spans.append(otlp_span)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                _attribute('service.name', 'scriptcrew'),
+                *(_attribute(key, value) for key, value in (attributes or {}).items()),
+            ]},
+            'scopeSpans': [{'scope': {'name': name}, 'spans': spans}],
+        }]
+    }
+
+
+def export_execution(execution, path):
+    """Append the profile of ``execution`` to ``path`` as one line of OTLP/JSON."""
+    document = to_otlp(execution.profile, attributes={
+        'scriptcrew.execution.id': execution.pk,
+        'scriptcrew.crew.id': execution.crew_id,
+        'scriptcrew.crew.name': execution.crew.name,
+    })
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as out:
+        out.write(json.dumps(document, separators=(',', ':')) + '\n')
+
+
+def export_if_configured(execution):
+    path = getattr(settings, 'CREW_PROFILE_EXPORT_PATH', None)
+    if not path or not execution.profile.get('spans'):
+        return
+    try:
+        export_execution(execution, path)
+    except OSError as e:
+        logger.warning(f"Could not export profile of execution {execution.pk}: {str(e)}")
@@ -0,0 +1,396 @@
+"""
+Rate limiting and concurrency control for LLM calls.
+
+Limits are configured per model (or provider) in ``settings.CREW_RATE_LIMITS``::
+
+    CREW_RATE_LIMITS = {
+        'default': {'max_concurrency': 8},
+        'openai': {'rpm': 3500, 'tpm': 90000},
+        'openai/gpt-4': {'rpm': 500, 'tpm': 30000, 'max_concurrency': 4},
+    }
+
+The most specific entry wins: ``provider/model``, then ``model``, then
+``provider``, then ``default``. ``rpm`` and ``tpm`` are requests and tokens
+per minute, ``burst`` the number of requests that may go out back to back
+and ``max_wait`` how many seconds a call may queue before giving up.
+
+With ``CREW_RATE_LIMIT_BACKEND = 'cache'`` the counters live in the Django
+cache (Redis in production), so all gunicorn workers share one budget;
+the default ``'local'`` backend limits each process on its own.
+
+Time spent waiting and calls retried after a provider's rate limit error
+are exported as ``scriptcrew_llm_rate_limit_wait_seconds`` and
+``scriptcrew_llm_rate_limited_total``.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .metrics import RATE_LIMIT_WAIT, RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WAIT = 300
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+BACKOFF_RETRIES = 5
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than ``max_wait`` for capacity."""
+
+
+def limit_key(llm_config):
+    """
+    Return the ``(provider, model)`` pair an ``llm_config`` is limited under.
+
+    The provider is taken from ``llm_config['provider']`` or from a
+    ``provider/model`` style model name, as used by LiteLLM.
+    """
+    model = (llm_config or {}).get('model') or 'default'
+    provider = (llm_config or {}).get('provider')
+    if not provider and '/' in model:
+        provider, model = model.split('/', 1)
+    return provider or '', model
+
+
+def is_rate_limit_error(exc):
+    """Whether ``exc`` is a provider's "too many requests" error."""
+    if getattr(exc, 'status_code', None) == 429:
+        return True
+    response = getattr(exc, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    if 'ratelimit' in type(exc).__name__.lower():
+        return True
+    message = str(exc).lower()
+    return '429' in message or 'rate limit' in message
+
+
+def _retry_after(exc):
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously at ``rate`` per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount=1):
+        """
+        Take ``amount`` tokens if available.
+
+        Returns:
+            float: 0 on success, otherwise the seconds until enough tokens
+            will have accumulated.
+        """
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def penalize(self, seconds):
+        """Empty the bucket so nothing is admitted for roughly ``seconds``."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class LocalBackend:
+    """Per-process token buckets and semaphores."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, name, per_minute, burst):
+        with self.lock:
+            bucket = self.buckets.get(name)
+            if bucket is None:
+                bucket = self.buckets[name] = TokenBucket(per_minute / 60.0, burst)
+            return bucket
+
+    def try_acquire(self, name, per_minute, burst, amount):
+        return self._bucket(name, per_minute, burst).try_acquire(amount)
+
+    def penalize(self, name, per_minute, burst, seconds):
+        self._bucket(name, per_minute, burst).penalize(seconds)
+
+    def enter(self, name, limit):
+        with self.lock:
+            semaphore = self.slots.get(name)
+            if semaphore is None:
+                semaphore = self.slots[name] = threading.BoundedSemaphore(limit)
+        return semaphore.acquire(blocking=False)
+
+    def leave(self, name, limit, holder=None):
+        self.slots[name].release()
+
+
+class CacheBackend:
+    """
+    Counters in the Django cache, shared by every worker using that cache.
+
+    Request and token budgets are fixed one-minute windows rather than true
+    buckets, which is what the cache's atomic ``incr`` makes cheap.
+    """
+    SLOT_TIMEOUT = 600
+    # Held slots are refreshed this often, so long calls do not outlive them
+    refresh_interval = SLOT_TIMEOUT / 4
+
+    def __init__(self, alias='default'):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def try_acquire(self, name, per_minute, burst, amount):
+        now = time.time()
+        window = int(now // 60)
+        key = f'crew:ratelimit:{name}:{window}'
+        self.cache.add(key, 0, 120)
+        penalty = self.cache.get(f'crew:ratelimit:{name}:penalty')
+        if penalty and penalty > now:
+            return penalty - now
+        count = self.cache.incr(key, amount)
+        if count <= per_minute:
+            return 0.0
+        self.cache.decr(key, amount)
+        return (window + 1) * 60 - now
+
+    def penalize(self, name, per_minute, burst, seconds):
+        self.cache.set(f'crew:ratelimit:{name}:penalty', time.time() + seconds, int(seconds) + 1)
+
+    def enter(self, name, limit):
+        """
+        Take one of ``limit`` slots, each a key of its own held by one caller.
+
+        A slot expires ``SLOT_TIMEOUT`` seconds after it was taken or last
+        refreshed, so slots of workers that died while holding them come
+        back by themselves.
+
+        Returns:
+            str: A token identifying the holder, or None if all slots are taken.
+        """
+        holder = uuid.uuid4().hex
+        for index in range(limit):
+            if self.cache.add(f'crew:ratelimit:{name}:slot:{index}', holder, self.SLOT_TIMEOUT):
+                return f'{index}:{holder}'
+        return None
+
+    def leave(self, name, limit, holder=None):
+        if not holder:
+            return
+        index, token = holder.split(':', 1)
+        key = f'crew:ratelimit:{name}:slot:{index}'
+        # The slot may have expired and been taken by another caller meanwhile
+        if self.cache.get(key) == token:
+            self.cache.delete(key)
+
+    def refresh(self, name, holder):
+        """Restart the expiry of a held slot; False if it was lost already."""
+        index, token = holder.split(':', 1)
+        key = f'crew:ratelimit:{name}:slot:{index}'
+        return self.cache.get(key) == token and self.cache.touch(key, self.SLOT_TIMEOUT)
+
+
+class RateLimiter:
+    """
+    Admits LLM calls according to per-model limits, queueing callers until
+    capacity is available, and keeps statistics on time spent waiting.
+    """
+
+    def __init__(self, limits=None, backend=None):
+        self.limits = limits or {}
+        self.backend = backend or LocalBackend()
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    def get_limits(self, llm_config):
+        """Return ``(name, limits)`` of the most specific entry matching ``llm_config``."""
+        provider, model = limit_key(llm_config)
+        candidates = [f'{provider}/{model}' if provider else None, model, provider or None, 'default']
+        for name in candidates:
+            if name and name in self.limits:
+                return name, self.limits[name]
+        return 'default', {}
+
+    def _record(self, name, **values):
+        with self.stats_lock:
+            stats = self.stats.setdefault(name, {
+                'calls': 0, 'waited_seconds': 0.0, 'max_wait_seconds': 0.0, 'rate_limited': 0,
+            })
+            for key, value in values.items():
+                if key == 'max_wait_seconds':
+                    stats[key] = max(stats[key], value)
+                else:
+                    stats[key] += value
+
+    def snapshot(self):
+        """Return a copy of the per-limit call and wait statistics."""
+        with self.stats_lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}
+
+    def _wait_for(self, check, deadline, name):
+        while True:
+            delay = check()
+            if not delay:
+                return
+            if time.monotonic() + delay > deadline:
+                raise RateLimitTimeout(f"Timed out waiting for LLM capacity for '{name}'")
+            # Jitter so queued callers do not all wake up at once.
+            time.sleep(min(delay, 5.0) * random.uniform(1.0, 1.2))
+
+    def acquire(self, llm_config, tokens=0):
+        """
+        Block until a call for ``llm_config`` fits in the request and token budgets.
+
+        Args:
+            llm_config: The agent's LLM configuration.
+            tokens: Estimated tokens (prompt plus completion) of the call.
+
+        Returns:
+            float: Seconds spent waiting.
+
+        Raises:
+            RateLimitTimeout: If no capacity became available within ``max_wait``.
+        """
+        from .profiling import span
+
+        name, limits = self.get_limits(llm_config)
+        with span('ratelimit.acquire', limit=name):
+            return self._acquire(name, limits, tokens)
+
+    def _acquire(self, name, limits, tokens):
+        started = time.monotonic()
+        deadline = started + limits.get('max_wait', DEFAULT_MAX_WAIT)
+
+        rpm = limits.get('rpm')
+        if rpm:
+            burst = limits.get('burst') or max(1, rpm // 10)
+            self._wait_for(lambda: self.backend.try_acquire(f'{name}:rpm', rpm, burst, 1), deadline, name)
+        tpm = limits.get('tpm')
+        if tpm and tokens:
+            self._wait_for(
+                lambda: self.backend.try_acquire(f'{name}:tpm', tpm, tpm, min(tokens, tpm)), deadline, name
+            )
+
+        waited = time.monotonic() - started
+        self._record(name, calls=1, waited_seconds=waited, max_wait_seconds=waited)
+        RATE_LIMIT_WAIT.labels(limit=name, kind='budget').observe(waited)
+        if waited > 1:
+            logger.info(f"LLM call for '{name}' waited {waited:.1f}s for rate limit capacity")
+        return waited
+
+    @contextmanager
+    def slot(self, llm_config):
+        """Hold one of the ``max_concurrency`` call slots for the block's duration."""
+        name, limits = self.get_limits(llm_config)
+        limit = limits.get('max_concurrency')
+        if not limit:
+            yield
+            return
+        started = time.monotonic()
+        deadline = started + limits.get('max_wait', DEFAULT_MAX_WAIT)
+        holder = None
+
+        def enter():
+            nonlocal holder
+            holder = self.backend.enter(f'{name}:slots', limit)
+            return 0.0 if holder else 0.05
+
+        self._wait_for(enter, deadline, name)
+        waited = time.monotonic() - started
+        self._record(name, waited_seconds=waited)
+        RATE_LIMIT_WAIT.labels(limit=name, kind='slot').observe(waited)
+
+        # Keep a shared slot from expiring while a long call still holds it
+        held = threading.Event()
+        keeper = None
+        interval = getattr(self.backend, 'refresh_interval', None)
+        if interval:
+            def keep_alive():
+                while not held.wait(interval):
+                    if not self.backend.refresh(f'{name}:slots', holder):
+                        logger.warning(f"Concurrency slot for '{name}' expired while the call held it")
+                        return
+
+            keeper = threading.Thread(target=keep_alive, name=f'ratelimit-slot-{name}', daemon=True)
+            keeper.start()
+        try:
+            yield
+        finally:
+            held.set()
+            if keeper is not None:
+                keeper.join()
+            self.backend.leave(f'{name}:slots', limit, holder)
+
+    def call(self, fn, llm_config, tokens=0, retries=BACKOFF_RETRIES):
+        """
+        Call ``fn()`` within the limits of ``llm_config``.
+
+        Rate limit errors from the provider back the whole limit off (so
+        other callers slow down too) and the call is retried with jittered
+        exponential backoff.
+        """
+        name, limits = self.get_limits(llm_config)
+        attempt = 0
+        while True:
+            self.acquire(llm_config, tokens)
+            try:
+                with self.slot(llm_config):
+                    return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= retries:
+                    raise
+                delay = _retry_after(e) or min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+                delay *= random.uniform(1.0, 1.5)
+                attempt += 1
+                self._record(name, rate_limited=1)
+                RATE_LIMITED.labels(limit=name).inc()
+                logger.warning(
+                    f"LLM call for '{name}' was rate limited; retry {attempt}/{retries} in {delay:.1f}s"
+                )
+                rpm = limits.get('rpm')
+                if rpm:
+                    self.backend.penalize(f'{name}:rpm', rpm, limits.get('burst') or max(1, rpm // 10), delay)
+                time.sleep(delay)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide limiter configured from settings."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                backend = getattr(settings, 'CREW_RATE_LIMIT_BACKEND', 'local')
+                _limiter = RateLimiter(
+                    limits=getattr(settings, 'CREW_RATE_LIMITS', {}),
+                    backend=CacheBackend() if backend == 'cache' else LocalBackend(),
+                )
+    return _limiter
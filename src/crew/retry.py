@@ -0,0 +1,70 @@
+"""
+Retry policies for task execution.
+
+A policy is assembled from ``settings.CREW_RETRY_POLICY``, then the crew's
+``config['retry']``, then the task's ``retry_policy``, later entries
+overriding earlier ones::
+
+    {"max_attempts": 4, "base_delay": 2, "max_delay": 60, "jitter": 0.5}
+
+Only transient errors (timeouts, connection problems, 429 and 5xx responses)
+are retried; anything else fails the task on the first attempt.
+"""
+import random
+from dataclasses import dataclass, fields
+
+from django.conf import settings
+
+from .ratelimit import is_rate_limit_error
+
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_NAME_PARTS = ('timeout', 'connection', 'unavailable', 'overloaded', 'internalserver')
+
+
+def is_transient_error(exc):
+    """Whether ``exc`` looks like a temporary failure worth retrying."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if is_rate_limit_error(exc):
+        return True
+    status = getattr(exc, 'status_code', None) or getattr(getattr(exc, 'response', None), 'status_code', None)
+    if status in TRANSIENT_STATUS_CODES:
+        return True
+    name = type(exc).__name__.lower()
+    return any(part in name for part in TRANSIENT_NAME_PARTS)
+
+
+@dataclass
+class RetryPolicy:
+    """How many times, and how far apart, a failing task is attempted."""
+    max_attempts: int = 1
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+    jitter: float = 0.5
+
+    @classmethod
+    def from_dict(cls, *configs):
+        """Build a policy from dicts, later ones overriding earlier ones; unknown keys are ignored."""
+        names = {f.name for f in fields(cls)}
+        values = {}
+        for config in configs:
+            values.update({key: value for key, value in (config or {}).items() if key in names})
+        return cls(**values)
+
+    @classmethod
+    def for_task(cls, task):
+        """Return the effective policy of ``task``."""
+        return cls.from_dict(
+            getattr(settings, 'CREW_RETRY_POLICY', {}),
+            task.crew.config.get('retry') if isinstance(task.crew.config, dict) else None,
+            task.retry_policy,
+        )
+
+    def should_retry(self, exc, attempt):
+        """Whether to try again after ``exc`` ended attempt number ``attempt``."""
+        return attempt < self.max_attempts and is_transient_error(exc)
+
+    def delay(self, attempt):
+        """Seconds to wait after attempt number ``attempt`` (exponential with jitter)."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1 + random.uniform(0, self.jitter))
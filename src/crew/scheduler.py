@@ -0,0 +1,360 @@
+"""
+Execution scheduling.
+
+Runs are submitted as queued :class:`~crew.models.Execution` rows and
+dispatched by :class:`ExecutionScheduler`, which enforces
+
+* a global limit on concurrently running executions (``max_concurrent``),
+* a per-owner limit (``max_concurrent_per_owner``),
+* per-owner daily token budgets (``owner_daily_tokens`` as the default,
+  ``owner_token_budgets`` per username),
+
+and picks the next execution by weighted fair sharing: every owner's
+*service* is the execution time they consumed over the last
+``fair_share_window`` seconds (including what is running now) divided by
+their weight from ``owner_weights``; the oldest queued execution of the
+owner with the least service goes next. A user who queued twenty flows
+therefore cannot starve someone who queued one.
+
+Executions run in one of two lanes. ``interactive`` work (single-task
+re-runs while a user edits) is always picked before ``batch`` work (crew
+and flow runs), and ``interactive_reserved`` slots of ``max_concurrent``
+are kept free of batch work. The lane is chosen per request, then by the
+crew's ``config['priority']``, and defaults to interactive for single
+tasks and batch for everything else. When interactive work is waiting for
+capacity, running batch executions yield their slot at the next task
+boundary (``preempt_batch``) and continue once the scheduler picks them
+again, or within ``preempt_wait`` seconds are left queued for a worker.
+
+Configuration lives in ``settings.CREW_SCHEDULER``. With ``inline`` set
+(the default) a submitted execution that is admitted runs in the
+submitting process, interactive ones waiting up to ``interactive_wait``
+seconds for a slot; everything else waits for the ``run_executions``
+worker command.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .metrics import QUEUE_WAIT
+from .models import BatchRun, Execution
+from .usage import BudgetExceeded, check_budget, usage_totals
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'inline': True,
+    'max_concurrent': 4,
+    'max_concurrent_per_owner': 2,
+    'interactive_reserved': 1,
+    'interactive_wait': 30,
+    'preempt_batch': True,
+    'preempt_wait': 60,
+    'poll_interval': 1.0,
+    'fair_share_window': 3600,
+    'owner_weights': {},
+    'owner_daily_tokens': None,
+    'owner_token_budgets': {},
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'CREW_SCHEDULER', {})}
+
+
+def check_owner_budget(owner, config=None):
+    """
+    Raise if ``owner`` has used up today's token budget.
+
+    Raises:
+        BudgetExceeded: If the owner's daily token budget is reached.
+    """
+    from .models import DailyUsage
+
+    config = config or get_config()
+    budget = config['owner_token_budgets'].get(owner.get_username(), config['owner_daily_tokens'])
+    if budget is None:
+        return
+    used = usage_totals(DailyUsage.objects.filter(owner=owner, date=timezone.localdate()))['total_tokens']
+    if used >= budget:
+        raise BudgetExceeded(f"{owner.get_username()} has used {used} of {budget} tokens today")
+
+
+class ExecutionScheduler:
+    """Queue executions and dispatch them fairly across owners."""
+
+    def __init__(self, config=None):
+        self.config = {**get_config(), **(config or {})}
+
+    def get_priority(self, crew, priority=None, task=None):
+        """
+        Return the lane for a run: ``priority`` if given, else the crew's
+        ``config['priority']``, else interactive for single tasks and batch
+        otherwise.
+
+        Raises:
+            ValueError: If the priority is not a known lane.
+        """
+        priority = priority or (crew.config or {}).get('priority') or ('interactive' if task else 'batch')
+        if priority not in dict(Execution.PRIORITY_CHOICES):
+            raise ValueError(f"Unknown execution priority '{priority}'")
+        return priority
+
+    def submit(self, crew, resume=False, resumed_from=None, priority=None, task=None):
+        """
+        Queue a run of ``crew``, or of one of its tasks.
+
+        Returns:
+            Execution: The queued execution.
+
+        Raises:
+            BudgetExceeded: If the crew or its owner has no budget left today.
+            ValueError: If the priority is not a known lane.
+        """
+        priority = self.get_priority(crew, priority, task)
+        check_budget(crew)
+        check_owner_budget(crew.owner, self.config)
+        now = timezone.now()
+        return Execution.objects.create(
+            crew=crew,
+            task=task,
+            priority=priority,
+            status='queued',
+            queued_at=now,
+            keep_completed=resume,
+            resumed_from=resumed_from,
+        )
+
+    def submit_and_run(self, crew, resume=False, resumed_from=None, priority=None, task=None):
+        """
+        Queue a run and, in inline mode, run it now if admitted.
+
+        Interactive runs wait up to ``interactive_wait`` seconds for a slot,
+        which batch runs free up at their next task boundary.
+
+        Returns:
+            Execution: The execution, which is still queued if it was not admitted.
+        """
+        execution = self.submit(crew, resume=resume, resumed_from=resumed_from, priority=priority, task=task)
+        if not self.config['inline']:
+            return execution
+        deadline = time.monotonic() + (self.config['interactive_wait'] if execution.priority == 'interactive' else 0)
+        while not self.claim(execution):
+            if time.monotonic() >= deadline:
+                return execution
+            time.sleep(self.config['poll_interval'])
+        self.dispatch(execution)
+        execution.refresh_from_db()
+        return execution
+
+    def running(self):
+        """Return the number of running executions per owner id and per priority."""
+        # Sub-crews of a flow run under the flow's execution and its slot
+        rows = (
+            Execution.objects.filter(status='running', parent__isnull=True)
+            .values('crew__owner_id', 'priority')
+            .annotate(running=Count('id'))
+        )
+        by_owner, by_priority = {}, {}
+        for row in rows:
+            by_owner[row['crew__owner_id']] = by_owner.get(row['crew__owner_id'], 0) + row['running']
+            by_priority[row['priority']] = by_priority.get(row['priority'], 0) + row['running']
+        return by_owner, by_priority
+
+    def has_capacity(self, priority, owner_id, by_owner, by_priority):
+        """Whether one more ``priority`` execution of ``owner_id`` fits the limits."""
+        if sum(by_priority.values()) >= self.config['max_concurrent']:
+            return False
+        batch_limit = self.config['max_concurrent'] - self.config['interactive_reserved']
+        if priority == 'batch' and by_priority.get('batch', 0) >= batch_limit:
+            return False
+        return by_owner.get(owner_id, 0) < self.config['max_concurrent_per_owner']
+
+    def service_by_owner(self, owner_ids):
+        """Return each owner's execution seconds within the fair-share window, divided by weight."""
+        now = timezone.now()
+        since = now - timedelta(seconds=self.config['fair_share_window'])
+        service = {owner_id: 0.0 for owner_id in owner_ids}
+        recent = Execution.objects.filter(crew__owner_id__in=owner_ids, parent__isnull=True).filter(
+            Q(status='running') | Q(ended_at__gte=since)
+        ).values_list('crew__owner_id', 'started_at', 'ended_at')
+        for owner_id, started_at, ended_at in recent:
+            start = max(started_at, since)
+            service[owner_id] += max(0.0, ((ended_at or now) - start).total_seconds())
+
+        weights = self.config['owner_weights']
+        if weights:
+            from django.contrib.auth import get_user_model
+            User = get_user_model()
+            for owner_id, username in User.objects.filter(pk__in=owner_ids).values_list('pk', User.USERNAME_FIELD):
+                service[owner_id] /= float(weights.get(username, 1))
+        return service
+
+    def queued(self):
+        return Execution.objects.filter(status='queued')
+
+    def next_execution(self):
+        """
+        Pick the queued execution that should run next, or None.
+
+        Interactive executions go before batch ones. Within a lane, owners
+        without capacity are skipped; among the others the owner with the
+        least weighted service wins, ties going to the owner whose oldest
+        queued execution has waited longest.
+        """
+        by_owner, by_priority = self.running()
+        for priority in ('interactive', 'batch'):
+            oldest = {}
+            for owner_id, execution_id, queued_at in (
+                self.queued().filter(priority=priority)
+                .order_by('queued_at', 'pk')
+                .values_list('crew__owner_id', 'pk', 'queued_at')
+            ):
+                if owner_id not in oldest and self.has_capacity(priority, owner_id, by_owner, by_priority):
+                    oldest[owner_id] = (queued_at, execution_id)
+            if oldest:
+                service = self.service_by_owner(list(oldest))
+                owner_id = min(oldest, key=lambda owner: (service[owner], oldest[owner]))
+                return Execution.objects.select_related('crew', 'crew__owner', 'task').get(pk=oldest[owner_id][1])
+        return None
+
+    def should_preempt(self, execution):
+        """
+        Whether running batch ``execution`` should give up its slot: true if
+        interactive work is queued and blocked by the global limit, or by
+        the per-owner limit of this execution's owner.
+        """
+        if not self.config['preempt_batch'] or execution.priority != 'batch':
+            return False
+        waiting = set(self.queued().filter(priority='interactive').values_list('crew__owner_id', flat=True))
+        if not waiting:
+            return False
+        by_owner, by_priority = self.running()
+        if sum(by_priority.values()) >= self.config['max_concurrent']:
+            return True
+        owner_id = execution.crew.owner_id
+        return owner_id in waiting and by_owner.get(owner_id, 0) >= self.config['max_concurrent_per_owner']
+
+    def checkpoint(self, execution):
+        """
+        Called by the executor between tasks of ``execution``.
+
+        If the execution should be preempted it goes back into the queue,
+        keeping its completed tasks and its original place in line, and this
+        waits until the scheduler picks it again and reclaims it. After
+        ``preempt_wait`` seconds it stops waiting and leaves the execution
+        queued for a ``run_executions`` worker, so a web request or worker
+        thread is not held indefinitely.
+
+        Returns:
+            bool: True if the run must stop because the execution was stopped,
+            claimed by another worker while queued, or left in the queue.
+        """
+        if not self.should_preempt(execution):
+            return False
+        requeued = Execution.objects.filter(pk=execution.pk, status='running').update(
+            status='queued', keep_completed=True
+        )
+        if not requeued:
+            return True
+        logger.info(f"Execution {execution.pk} yielded to interactive work")
+        deadline = time.monotonic() + self.config['preempt_wait']
+        while True:
+            if time.monotonic() >= deadline:
+                logger.info(f"Execution {execution.pk} left in the queue after waiting to resume")
+                return True
+            time.sleep(self.config['poll_interval'])
+            status = Execution.objects.filter(pk=execution.pk).values_list('status', flat=True).first()
+            if status != 'queued':
+                return True
+            following = self.next_execution()
+            if following is not None and following.pk == execution.pk and self.claim(execution):
+                logger.info(f"Execution {execution.pk} resumed after yielding")
+                return False
+
+    def claim(self, execution):
+        """
+        Atomically move ``execution`` from queued to running if it fits the
+        concurrency limits.
+
+        The limits are checked again under a lock, since another worker may
+        have started an execution after this one was picked: every claim
+        locks the queued and running executions first, so concurrent claims
+        take turns, and each counts the running executions only once it
+        holds the lock.
+
+        Returns:
+            bool: False if someone else claimed it, or it no longer fits.
+        """
+        with transaction.atomic():
+            list(
+                Execution.objects.select_for_update().filter(status__in=['queued', 'running'])
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            by_owner, by_priority = self.running()
+            owner_id = Execution.objects.filter(pk=execution.pk).values_list('crew__owner_id', flat=True).first()
+            if not self.has_capacity(execution.priority, owner_id, by_owner, by_priority):
+                return False
+            claimed = Execution.objects.filter(pk=execution.pk, status='queued').update(
+                status='running', started_at=timezone.now()
+            )
+        if claimed:
+            execution.refresh_from_db()
+            if execution.queued_at:
+                QUEUE_WAIT.labels(priority=execution.priority).observe(
+                    (execution.started_at - execution.queued_at).total_seconds()
+                )
+        return bool(claimed)
+
+    def dispatch(self, execution):
+        """
+        Claim and run ``execution`` in this process.
+
+        Returns:
+            dict: The run summary, or None if the execution was not claimed
+            or was refused for lack of budget.
+        """
+        from .execution import CrewExecutor
+
+        if execution.status == 'queued' and not self.claim(execution):
+            return None
+        try:
+            check_owner_budget(execution.crew.owner, self.config)
+        except BudgetExceeded as e:
+            logger.warning(f"Not running execution {execution.pk}: {str(e)}")
+            execution.status = 'failed'
+            execution.ended_at = timezone.now()
+            execution.results = {**execution.results, 'error': str(e)}
+            execution.save()
+            return None
+        return CrewExecutor(execution.crew, checkpoint=self.checkpoint).execute(
+            resume=execution.keep_completed,
+            resumed_from=execution.resumed_from,
+            execution=execution,
+            task=execution.task,
+            batch=BatchRun.objects.filter(execution=execution).first(),
+        )
+
+    def run_next(self):
+        """
+        Dispatch the next execution, if any.
+
+        Returns:
+            Execution: The execution that ran, or None if nothing was runnable.
+        """
+        while True:
+            execution = self.next_execution()
+            if execution is None:
+                return None
+            if self.claim(execution):
+                break
+        try:
+            self.dispatch(execution)
+        except Exception as e:
+            logger.error(f"Execution {execution.pk} failed: {str(e)}")
+        return execution
@@ -0,0 +1,84 @@
+"""
+Scheduled crew runs.
+
+:func:`run_due_schedules` is called periodically by the ``run_schedules``
+management command. Every active :class:`~crew.models.CrewSchedule` whose
+``next_run_at`` has passed gets an execution queued through the
+:class:`~crew.scheduler.ExecutionScheduler` (the ``run_executions`` worker
+runs it) and its next run computed. Schedules are claimed with a
+compare-and-set update on ``next_run_at``, so several scheduler processes
+never queue the same slot twice. A schedule that was missed while no
+scheduler was running fires once, not once per missed slot.
+"""
+import logging
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CrewSchedule
+from .scheduler import ExecutionScheduler
+from .usage import BudgetExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def due_schedules(now=None):
+    """Return active schedules whose next run is due at ``now``."""
+    now = now or timezone.now()
+    return CrewSchedule.objects.filter(is_active=True, next_run_at__lte=now).select_related('crew', 'crew__owner')
+
+
+def run_schedule(schedule, now=None, scheduler=None):
+    """
+    Queue the due run of ``schedule`` and move it on to its next slot.
+
+    Returns:
+        Execution: The queued execution, or None if the slot was taken by
+        another process, skipped because the previous run is still active,
+        or refused for lack of budget.
+    """
+    now = now or timezone.now()
+    due_at = schedule.next_run_at
+    next_run_at = schedule.compute_next_run(now)
+    claimed = CrewSchedule.objects.filter(pk=schedule.pk, next_run_at=due_at).update(
+        next_run_at=next_run_at, last_run_at=now, updated_at=now
+    )
+    if not claimed:
+        return None
+    schedule.next_run_at, schedule.last_run_at = next_run_at, now
+
+    crew = schedule.crew
+    if not schedule.allow_overlap and crew.executions.filter(Q(status='queued') | Q(status='running')).exists():
+        logger.info(f"Skipping scheduled run of crew {crew.name}: previous run still active")
+        return None
+
+    try:
+        execution = (scheduler or ExecutionScheduler()).submit(crew, priority=schedule.priority)
+    except BudgetExceeded as e:
+        logger.warning(f"Skipping scheduled run of crew {crew.name}: {str(e)}")
+        return None
+    CrewSchedule.objects.filter(pk=schedule.pk).update(last_execution=execution)
+    schedule.last_execution = execution
+    logger.info(f"Queued scheduled execution {execution.pk} of crew {crew.name}; next run at {next_run_at}")
+    return execution
+
+
+def run_due_schedules(now=None, scheduler=None):
+    """
+    Queue every due scheduled run.
+
+    Returns:
+        list: The queued executions.
+    """
+    now = now or timezone.now()
+    scheduler = scheduler or ExecutionScheduler()
+    executions = []
+    for schedule in due_schedules(now):
+        try:
+            execution = run_schedule(schedule, now, scheduler)
+        except Exception as e:
+            logger.error(f"Error running schedule {schedule.pk}: {str(e)}")
+            continue
+        if execution is not None:
+            executions.append(execution)
+    return executions
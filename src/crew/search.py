@@ -0,0 +1,90 @@
+"""
+Full-text search over tasks and agents.
+
+On PostgreSQL the ``crew_task`` and ``crew_agent`` tables carry a
+``search_vector`` tsvector column with a GIN index (migration 0011). A
+trigger keeps it up to date whenever a searchable column changes, so every
+save, bulk insert and ``update()`` is covered. The column is deliberately
+not a model field: the ORM never loads or writes it.
+
+Tasks are indexed on their name (weight A), description (B), expected
+output (C) and the strings of their output (D); agents on their name and
+custom role (A), description (B) and backstory (C). Queries use the web
+search syntax (``"exact phrase" -excluded or``), results are ranked, and
+matching snippets are returned with the matches between ``HIGHLIGHT_START``
+and ``HIGHLIGHT_STOP`` (see :func:`highlight`).
+
+Other databases fall back to case-insensitive substring matching without
+ranking or snippets.
+"""
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db.models import F, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Concat
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_CONFIG = 'english'
+
+# Control characters cannot occur in the indexed text, so snippets can be
+# escaped for HTML before the markers are turned into tags
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+TASK_FIELDS = ('name', 'description', 'expected_output', 'output_data')
+AGENT_FIELDS = ('name', 'custom_role', 'description', 'backstory')
+
+
+def is_supported(queryset):
+    """Whether ``queryset``'s database has full-text search."""
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _search(queryset, query, headline, fields):
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    if not is_supported(queryset):
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition)
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    vector = RawSQL(f'{queryset.model._meta.db_table}.search_vector', [], output_field=SearchVectorField())
+    return queryset.alias(search_vector=vector).filter(search_vector=search_query).annotate(
+        search_rank=SearchRank(F('search_vector'), search_query),
+        search_headline=SearchHeadline(
+            headline, search_query, config=SEARCH_CONFIG,
+            start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, max_fragments=2,
+        ),
+    ).order_by('-search_rank', '-pk')
+
+
+def search_tasks(queryset, query):
+    """
+    Filter ``queryset`` to the tasks matching ``query``, best matches first.
+
+    On PostgreSQL the tasks are annotated with ``search_rank`` and
+    ``search_headline``, a snippet of the description and result.
+    """
+    headline = Concat(
+        'description', Value(' '), KeyTextTransform('result', 'output_data'), output_field=TextField()
+    )
+    return _search(queryset, query, headline, TASK_FIELDS)
+
+
+def search_agents(queryset, query):
+    """Like :func:`search_tasks`, for agents; the snippet comes from the description and backstory."""
+    headline = Concat('description', Value(' '), 'backstory', output_field=TextField())
+    return _search(queryset, query, headline, AGENT_FIELDS)
+
+
+def highlight(headline):
+    """Return ``headline`` as HTML, escaped, with the matches in ``<mark>`` tags."""
+    if not headline:
+        return ''
+    html = escape(headline).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    return mark_safe(html)
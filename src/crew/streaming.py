@@ -0,0 +1,200 @@
+"""
+Incremental persistence of streamed LLM output.
+
+While a task runs, :func:`stream_output` collects the text its LLM streams
+and appends it to :class:`~crew.models.TaskOutputChunk` rows, so progress
+is visible long before ``output_data`` is written and a crashed run leaves
+its partial output behind. Text is buffered and written when the buffer
+reaches ``CREW_STREAMING['flush_size']`` characters or
+``CREW_STREAMING['flush_interval']`` seconds after the last write, so a
+fast stream costs a row per flush, not per token.
+
+Each chunk carries the ``start`` and ``end`` character offsets of its text
+in the run's output. Clients tail the output with :func:`read_output`,
+passing the ``next_offset`` of their previous read. Starting a new run of
+the task discards the chunks of the previous one. A stream is closed when
+its run ends; text written to it afterwards, e.g. by an abandoned hedged
+request still finishing in its thread, is dropped.
+
+CrewAI reports streamed text with ``LLMStreamChunkEvent`` when an agent's
+LLM streams; a single event handler, registered on first use, hands each
+chunk to the stream active in the calling context. Code that produces text
+itself can call :meth:`OutputStream.write` directly.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .models import TaskOutputChunk
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAMING_SETTINGS = {
+    'enabled': True,
+    'flush_interval': 1.0,
+    'flush_size': 2048,
+}
+
+# Most characters returned by one read
+MAX_READ = 65536
+
+_current = contextvars.ContextVar('crew_output_stream', default=None)
+_handler_lock = threading.Lock()
+_handler_registered = False
+
+
+def get_settings():
+    return {**DEFAULT_STREAMING_SETTINGS, **getattr(settings, 'CREW_STREAMING', {})}
+
+
+class OutputStream:
+    """Buffers the streamed output of one task run and appends it in chunks."""
+
+    def __init__(self, task, execution=None, flush_interval=None, flush_size=None):
+        config = get_settings()
+        self.task = task
+        self.execution = execution
+        self.flush_interval = config['flush_interval'] if flush_interval is None else flush_interval
+        self.flush_size = config['flush_size'] if flush_size is None else flush_size
+        self.buffer = []
+        self.buffered = 0
+        self.offset = 0
+        self.sequence = 0
+        self.last_flush = time.monotonic()
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        """Add streamed text, writing the buffer out when it is due. Does nothing once closed."""
+        if not text:
+            return
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer.append(text)
+            self.buffered += len(text)
+            if self.buffered >= self.flush_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """Write out what is buffered and ignore any later writes."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._flush()
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        content = ''.join(self.buffer)
+        self.sequence += 1
+        TaskOutputChunk.objects.create(
+            task=self.task,
+            execution=self.execution,
+            sequence=self.sequence,
+            start=self.offset,
+            end=self.offset + len(content),
+            content=content,
+        )
+        self.offset += len(content)
+        self.buffer = []
+        self.buffered = 0
+
+
+def _on_stream_chunk(source, event):
+    stream = _current.get()
+    if stream is not None:
+        stream.write(getattr(event, 'chunk', '') or '')
+
+
+def _register_handler():
+    """Subscribe to CrewAI's streamed chunks once per process; False if CrewAI cannot stream."""
+    global _handler_registered
+    with _handler_lock:
+        if _handler_registered:
+            return True
+        try:
+            from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+        except ImportError:
+            return False
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_stream_chunk)
+        _handler_registered = True
+        return True
+
+
+@contextmanager
+def stream_output(task, execution=None):
+    """
+    Persist the output streamed while the block runs as chunks of ``task``.
+
+    Chunks of the task's previous run are deleted first. When the block
+    exits, also when it fails, whatever is still buffered is written and
+    the stream is closed.
+
+    Yields:
+        OutputStream: The stream, or None when streaming is disabled.
+    """
+    if not get_settings()['enabled']:
+        yield None
+        return
+    task.output_chunks.all().delete()
+    _register_handler()
+    stream = OutputStream(task, execution)
+    token = _current.set(stream)
+    try:
+        yield stream
+    finally:
+        _current.reset(token)
+        try:
+            stream.close()
+        except Exception as e:
+            logger.error(f"Could not write the streamed output of task {task.name}: {str(e)}")
+
+
+@contextmanager
+def paused():
+    """Keep text streamed while the block runs out of the active stream."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def read_output(task, offset=0, limit=MAX_READ):
+    """
+    Return the streamed output of ``task`` from character ``offset`` on.
+
+    Args:
+        task: The Task whose output to read.
+        offset: The ``next_offset`` of the previous read, or 0.
+        limit: Most characters to return.
+
+    Returns:
+        dict: ``content``, the ``offset`` it starts at and the
+        ``next_offset`` to read from next.
+    """
+    parts = []
+    size = 0
+    next_offset = offset
+    chunks = task.output_chunks.filter(end__gt=offset).order_by('sequence').values_list('start', 'content')
+    for start, content in chunks.iterator():
+        # Chunks are contiguous, so only the first can start before the offset
+        text = content[max(0, offset - start):]
+        text = text[:limit - size]
+        parts.append(text)
+        size += len(text)
+        next_offset = max(offset, start) + len(text)
+        if size >= limit:
+            break
+    return {'offset': offset, 'next_offset': next_offset, 'content': ''.join(parts)}
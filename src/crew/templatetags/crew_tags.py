@@ -18,4 +18,15 @@ def getattribute(obj, attr):
             return obj.get(str(attr))
         except (TypeError, KeyError):
             return ''
-    return '' 
\ No newline at end of file
+    return '' 
+
+@register.filter(name='highlight')
+def highlight(headline):
+    """
+    Render a full-text search snippet with its matches highlighted.
+
+    Usage in template:
+    {{ task.search_headline|highlight }}
+    """
+    from crew.search import highlight
+    return highlight(headline)
@@ -0,0 +1,56 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from crew.models import CrewInstance, Agent, Task
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin',
+            password='testpass123',
+            email='admin@example.com'
+        )
+        self.client.force_login(self.user)
+        self.add_crew(0)
+
+    def add_crew(self, index):
+        crew = CrewInstance.objects.create(name=f'Crew {index}', owner=self.user)
+        CrewInstance.objects.create(name=f'Sub {index}', owner=self.user, parent_crew=crew)
+        agent = Agent.objects.create(crew=crew, name=f'Writer {index}', role='writer', description='Writes')
+        Task.objects.create(crew=crew, agent=agent, name=f'Outline {index}', description='Outline',
+                            expected_output='An outline')
+        return crew
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        for name in ('crewinstance', 'agent', 'task'):
+            url = reverse(f'admin:crew_{name}_changelist')
+            before = self.count_queries(url)
+            for index in range(1, 4):
+                self.add_crew(index)
+            self.assertEqual(self.count_queries(url), before, name)
+
+    def test_count_columns(self):
+        response = self.client.get(reverse('admin:crew_crewinstance_changelist'), {'o': '-6'})
+        crews = list(response.context['cl'].result_list)
+        self.assertEqual(crews[0].name, 'Crew 0')
+        self.assertEqual((crews[0].num_sub_crews, crews[0].num_agents), (1, 1))
+
+        response = self.client.get(reverse('admin:crew_agent_changelist'))
+        self.assertEqual(response.context['cl'].result_list[0].num_tasks, 1)
+
+    def test_task_dependencies_use_autocomplete(self):
+        task = Task.objects.get()
+        response = self.client.get(reverse('admin:crew_task_change', args=[task.pk]))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, f'<option value="{task.pk}">')
@@ -0,0 +1,233 @@
+import re
+import shutil
+import tempfile
+import zlib
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from crew.artifacts import PDFWriter, get_sections, iter_pdf, render_pending, request_export
+from crew.models import CrewInstance, Agent, Task, ExportArtifact
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class ArtifactTestMixin:
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Onboarding Module',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        # Created first but depends on the outline, so it comes second
+        self.slides = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Slides',
+            description='Write the slides',
+            expected_output='Slides',
+            status='completed',
+            output_data={'result': 'Slide one <b>\n\nSlide two'}
+        )
+        self.outline = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline the module',
+            expected_output='An outline',
+            status='completed',
+            output_data={'result': {'sections': ['Intro', 'Safety']}}
+        )
+        self.slides.depends_on.add(self.outline)
+        Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Quiz',
+            description='Write a quiz',
+            expected_output='A quiz'
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportArtifactTest(ArtifactTestMixin, TestCase):
+    def test_sections_follow_dependencies(self):
+        self.assertEqual([title for title, _ in get_sections(self.crew)], ['Outline', 'Slides'])
+
+    def test_renders_markdown_and_html(self):
+        markdown, _ = request_export(self.crew, 'markdown')
+        self.assertEqual(markdown.status, 'completed')
+        self.assertEqual(markdown.task_count, 2)
+        with markdown.file.open('rb') as f:
+            text = f.read().decode('utf-8')
+        self.assertTrue(text.startswith('# Onboarding Module\n'))
+        self.assertLess(text.index('## Outline'), text.index('## Slides'))
+        self.assertIn('"Safety"', text)
+        self.assertNotIn('Quiz', text)
+
+        html, _ = request_export(self.crew, 'html')
+        with html.file.open('rb') as f:
+            text = f.read().decode('utf-8')
+        self.assertIn(f'<a href="#task-{self.slides.pk}">Slides</a>', text)
+        self.assertIn('<p>Slide one &lt;b&gt;</p>\n<p>Slide two</p>', text)
+
+    def test_artifacts_are_cached_by_content(self):
+        first, created = request_export(self.crew, 'pdf')
+        self.assertTrue(created)
+        again, created = request_export(self.crew, 'pdf')
+        self.assertFalse(created)
+        self.assertEqual(again.pk, first.pk)
+
+        self.slides.output_data = {'result': 'Revised slides'}
+        self.slides.save()
+        revised, created = request_export(self.crew, 'pdf')
+        self.assertTrue(created)
+        self.assertNotEqual(revised.content_hash, first.content_hash)
+
+    @override_settings(CREW_EXPORTS={'inline': False})
+    def test_worker_renders_pending_artifacts(self):
+        artifact, _ = request_export(self.crew, 'markdown')
+        self.assertEqual(artifact.status, 'pending')
+        self.assertFalse(artifact.file)
+        rendered = render_pending()
+        self.assertEqual([a.pk for a in rendered], [artifact.pk])
+        self.assertEqual(rendered[0].status, 'completed')
+        self.assertEqual(render_pending(), [])
+
+    @override_settings(CREW_EXPORTS={'inline': False, 'stale_after': 600})
+    def test_abandoned_render_is_reclaimed(self):
+        artifact, _ = request_export(self.crew, 'markdown')
+        ExportArtifact.objects.filter(pk=artifact.pk).update(status='running', started_at=timezone.now())
+        self.assertEqual(render_pending(), [])
+        # Its renderer died more than stale_after ago
+        ExportArtifact.objects.filter(pk=artifact.pk).update(started_at=timezone.now() - timedelta(minutes=11))
+        self.assertEqual([a.pk for a in render_pending()], [artifact.pk])
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.status, 'completed')
+
+    def test_stale_running_artifact_is_rendered_inline(self):
+        artifact, _ = request_export(self.crew, 'html')
+        ExportArtifact.objects.filter(pk=artifact.pk).update(
+            status='running', started_at=timezone.now() - timedelta(hours=1)
+        )
+        again, created = request_export(self.crew, 'html')
+        self.assertFalse(created)
+        self.assertEqual((again.pk, again.status), (artifact.pk, 'completed'))
+
+    @override_settings(CREW_EXPORTS={'inline': False})
+    def test_hash_matches_rendered_outputs(self):
+        artifact, _ = request_export(self.crew, 'markdown')
+        self.slides.output_data = {'result': 'Revised slides'}
+        self.slides.save()
+        render_pending()
+        artifact.refresh_from_db()
+        with artifact.file.open('rb') as f:
+            self.assertIn('Revised slides', f.read().decode('utf-8'))
+        self.assertEqual(request_export(self.crew, 'markdown'), (artifact, False))
+
+    def test_failed_render_is_recorded(self):
+        with mock.patch('crew.artifacts.iter_outputs', side_effect=RuntimeError('disk full')):
+            artifact, _ = request_export(self.crew, 'html')
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.status, 'failed')
+        self.assertEqual(artifact.error, 'disk full')
+        # Failed artifacts are not reused
+        self.assertNotEqual(request_export(self.crew, 'html')[0].pk, artifact.pk)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            request_export(self.crew, 'pptx')
+
+
+class PDFWriterTest(ArtifactTestMixin, TestCase):
+    def test_long_documents_are_written_page_by_page(self):
+        for index in range(30):
+            Task.objects.create(
+                crew=self.crew,
+                agent=self.agent,
+                name=f'Slide {index}',
+                description='Write a slide',
+                expected_output='A slide',
+                status='completed',
+                output_data={'result': f'Slide {index} (café)\n' * 40}
+            )
+        lines = []
+        original = PDFWriter.flush
+
+        def flush(writer):
+            lines.append(len(writer.lines))
+            yield from original(writer)
+
+        with mock.patch.object(PDFWriter, 'flush', flush):
+            data = b''.join(iter_pdf(self.crew.name, get_sections(self.crew)))
+
+        self.assertTrue(data.startswith(b'%PDF-1.4'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+        # Only one page of text is held at a time
+        self.assertLessEqual(max(lines), 60)
+        pages = int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', data).group(1))
+        self.assertGreater(pages, 10)
+
+        # Every cross-reference entry points at its object
+        xref = int(re.search(rb'startxref\n(\d+)', data).group(1))
+        entries = data[xref:].split(b'\n')[3:]
+        for number, entry in enumerate(entries[:pages], 1):
+            offset = int(entry[:10])
+            self.assertTrue(data[offset:].startswith(b'%d 0 obj' % number))
+
+        stream = re.search(rb'stream\n(.*?)\nendstream', data, re.S).group(1)
+        self.assertIn(b'(Onboarding Module) Tj', zlib.decompress(stream))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportArtifactAPITest(ArtifactTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+
+    def test_create_and_download(self):
+        url = reverse('api:crewinstance-artifacts', args=[self.crew.pk])
+        response = self.client.post(url, {'format': 'markdown'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(self.client.post(url, {'format': 'markdown'}, format='json').status_code, 200)
+
+        download = self.client.get(reverse('api:exportartifact-download', args=[response.data['id']]))
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Content-Type'], 'text/markdown')
+        self.assertIn(b'## Slides', b''.join(download.streaming_content))
+
+    @override_settings(CREW_EXPORTS={'inline': False})
+    def test_pending_exports_are_accepted(self):
+        url = reverse('api:crewinstance-artifacts', args=[self.crew.pk])
+        response = self.client.post(url, {'format': 'pdf'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        download = self.client.get(reverse('api:exportartifact-download', args=[response.data['id']]))
+        self.assertEqual(download.status_code, 404)
+
+    def test_other_users_exports_are_hidden(self):
+        artifact, _ = request_export(self.crew, 'html')
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('api:exportartifact-detail', args=[artifact.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(ExportArtifact.objects.count(), 1)
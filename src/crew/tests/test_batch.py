@@ -0,0 +1,160 @@
+import io
+import json
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from crew.batch import BatchInputError, BatchRunner, create_batch, placeholders
+from crew.models import CrewInstance, Agent, Task, BatchRun
+from crew.scheduler import ExecutionScheduler
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def _jsonl(*records):
+    return io.BytesIO(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BatchRunTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.style = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Style Guide',
+            description='Write a style guide for training scripts',
+            expected_output='A style guide'
+        )
+        self.script = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script for module {module}',
+            expected_output='A script'
+        )
+        self.script.depends_on.add(self.style)
+        self.scheduler = ExecutionScheduler({'inline': False})
+
+    def _run_task(self, runner, task, inputs, upstream):
+        if inputs.get('module') == 'broken':
+            raise ValueError('LLM refused')
+        return f"{task.name} {inputs.get('module', '')}".strip()
+
+    def test_placeholders(self):
+        self.assertEqual(placeholders(self.script), {'module'})
+        self.assertEqual(placeholders(self.style), set())
+
+    def test_rejects_invalid_input(self):
+        with self.assertRaises(BatchInputError):
+            create_batch(self.crew, io.BytesIO(b'{"module": 1}\n[1, 2]\n'), scheduler=self.scheduler)
+        with self.assertRaises(BatchInputError):
+            create_batch(self.crew, io.BytesIO(b'\n'), scheduler=self.scheduler)
+        self.assertFalse(BatchRun.objects.exists())
+
+    def test_agents_are_built_per_thread(self):
+        batch = create_batch(self.crew, _jsonl({'module': 'intro'}), scheduler=self.scheduler)
+        runner = BatchRunner(batch)
+        agents = []
+        with mock.patch.object(Agent, 'create_crewai_agent', autospec=True, side_effect=lambda agent: object()):
+            agents.append(runner.get_agent(self.agent))
+            agents.append(runner.get_agent(self.agent))
+            thread = threading.Thread(target=lambda: agents.append(runner.get_agent(self.agent)))
+            thread.start()
+            thread.join()
+        self.assertIs(agents[0], agents[1])
+        self.assertIsNot(agents[0], agents[2])
+
+    @override_settings(CREW_BATCH={'max_concurrency': 3})
+    def test_concurrency_is_capped(self):
+        batch = create_batch(self.crew, _jsonl({'module': 'intro'}), concurrency=500, scheduler=self.scheduler)
+        self.assertEqual(batch.concurrency, 3)
+
+    def test_runs_items_and_shares_input_independent_tasks(self):
+        batch = create_batch(
+            self.crew, _jsonl({'module': 'intro'}, {'module': 'broken'}, {'module': 'vlans'}),
+            concurrency=2, scheduler=self.scheduler
+        )
+        self.assertEqual(batch.total_items, 3)
+        self.assertEqual(batch.status, 'queued')
+
+        with mock.patch.object(BatchRunner, 'run_task', autospec=True, side_effect=self._run_task) as run_task:
+            self.scheduler.run_next()
+
+        # The style guide ran once; the script once per item
+        self.assertEqual(run_task.call_count, 4)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'failed')
+        self.assertEqual((batch.completed_items, batch.failed_items), (2, 1))
+        self.assertEqual(batch.execution.results['shared_outputs'], {'Style Guide': 'Style Guide'})
+
+        with batch.output_file.open('r') as results:
+            items = sorted((json.loads(line) for line in results), key=lambda item: item['index'])
+        self.assertEqual(items[0]['outputs'], {'Script': 'Script intro'})
+        self.assertEqual(items[1]['status'], 'failed')
+        self.assertEqual(items[1]['error'], 'LLM refused')
+        self.assertFalse(batch.execution.can_resume)
+
+        # Task rows are not touched by batch items
+        self.script.refresh_from_db()
+        self.assertEqual(self.script.status, 'pending')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CREW_SCHEDULER={'inline': False})
+class BatchRunAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+
+    def test_upload_queues_batch(self):
+        upload = _jsonl({'module': 'intro'}, {'module': 'vlans'})
+        upload.name = 'modules.jsonl'
+        response = self.client.post(
+            f'/api/crews/{self.crew.pk}/batch/', {'file': upload, 'concurrency': 3}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['total_items'], 2)
+        self.assertEqual(response.data['status'], 'queued')
+
+        response = self.client.get(f"/api/batches/{response.data['id']}/results/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_concurrency_must_be_a_whole_number(self):
+        upload = _jsonl({'module': 'intro'})
+        upload.name = 'modules.jsonl'
+        response = self.client.post(
+            f'/api/crews/{self.crew.pk}/batch/', {'file': upload, 'concurrency': '2.5'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('concurrency', response.data)
@@ -0,0 +1,144 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from crew.models import CrewInstance, Agent, Task
+from crew.cloning import clone_crew, instantiate_template, materialize
+from api.serializers import CrewInstanceSerializer
+
+User = get_user_model()
+
+
+class CrewTemplateTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.template = CrewInstance.objects.create(
+            name='Module Template',
+            owner=self.user,
+            is_template=True,
+            config={'verbose': False}
+        )
+        self.writer = Agent.objects.create(
+            crew=self.template,
+            name='Writer',
+            role='writer',
+            description='Writes scripts',
+            backstory='A long backstory',
+            goals=['Write'],
+            llm_config={'model': 'gpt-4'}
+        )
+        self.outline = Task.objects.create(
+            crew=self.template,
+            agent=self.writer,
+            name='Outline',
+            description='Outline the module',
+            expected_output='An outline',
+            status='completed',
+            output_data={'result': 'old outline'}
+        )
+        self.script = Task.objects.create(
+            crew=self.template,
+            agent=self.writer,
+            name='Script',
+            description='Write the script',
+            expected_output='A script'
+        )
+        self.script.depends_on.add(self.outline)
+
+    def test_instantiate_shares_rows(self):
+        instance = instantiate_template(
+            self.template,
+            self.user,
+            name='Project A',
+            overrides={'agents': {str(self.writer.pk): {'backstory': 'Project A backstory'}}}
+        )
+        self.assertFalse(instance.is_materialized)
+        self.assertEqual(Agent.objects.count(), 1)
+        self.assertEqual(Task.objects.count(), 2)
+
+        agents = instance.get_agents()
+        self.assertEqual(agents[0].backstory, 'Project A backstory')
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.backstory, 'A long backstory')
+
+    def test_instantiate_requires_template(self):
+        self.template.is_template = False
+        self.template.save()
+        with self.assertRaises(ValueError):
+            instantiate_template(self.template, self.user)
+
+    def test_invalid_overrides_rejected(self):
+        with self.assertRaises(ValueError):
+            instantiate_template(self.template, self.user, overrides={'agents': {'1': {'crew': 3}}})
+
+    def test_overrides_need_row_ids(self):
+        with self.assertRaises(ValueError):
+            instantiate_template(self.template, self.user, overrides={'agents': {'writer': {'name': 'Editor'}}})
+        instance = instantiate_template(self.template, self.user)
+        overrides = {'tasks': {str(self.script.pk): {'status': 'failed'}}}
+        serializer = CrewInstanceSerializer(instance, data={'overrides': overrides}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('overrides', serializer.errors)
+
+    def test_materialize_only_applies_overridable_fields(self):
+        instance = instantiate_template(self.template, self.user)
+        # Stored without validation, e.g. by an older version
+        CrewInstance.objects.filter(pk=instance.pk).update(overrides={
+            'agents': {str(self.writer.pk): {'backstory': 'New backstory', 'crew_id': self.template.pk}},
+            'tasks': {'outline': {'name': 'Renamed'}, str(self.script.pk): {'status': 'completed'}},
+        })
+        instance.refresh_from_db()
+        materialize(instance)
+        agent = instance.agents.get()
+        self.assertEqual(agent.backstory, 'New backstory')
+        self.assertEqual(
+            sorted(instance.tasks.values_list('name', 'status')), [('Outline', 'pending'), ('Script', 'pending')]
+        )
+
+    def test_materialize_copies_rows_with_overrides(self):
+        instance = instantiate_template(
+            self.template,
+            self.user,
+            overrides={'tasks': {str(self.script.pk): {'expected_output': 'A short script'}}}
+        )
+        counts = materialize(instance)
+        self.assertEqual(counts, {'agents': 1, 'tasks': 2, 'dependencies': 1})
+        self.assertTrue(instance.is_materialized)
+
+        agent = instance.agents.get()
+        self.assertEqual(agent.backstory, 'A long backstory')
+        outline = instance.tasks.get(name='Outline')
+        script = instance.tasks.get(name='Script')
+        self.assertEqual(outline.status, 'pending')
+        self.assertEqual(outline.output_data, {})
+        self.assertEqual(outline.agent, agent)
+        self.assertEqual(script.expected_output, 'A short script')
+        self.assertEqual(list(script.depends_on.all()), [outline])
+
+        # Materializing again is a no-op.
+        self.assertEqual(materialize(instance)['agents'], 0)
+
+    def test_materialized_state_is_explicit(self):
+        instance = instantiate_template(self.template, self.user)
+        Agent.objects.create(crew=instance, name='Editor', role='editor', description='Edits')
+        self.assertFalse(instance.is_materialized)
+        self.assertEqual(materialize(instance)['agents'], 1)
+        self.assertEqual(instance.agents.count(), 2)
+
+        instance.agents.all().delete()
+        instance.refresh_from_db()
+        self.assertTrue(instance.is_materialized)
+        self.assertEqual(materialize(instance)['agents'], 0)
+
+    def test_clone_flow(self):
+        flow = CrewInstance.objects.create(name='Flow', owner=self.user, is_flow=True)
+        self.template.parent_crew = flow
+        self.template.save()
+
+        copy = clone_crew(flow, name='Flow Copy')
+        self.assertEqual(copy.name, 'Flow Copy')
+        sub_crew = copy.sub_crews.get()
+        self.assertEqual(sub_crew.agents.count(), 1)
+        self.assertEqual(sub_crew.tasks.count(), 2)
+        self.assertEqual(Task.objects.filter(crew=self.template).count(), 2)
@@ -0,0 +1,186 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.utils import timezone
+from crew import context
+from crew.batch import with_context
+from crew.context import Tokenizer, assemble_context, fit_outputs, get_budget, shorten, summarize
+from crew.llm import estimate_tokens
+from crew.models import CrewInstance, Agent, Task
+from crew.utils import format_task_context
+
+User = get_user_model()
+
+
+def _words(count, word='word'):
+    return ' '.join(f'{word}{index}' for index in range(count))
+
+
+REPORT = (
+    "Forklift operators must complete forklift safety training before driving. "
+    "The cafeteria serves lunch at noon. "
+    "Inspect the forklift before every shift and report forklift damage to the safety officer. "
+    "Parking permits are renewed every January. "
+    "Safety zones keep pedestrians away from forklift loads and forklift aisles. "
+    "Visitors sign in at reception.\n"
+    "Refresher forklift safety training is due every three years."
+)
+
+
+class FitOutputsTest(SimpleTestCase):
+    def test_short_text_is_kept(self):
+        self.assertEqual(shorten('A short output', 100), ('A short output', 0))
+
+    def test_long_text_keeps_opening_and_closing(self):
+        text = _words(2000)
+        kept, omitted = shorten(text, 100)
+        self.assertTrue(kept.startswith('word0 word1'))
+        self.assertTrue(kept.endswith('word1999'))
+        self.assertIn(f'[... {omitted} tokens omitted ...]', kept)
+        self.assertLessEqual(estimate_tokens(kept), 110)
+
+    def test_short_outputs_pass_their_share_on(self):
+        fitted = fit_outputs([('Outline', 'Brief outline'), ('Research', _words(5000))], 1000)
+        self.assertEqual(fitted[0]['text'], 'Brief outline')
+        self.assertEqual((fitted[0]['action'], fitted[0]['omitted']), ('kept', 0))
+        self.assertEqual(fitted[1]['action'], 'shortened')
+        self.assertGreater(fitted[1]['tokens'], 900)
+        self.assertLessEqual(sum(section['tokens'] for section in fitted), 1010)
+
+    def test_recent_strategy_drops_oldest_outputs(self):
+        outputs = [('Oldest', _words(400)), ('Older', _words(400)), ('Newest', _words(400))]
+        fitted = fit_outputs(outputs, 1100, 'recent')
+        self.assertEqual([section['action'] for section in fitted], ['dropped', 'shortened', 'kept'])
+        self.assertEqual(fitted[0]['text'], '')
+        self.assertEqual(fitted[0]['omitted'], estimate_tokens(_words(400)))
+
+    def test_summary_keeps_representative_sentences(self):
+        summary, omitted = summarize(REPORT, 70)
+        self.assertTrue(summary.startswith('Forklift operators must complete'))
+        self.assertIn('Refresher forklift safety training', summary)
+        self.assertNotIn('cafeteria', summary)
+        self.assertNotIn('Visitors', summary)
+        self.assertIn(f'[... summarized, {omitted} tokens omitted ...]', summary)
+        fitted = fit_outputs([('Report', REPORT)], 70, 'summary')
+        self.assertEqual(fitted[0]['action'], 'summarized')
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            fit_outputs([('Outline', 'text')], 100, 'random')
+
+    def test_budget_from_llm_config(self):
+        with override_settings(CREW_CONTEXT={'max_tokens': 500}):
+            self.assertEqual(get_budget({'model': 'gpt-4o'}, 100), 500)
+            self.assertEqual(get_budget({'max_context_tokens': 4000, 'max_tokens': 1000}, 100), 2900)
+            self.assertEqual(get_budget({'max_context_tokens': 1000, 'max_tokens': 1000}, 100), 0)
+
+    def test_tokenizer_falls_back_to_estimates(self):
+        with mock.patch.dict('sys.modules', {'tiktoken': None}):
+            tokenizer = Tokenizer('gpt-4o')
+        self.assertIsNone(tokenizer.encoding)
+        self.assertEqual(tokenizer.count('a' * 40), 10)
+        self.assertEqual(tokenizer.head('one two three four', 3), 'one two')
+        self.assertEqual(tokenizer.tail('one two three four', 1), 'four')
+
+    def test_batch_context_is_fitted(self):
+        with override_settings(CREW_CONTEXT={'max_tokens': 50}):
+            prompt = with_context('Write the script', [('Research', _words(1000))])
+        self.assertTrue(prompt.startswith('Write the script\n\nContext from previous tasks:\n\n## Research\n'))
+        self.assertIn('tokens omitted', prompt)
+
+
+class AssembleContextTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.outline = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline the module',
+            expected_output='An outline',
+            status='completed',
+            output_data={'result': 'Intro, safety, wrap-up'}
+        )
+        self.research = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Research',
+            description='Research the topic',
+            expected_output='Notes'
+        )
+        self.script = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script',
+            context=['Audience: new hires']
+        )
+        self.script.depends_on.add(self.outline, self.research)
+
+    def test_includes_description_entries_and_completed_outputs(self):
+        assembled = assemble_context(self.script)
+        self.assertEqual(
+            assembled.text,
+            'Write the script\n\nAudience: new hires\n\n'
+            'Context from previous tasks:\n\n## Outline\nIntro, safety, wrap-up'
+        )
+        self.assertEqual(assembled.tokens, estimate_tokens(assembled.text))
+        self.assertEqual([section['name'] for section in assembled.sections], ['Outline'])
+        self.assertEqual(format_task_context(self.script), assembled.text)
+
+    def test_oversized_outputs_are_shortened(self):
+        self.research.status = 'completed'
+        self.research.output_data = {'result': _words(5000)}
+        self.research.save()
+        with self.assertLogs('crew.context', level='INFO') as logs:
+            assembled = assemble_context(self.script, max_tokens=200)
+        self.assertIn('Intro, safety, wrap-up', assembled.text)
+        self.assertGreater(assembled.omitted_tokens, 0)
+        self.assertLess(assembled.tokens, 300)
+        self.assertEqual([section['name'] for section in assembled.trimmed], ['Research'])
+        self.assertIn('Research shortened', logs.output[0])
+
+    def test_agent_context_window_and_strategy(self):
+        self.agent.llm_config = {
+            'model': 'gpt-4o', 'max_tokens': 200, 'max_context_tokens': 400, 'context_strategy': 'recent'
+        }
+        self.agent.save()
+        self.research.status = 'completed'
+        self.research.completed_at = timezone.now()
+        self.research.output_data = {'result': _words(1000)}
+        self.research.save()
+        self.script.refresh_from_db()
+        assembled = assemble_context(self.script)
+        self.assertEqual(assembled.strategy, 'recent')
+        self.assertLess(assembled.budget, 200)
+        # The research completed last, so it is kept (shortened) and the outline dropped
+        self.assertEqual([section['action'] for section in assembled.sections], ['dropped', 'shortened'])
+        self.assertNotIn('Intro, safety', assembled.text)
+
+    def test_assembled_contexts_are_cached_by_parent_output(self):
+        with mock.patch.object(context, 'fit_outputs', wraps=context.fit_outputs) as fit:
+            first = assemble_context(self.script)
+            self.assertEqual(assemble_context(self.script).text, first.text)
+            self.assertEqual(fit.call_count, 1)
+
+            self.outline.output_data = {'result': 'Intro and wrap-up'}
+            self.outline.save()
+            self.assertIn('Intro and wrap-up', assemble_context(self.script).text)
+            self.assertEqual(fit.call_count, 2)
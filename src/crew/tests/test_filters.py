@@ -0,0 +1,78 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from crew.filters import AgentFilter, TaskFilter
+from crew.models import CrewInstance, Agent, Task
+
+User = get_user_model()
+
+
+class JSONFilterTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Test Crew',
+            owner=self.user
+        )
+        self.gpt = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes',
+            tools=['search'],
+            llm_config={'model': 'gpt-4o', 'options': {'temperature': 0.2}}
+        )
+        self.claude = Agent.objects.create(
+            crew=self.crew,
+            name='Editor',
+            role='editor',
+            description='Edits',
+            llm_config={'model': 'claude-3-5-sonnet'}
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.gpt,
+            name='Script',
+            description='Write the script',
+            expected_output='A script',
+            input_data={'topic': 'AI', 'audience': {'level': 'beginner'}}
+        )
+        Task.objects.create(
+            crew=self.crew,
+            agent=self.claude,
+            name='Review',
+            description='Review the script',
+            expected_output='Notes'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def agents(self, **params):
+        return set(AgentFilter(params, queryset=Agent.objects.all()).qs)
+
+    def tasks(self, **params):
+        return set(TaskFilter(params, queryset=Task.objects.all()).qs)
+
+    def test_agent_filters(self):
+        self.assertEqual(self.agents(llm_model='gpt-4o'), {self.gpt})
+        self.assertEqual(self.agents(llm_config='{"options": {"temperature": 0.2}}'), {self.gpt})
+        self.assertEqual(self.agents(llm_config='{"model": "gpt-4o", "options": {"temperature": 1}}'), set())
+        self.assertEqual(self.agents(has_tools='true'), {self.gpt})
+        self.assertEqual(self.agents(has_tools='false'), {self.claude})
+
+    def test_task_filters(self):
+        self.assertEqual(self.tasks(input_data='{"audience": {"level": "beginner"}}'), {self.task})
+        self.assertEqual(self.tasks(input_key='topic'), {self.task})
+        self.assertEqual(self.tasks(has_output='false'), set(Task.objects.all()))
+
+    def test_invalid_json_is_rejected(self):
+        response = self.client.get(reverse('api:agent-list'), {'llm_config': '["model"]'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('llm_config', response.data)
+
+    def test_api_filters_by_model(self):
+        response = self.client.get(reverse('api:agent-list'), {'llm_model': 'claude-3-5-sonnet'})
+        self.assertEqual([agent['id'] for agent in response.data], [self.claude.id])
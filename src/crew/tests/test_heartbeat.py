@@ -0,0 +1,171 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from crew.execution import CrewExecutor
+from crew.heartbeat import Heartbeat, reap_stale_executions, worker_id
+from crew.models import CrewInstance, Agent, Task, Execution
+from crew.scheduler import ExecutionScheduler
+
+User = get_user_model()
+
+
+class HeartbeatTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.outline = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline the module',
+            expected_output='An outline',
+            status='completed',
+            output_data={'result': 'Intro, safety, wrap-up'}
+        )
+        self.script = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script',
+            status='in_progress'
+        )
+        self.crew.status = 'running'
+        self.crew.save()
+
+    def _orphan(self, minutes=10, **fields):
+        """An execution whose worker was last heard from ``minutes`` ago."""
+        last_seen = timezone.now() - timedelta(minutes=minutes)
+        execution = Execution.objects.create(crew=self.crew, status='running', worker='web-1:42', **fields)
+        Execution.objects.filter(pk=execution.pk).update(started_at=last_seen, heartbeat_at=last_seen)
+        return Execution.objects.get(pk=execution.pk)
+
+    def test_heartbeat_records_worker(self):
+        execution = Execution.objects.create(crew=self.crew, status='running')
+        with Heartbeat(execution, interval=3600) as heartbeat:
+            execution.refresh_from_db()
+            self.assertEqual(execution.worker, worker_id())
+            self.assertIsNotNone(execution.heartbeat_at)
+            self.assertTrue(heartbeat.beat())
+            Execution.objects.filter(pk=execution.pk).update(status='failed')
+            self.assertFalse(heartbeat.beat())
+
+    def test_stale_execution_is_failed(self):
+        execution = self._orphan()
+        with self.assertLogs('crew.heartbeat', level='WARNING'):
+            reaped = reap_stale_executions()
+        self.assertEqual([(item.pk, action) for item, action in reaped], [(execution.pk, 'failed')])
+
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'failed')
+        self.assertEqual(execution.ended_at, execution.heartbeat_at)
+        self.assertIn('web-1:42 stopped responding', execution.results['error'])
+        self.script.refresh_from_db()
+        self.assertEqual(self.script.status, 'failed')
+        self.outline.refresh_from_db()
+        self.assertEqual(self.outline.status, 'completed')
+        self.crew.refresh_from_db()
+        self.assertEqual(self.crew.status, 'failed')
+
+    def test_fresh_execution_is_left_alone(self):
+        self._orphan(minutes=1)
+        self.assertEqual(reap_stale_executions(), [])
+
+    def test_queued_execution_is_requeued_once(self):
+        execution = self._orphan(queued_at=timezone.now() - timedelta(minutes=20))
+        reaped = reap_stale_executions(config={'policy': 'requeue'})
+        self.assertEqual(reaped[0][1], 'requeued')
+
+        execution.refresh_from_db()
+        self.assertEqual((execution.status, execution.requeue_count), ('queued', 1))
+        self.assertTrue(execution.keep_completed)
+        self.assertIsNone(execution.heartbeat_at)
+        self.script.refresh_from_db()
+        self.assertEqual(self.script.status, 'pending')
+        # The requeued execution no longer holds a slot
+        self.assertEqual(ExecutionScheduler().running(), ({}, {}))
+
+        ExecutionScheduler().claim(execution)
+        execution.refresh_from_db()
+        Execution.objects.filter(pk=execution.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(reap_stale_executions(config={'policy': 'requeue'})[0][1], 'failed')
+
+    def test_execution_outside_the_queue_is_failed(self):
+        self._orphan()
+        self.assertEqual(reap_stale_executions(config={'policy': 'requeue'})[0][1], 'failed')
+
+    def test_reaped_run_stops_at_next_task(self):
+        self.script.depends_on.add(self.outline)
+        executor = CrewExecutor(self.crew)
+
+        def reaped(task, **kwargs):
+            task.status = 'completed'
+            task.output_data = {'result': 'Done'}
+            task.save()
+            Execution.objects.filter(pk=executor.execution.pk).update(status='failed')
+
+        with mock.patch.object(Task, 'execute', autospec=True, side_effect=reaped) as execute:
+            results = executor.execute()
+        self.assertTrue(results['preempted'])
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(executor.execution.status, 'running')
+
+    def test_slow_worker_keeps_reaped_status(self):
+        executor = CrewExecutor(self.crew)
+
+        def slow(task, **kwargs):
+            task.status = 'completed'
+            task.output_data = {'result': 'Done'}
+            task.save()
+            # Reaped while the task was still running
+            Execution.objects.filter(pk=executor.execution.pk).update(status='failed')
+            CrewInstance.objects.filter(pk=self.crew.pk).update(status='failed')
+
+        with mock.patch.object(Task, 'execute', autospec=True, side_effect=slow):
+            with self.assertLogs('crew.execution', level='WARNING') as logs:
+                executor.execute(task=self.script)
+        self.assertIn('was taken from this worker', logs.output[-1])
+        executor.execution.refresh_from_db()
+        self.assertEqual(executor.execution.status, 'failed')
+        self.assertIsNone(executor.execution.ended_at)
+        self.crew.refresh_from_db()
+        self.assertEqual(self.crew.status, 'failed')
+
+    def test_sub_crew_executions_go_with_their_flow(self):
+        flow = CrewInstance.objects.create(name='Flow', owner=self.user, is_flow=True, status='running')
+        parent = self._orphan()
+        Execution.objects.filter(pk=parent.pk).update(crew=flow)
+        parent.refresh_from_db()
+        child = Execution.objects.create(
+            crew=self.crew, status='running', parent=parent, heartbeat_at=timezone.now()
+        )
+        self.assertEqual([action for _, action in reap_stale_executions()], ['failed'])
+        child.refresh_from_db()
+        self.assertEqual(child.status, 'failed')
+        self.script.refresh_from_db()
+        self.assertEqual(self.script.status, 'failed')
+        self.crew.refresh_from_db()
+        self.assertEqual(self.crew.status, 'failed')
+
+    def test_command(self):
+        execution = self._orphan()
+        out = StringIO()
+        call_command('reap_executions', '--once', stdout=out)
+        self.assertIn(f"Execution {execution.pk} of 'Script Crew' failed", out.getvalue())
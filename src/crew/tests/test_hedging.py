@@ -0,0 +1,167 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+from crew.hedging import TRACKER, LatencyTracker, get_config
+from crew.llm import kickoff
+
+HEDGING = {'min_samples': 5, 'min_delay': 0.05, 'max_ratio': 0.5}
+
+
+class FakeCrew:
+    def __init__(self, result, wait=None, error=None):
+        self.result = result
+        self.wait = wait
+        self.error = error
+        self.calls = 0
+
+    def kickoff(self):
+        self.calls += 1
+        if self.wait is not None:
+            self.wait.wait(5)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class LatencyTrackerTest(SimpleTestCase):
+    def test_threshold_needs_samples(self):
+        tracker = LatencyTracker(window=10)
+        for seconds in range(1, 5):
+            tracker.record('gpt-4o', seconds)
+        self.assertIsNone(tracker.threshold('gpt-4o', 90, min_samples=5))
+        for seconds in range(5, 21):
+            tracker.record('gpt-4o', seconds)
+        # Only the last ten latencies count
+        self.assertEqual(tracker.threshold('gpt-4o', 90, min_samples=5), 20)
+        self.assertEqual(tracker.threshold('gpt-4o', 50), 16)
+
+    def test_hedge_ratio(self):
+        tracker = LatencyTracker(window=10)
+        for _ in range(9):
+            tracker.count('gpt-4o', False)
+        self.assertTrue(tracker.allow('gpt-4o', 0.2))
+        tracker.count('gpt-4o', True)
+        tracker.count('gpt-4o', True)
+        self.assertFalse(tracker.allow('gpt-4o', 0.2))
+
+    def test_wasted_tokens(self):
+        tracker = LatencyTracker(window=10)
+        for _ in range(9):
+            tracker.count('gpt-4o', False, 1000)
+        record = tracker.count('gpt-4o', True, 1000)
+        self.assertTrue(tracker.allow('gpt-4o', 0.5))
+        # The abandoned request used more than half of all tokens requested
+        tracker.waste(record, 6000)
+        self.assertFalse(tracker.allow('gpt-4o', 0.5))
+
+    def test_opt_in(self):
+        with override_settings(CREW_HEDGING={'percentile': 99}):
+            self.assertIsNone(get_config({'model': 'gpt-4o'}))
+            self.assertEqual(get_config({'hedge': True})['percentile'], 99)
+            self.assertEqual(get_config({'hedge': {'percentile': 90}})['percentile'], 90)
+        with override_settings(CREW_HEDGING={'enabled': True}):
+            self.assertIsNotNone(get_config({'model': 'gpt-4o'}))
+            self.assertIsNone(get_config({'model': 'gpt-4o', 'hedge': False}))
+
+
+@override_settings(CREW_HEDGING=HEDGING)
+class HedgedKickoffTest(SimpleTestCase):
+    llm_config = {'model': 'gpt-4o', 'hedge': {'fallback_model': 'gpt-4o-mini'}}
+
+    def setUp(self):
+        TRACKER.reset()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.built = []
+
+    def build_hedge(self, llm_config, crew=None):
+        self.built.append(llm_config['model'])
+        return crew or FakeCrew('fallback answer')
+
+    def warm_up(self, count=5):
+        for _ in range(count):
+            kickoff(FakeCrew('fast'), self.llm_config, build_hedge=self.build_hedge)
+
+    def test_not_hedged_before_enough_samples(self):
+        result = kickoff(FakeCrew('answer'), self.llm_config, build_hedge=self.build_hedge)
+        self.assertEqual(result, 'answer')
+        self.assertEqual(self.built, [])
+
+    def test_slow_request_is_hedged_with_fallback_model(self):
+        self.warm_up()
+        slow = FakeCrew('slow answer', wait=self.release)
+        with self.assertLogs('crew.hedging', level='INFO') as logs:
+            result = kickoff(slow, self.llm_config, build_hedge=self.build_hedge)
+        self.assertEqual(result, 'fallback answer')
+        self.assertEqual(self.built, ['gpt-4o-mini'])
+        self.assertIn('hedging with gpt-4o-mini', logs.output[0])
+
+    def test_abandoned_request_is_accounted(self):
+        self.warm_up()
+        slow = FakeCrew('slow answer', wait=self.release)
+        abandoned = []
+
+        def on_abandoned(result, crew, llm_config):
+            abandoned.append((result, crew, llm_config['model']))
+            return 2500
+
+        result = kickoff(slow, self.llm_config, build_hedge=self.build_hedge, on_abandoned=on_abandoned)
+        self.assertEqual(result, 'fallback answer')
+        self.assertEqual(abandoned, [])
+        self.release.set()
+        # The tokens of the original request count once it finishes
+        record = TRACKER.decisions['gpt-4o'][-1]
+        for _ in range(500):
+            if record[2]:
+                break
+            time.sleep(0.01)
+        self.assertEqual(abandoned, [('slow answer', slow, 'gpt-4o')])
+        self.assertEqual(record, [True, 0, 2500])
+
+    def test_fast_request_is_not_hedged(self):
+        self.warm_up()
+        fast = FakeCrew('answer', wait=threading.Event())
+        fast.wait.set()
+        self.assertEqual(kickoff(fast, self.llm_config, build_hedge=self.build_hedge), 'answer')
+        self.assertEqual(self.built, [])
+
+    def test_hedges_are_capped(self):
+        config = {'model': 'gpt-4o', 'hedge': {'max_ratio': 0.25}}
+        self.warm_up()
+        slow = FakeCrew('slow answer', wait=self.release)
+        self.assertEqual(kickoff(slow, config, build_hedge=self.build_hedge), 'fallback answer')
+        # One of six requests was hedged; another would make it two of seven
+        slow = FakeCrew('slow answer', wait=threading.Event())
+        threading.Timer(0.2, slow.wait.set).start()
+        with self.assertLogs('crew.hedging', level='INFO') as logs:
+            self.assertEqual(kickoff(slow, config, build_hedge=self.build_hedge), 'slow answer')
+        self.assertIn('hedge budget used up', logs.output[0])
+        self.assertEqual(len(self.built), 1)
+
+    def test_large_requests_are_not_hedged(self):
+        self.warm_up()
+        slow = FakeCrew('slow answer', wait=threading.Event())
+        threading.Timer(0.2, slow.wait.set).start()
+        config = {**self.llm_config, 'max_tokens': 40000}
+        self.assertEqual(kickoff(slow, config, build_hedge=self.build_hedge), 'slow answer')
+        self.assertEqual(self.built, [])
+
+    def test_original_error_is_raised_when_both_fail(self):
+        self.warm_up()
+        self.release.set()
+        failing = FakeCrew(None, wait=threading.Event(), error=ValueError('bad request'))
+        threading.Timer(0.2, failing.wait.set).start()
+
+        def build_hedge(llm_config):
+            return self.build_hedge(llm_config, FakeCrew(None, error=KeyError('fallback')))
+
+        with self.assertRaisesMessage(ValueError, 'bad request'):
+            kickoff(failing, self.llm_config, build_hedge=build_hedge)
+
+    def test_without_opt_in(self):
+        self.warm_up()
+        slow = FakeCrew('slow answer', wait=threading.Event())
+        threading.Timer(0.2, slow.wait.set).start()
+        self.assertEqual(kickoff(slow, {'model': 'gpt-4o'}, build_hedge=self.build_hedge), 'slow answer')
+        self.assertEqual(self.built, [])
@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from crew.models import CrewInstance, Agent, Task
+
+User = get_user_model()
+
+
+class ListViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+        self.add_crew(0)
+
+    def add_crew(self, index, status='pending'):
+        crew = CrewInstance.objects.create(name=f'Crew {index}', owner=self.user)
+        agent = Agent.objects.create(crew=crew, name=f'Writer {index}', role='writer', description='Writes')
+        Task.objects.create(crew=crew, agent=agent, name=f'Outline {index}', description='Outline',
+                            expected_output='An outline', status=status,
+                            output_data={'result': 'Done'} if status == 'completed' else {})
+        return crew
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        for name in ('crew_list', 'agent_list', 'task_list'):
+            url = reverse(f'crew:{name}')
+            before = self.count_queries(url)
+            for index in range(1, 4):
+                self.add_crew(f'{name} {index}')
+            self.assertEqual(self.count_queries(url), before, name)
+
+    def test_paginates(self):
+        for index in range(1, 30):
+            self.add_crew(index)
+        response = self.client.get(reverse('crew:task_list'), {'search': 'Outline'})
+        self.assertEqual(len(response.context['task_list']), 25)
+        self.assertContains(response, 'search=Outline&amp;page=2')
+        response = self.client.get(reverse('crew:task_list'), {'search': 'Outline', 'page': 2})
+        self.assertEqual(len(response.context['task_list']), 5)
+
+    def test_search_and_filters(self):
+        self.add_crew(1, status='completed')
+        other = User.objects.create_user(username='other', password='testpass123')
+        CrewInstance.objects.create(name='Crew 1 elsewhere', owner=other)
+
+        response = self.client.get(reverse('crew:crew_list'), {'search': 'crew 1'})
+        self.assertEqual([crew.name for crew in response.context['crew_list']], ['Crew 1'])
+        response = self.client.get(reverse('crew:task_list'), {'status': 'completed'})
+        self.assertEqual([task.name for task in response.context['task_list']], ['Outline 1'])
+        response = self.client.get(reverse('crew:agent_list'), {'search': 'writer 0'})
+        self.assertEqual([agent.name for agent in response.context['agent_list']], ['Writer 0'])
+        response = self.client.get(reverse('crew:agent_list'), {'role': 'editor'})
+        self.assertContains(response, 'No agents match these filters.')
+
+    def test_light_defers_heavy_columns(self):
+        task = Task.objects.light('output_data').get()
+        self.assertEqual(task.get_deferred_fields(), set(Task.HEAVY_FIELDS) - {'output_data'})
+        with self.assertNumQueries(0):
+            task.output_data
+
+    def test_execution_history_queries_do_not_grow_with_rows(self):
+        crew = CrewInstance.objects.get(name='Crew 0')
+        url = reverse('crew:execution_history', kwargs={'pk': crew.pk})
+        crew.executions.create(status='failed')
+        before = self.count_queries(url)
+        for status in ('completed', 'stopped', 'failed'):
+            crew.executions.create(status=status)
+        self.assertEqual(self.count_queries(url), before)
@@ -33,7 +33,43 @@ class CrewPermissionsTest(APITestCase):
         self.client.force_authenticate(user=self.user2)
         url = reverse('api:crewinstance-detail', args=[self.crew.id])
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        # Other users' crews are not visible at all
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(CrewInstance.objects.filter(pk=self.crew.pk).exists())
+
+    def test_other_users_data_is_hidden(self):
+        agent = Agent.objects.create(crew=self.crew, name='Writer', role='writer', description='Writes')
+        task = Task.objects.create(
+            crew=self.crew,
+            agent=agent,
+            name='Script',
+            description='Write a script',
+            expected_output='A script'
+        )
+        self.client.force_authenticate(user=self.user2)
+        for name in ('crewinstance', 'agent', 'task'):
+            self.assertEqual(self.client.get(reverse(f'api:{name}-list')).data, [])
+        for name, pk in (('crewinstance', self.crew.pk), ('agent', agent.pk), ('task', task.pk)):
+            url = reverse(f'api:{name}-detail', args=[pk])
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+        for action in ('export', 'clone', 'agents', 'tasks'):
+            url = reverse(f'api:crewinstance-{action}', args=[self.crew.pk])
+            response = self.client.post(url) if action == 'clone' else self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+        self.assertEqual(CrewInstance.objects.count(), 1)
+
+    def test_cannot_add_to_other_users_crew(self):
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.post(reverse('api:agent-list'), {
+            'crew': self.crew.pk,
+            'name': 'Intruder',
+            'role': 'writer',
+            'description': 'Not mine'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('crew', response.data)
 
     def test_owner_crew_access(self):
         self.client.force_authenticate(user=self.user1)
@@ -77,7 +113,7 @@ class AgentPermissionsTest(APITestCase):
             'name': 'Modified Agent',
             'role': 'writer'
         })
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_owner_agent_access(self):
         self.client.force_authenticate(user=self.user1)
@@ -127,7 +163,7 @@ class TaskPermissionsTest(APITestCase):
         response = self.client.patch(url, {
             'status': 'completed'
         })
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_owner_task_access(self):
         self.client.force_authenticate(user=self.user1)
@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from crew.models import CrewInstance, Agent, Task
+from crew.profiling import Profiler, activate, span, timeline, to_otlp
+
+User = get_user_model()
+
+
+class ProfilerTest(SimpleTestCase):
+    def test_spans_nest_and_record_errors(self):
+        profiler = Profiler()
+        with activate(profiler):
+            with span('crew.execute'):
+                with span('task', task='Outline'):
+                    pass
+                with self.assertRaises(ValueError):
+                    with span('task', task='Script'):
+                        raise ValueError('boom')
+        spans = profiler.as_dict()['spans']
+        self.assertEqual([s['name'] for s in spans], ['crew.execute', 'task', 'task'])
+        self.assertEqual([s['parent'] for s in spans], [None, 1, 1])
+        self.assertEqual(spans[2]['attributes']['error'], 'ValueError: boom')
+        self.assertTrue(all(s['duration'] is not None for s in spans))
+
+    def test_span_without_profiler_is_noop(self):
+        with span('task'):
+            pass
+
+    def test_timeline_and_otlp(self):
+        profile = {
+            'started_at': 1700000000.0,
+            'duration': 2.0,
+            'spans': [
+                {'id': 1, 'parent': None, 'name': 'crew.execute', 'start': 0.0, 'duration': 2.0,
+                 'thread': 'MainThread', 'attributes': {}},
+                {'id': 2, 'parent': 1, 'name': 'llm.kickoff', 'start': 0.5, 'duration': 1.0,
+                 'thread': 'MainThread', 'attributes': {'model': 'gpt-4o'}},
+            ],
+        }
+        rows = timeline(profile)
+        self.assertEqual([(r['name'], r['depth'], r['left'], r['width']) for r in rows],
+                         [('crew.execute', 0, 0.0, 100.0), ('llm.kickoff', 1, 25.0, 50.0)])
+
+        spans = to_otlp(profile)['resourceSpans'][0]['scopeSpans'][0]['spans']
+        self.assertEqual(spans[1]['parentSpanId'], spans[0]['spanId'])
+        self.assertEqual(spans[0]['traceId'], spans[1]['traceId'])
+        self.assertEqual(len(spans[0]['traceId']), 32)
+        self.assertEqual(spans[1]['startTimeUnixNano'], str(1700000000500000000))
+        self.assertIn({'key': 'model', 'value': {'stringValue': 'gpt-4o'}}, spans[1]['attributes'])
+
+
+class ExecutionProfileTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Test Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline',
+            expected_output='An outline'
+        )
+
+    def _complete(self, task, execution=None):
+        with span('llm.kickoff'):
+            task.status = 'completed'
+            task.output_data = {'result': task.name}
+            task.save()
+
+    def _execute(self):
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=self._complete):
+            self.crew.execute()
+        return self.crew.executions.get()
+
+    def test_execution_stores_profile(self):
+        execution = self._execute()
+        names = [row['name'] for row in execution.timeline]
+        self.assertEqual(
+            names, ['crew.execute', 'db.load_tasks', 'task', 'task.attempt', 'llm.kickoff', 'version.record']
+        )
+        self.assertEqual(execution.timeline[2]['attributes']['task'], 'Outline')
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('crew:execution_history', kwargs={'pk': self.crew.pk}))
+        self.assertContains(response, f'timeline-{execution.pk}')
+
+    def test_other_users_profiles_are_hidden(self):
+        self._execute()
+        User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.login(username='otheruser', password='testpass123')
+        response = self.client.get(reverse('crew:execution_history', kwargs={'pk': self.crew.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_exports_otlp_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces', 'crew.jsonl')
+            with override_settings(CREW_PROFILE_EXPORT_PATH=path):
+                self._execute()
+            with open(path) as traces:
+                document = json.loads(traces.readline())
+        spans = document['resourceSpans'][0]['scopeSpans'][0]['spans']
+        self.assertEqual(spans[0]['name'], 'crew.execute')
+
+    @override_settings(CREW_PROFILING=False)
+    def test_profiling_can_be_disabled(self):
+        self.assertEqual(self._execute().profile, {})
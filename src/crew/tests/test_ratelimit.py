@@ -0,0 +1,125 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from crew.metrics import RATE_LIMIT_WAIT, RATE_LIMITED
+from crew.ratelimit import (
+    CacheBackend, LocalBackend, RateLimiter, RateLimitTimeout, TokenBucket, is_rate_limit_error, limit_key
+)
+
+
+class RateLimitedError(Exception):
+    status_code = 429
+
+
+class TokenBucketTest(SimpleTestCase):
+    def test_bucket_admits_up_to_capacity(self):
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertGreater(bucket.try_acquire(), 0.0)
+
+    def test_oversized_request_is_clamped(self):
+        bucket = TokenBucket(rate=1.0, capacity=10)
+        self.assertEqual(bucket.try_acquire(50), 0.0)
+
+
+class RateLimiterTest(SimpleTestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(limits={
+            'default': {'max_concurrency': 1},
+            'openai/gpt-4': {'rpm': 60, 'burst': 1, 'max_wait': 0.5},
+            'gpt-3.5': {'rpm': 6000},
+        }, backend=LocalBackend())
+
+    def test_limit_key(self):
+        self.assertEqual(limit_key({'model': 'openai/gpt-4'}), ('openai', 'gpt-4'))
+        self.assertEqual(limit_key({'model': 'gpt-4', 'provider': 'azure'}), ('azure', 'gpt-4'))
+        self.assertEqual(limit_key({}), ('', 'default'))
+
+    def test_most_specific_limits_win(self):
+        self.assertEqual(self.limiter.get_limits({'model': 'openai/gpt-4'})[0], 'openai/gpt-4')
+        self.assertEqual(self.limiter.get_limits({'model': 'gpt-3.5'})[0], 'gpt-3.5')
+        self.assertEqual(self.limiter.get_limits({'model': 'claude'})[0], 'default')
+
+    def test_acquire_waits_for_capacity(self):
+        config = {'model': 'openai/gpt-4'}
+        self.limiter.acquire(config)
+        with self.assertRaises(RateLimitTimeout):
+            self.limiter.acquire(config)
+
+    def test_call_retries_rate_limit_errors(self):
+        retried = RATE_LIMITED.values.get(('default',), 0)
+        fn = mock.Mock(side_effect=[RateLimitedError('Too many requests'), 'done'])
+        with mock.patch('crew.ratelimit.time.sleep') as sleep:
+            result = self.limiter.call(fn, {'model': 'claude'})
+        self.assertEqual(result, 'done')
+        self.assertEqual(fn.call_count, 2)
+        sleep.assert_called_once()
+        self.assertEqual(self.limiter.snapshot()['default']['rate_limited'], 1)
+        self.assertEqual(RATE_LIMITED.values[('default',)] - retried, 1)
+
+    def test_call_does_not_retry_other_errors(self):
+        fn = mock.Mock(side_effect=ValueError('bad prompt'))
+        with self.assertRaises(ValueError):
+            self.limiter.call(fn, {'model': 'gpt-3.5'})
+        self.assertEqual(fn.call_count, 1)
+        self.assertFalse(is_rate_limit_error(ValueError('bad prompt')))
+
+    def test_waits_are_exported(self):
+        self.limiter.acquire({'model': 'gpt-3.5'})
+        with self.limiter.slot({'model': 'claude'}):
+            pass
+        self.assertIn(('gpt-3.5', 'budget'), RATE_LIMIT_WAIT.values)
+        self.assertIn(('default', 'slot'), RATE_LIMIT_WAIT.values)
+
+    def test_concurrency_slot_is_released(self):
+        config = {'model': 'claude'}
+        with self.limiter.slot(config):
+            self.assertFalse(self.limiter.backend.enter('default:slots', 1))
+        self.assertTrue(self.limiter.backend.enter('default:slots', 1))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheBackendTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CacheBackend()
+
+    def test_slots_are_held_per_caller(self):
+        first = self.backend.enter('default:slots', 2)
+        second = self.backend.enter('default:slots', 2)
+        self.assertTrue(first and second)
+        self.assertIsNone(self.backend.enter('default:slots', 2))
+        self.backend.leave('default:slots', 2, first)
+        self.assertTrue(self.backend.enter('default:slots', 2))
+
+    def test_held_slot_is_refreshed(self):
+        limiter = RateLimiter(limits={'default': {'max_concurrency': 1}}, backend=self.backend)
+        with mock.patch.object(CacheBackend, 'refresh_interval', 0.01), \
+                mock.patch.object(CacheBackend, 'refresh', autospec=True, return_value=True) as refresh:
+            with limiter.slot({'model': 'claude'}):
+                time.sleep(0.1)
+        self.assertGreater(refresh.call_count, 1)
+        self.assertEqual(refresh.call_args[0][1], 'default:slots')
+        self.assertTrue(self.backend.enter('default:slots', 1))
+
+    def test_refresh_only_keeps_own_slot(self):
+        holder = self.backend.enter('default:slots', 1)
+        self.assertTrue(self.backend.refresh('default:slots', holder))
+        cache.clear()
+        other = self.backend.enter('default:slots', 1)
+        self.assertFalse(self.backend.refresh('default:slots', holder))
+        self.assertTrue(self.backend.refresh('default:slots', other))
+
+    def test_leaving_an_expired_slot(self):
+        holder = self.backend.enter('default:slots', 1)
+        # The slot expired and another caller took it
+        cache.clear()
+        other = self.backend.enter('default:slots', 1)
+        self.backend.leave('default:slots', 1, holder)
+        self.assertIsNone(self.backend.enter('default:slots', 1))
+        self.backend.leave('default:slots', 1, other)
+        self.backend.leave('default:slots', 1, other)
+        self.assertTrue(self.backend.enter('default:slots', 1))
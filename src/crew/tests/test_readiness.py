@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from crew.models import CrewInstance, Agent, Task
+
+User = get_user_model()
+
+
+class ReadinessTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Test Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.outline = self.create_task('Outline')
+        self.research = self.create_task('Research')
+        self.script = self.create_task('Script')
+        self.script.depends_on.add(self.outline, self.research)
+        self.client.force_authenticate(user=self.user)
+
+    def create_task(self, name):
+        return Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name=name,
+            description=name,
+            expected_output=name
+        )
+
+    def complete(self, task):
+        task.status = 'completed'
+        task.output_data = {'result': task.name}
+        task.save()
+
+    def test_ready_tasks_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(set(Task.objects.ready()), {self.outline, self.research})
+        self.complete(self.outline)
+        self.assertEqual(set(Task.objects.ready()), {self.research})
+        self.complete(self.research)
+        self.assertEqual(set(Task.objects.ready()), {self.script})
+
+    def test_check_uses_annotation(self):
+        script = Task.objects.with_readiness().get(pk=self.script.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(script.check_dependencies_complete())
+        self.assertFalse(self.script.check_dependencies_complete())
+        self.assertTrue(self.outline.check_dependencies_complete())
+
+    def test_api_reports_readiness(self):
+        response = self.client.get(reverse('api:task-list'), {'ready': 'true'})
+        self.assertEqual({task['id'] for task in response.data}, {self.outline.id, self.research.id})
+        self.assertTrue(all(task['dependencies_complete'] for task in response.data))
+        response = self.client.get(reverse('api:task-list'), {'ready': 'false'})
+        self.assertEqual([task['id'] for task in response.data], [self.script.id])
+        self.assertFalse(response.data[0]['dependencies_complete'])
+
+    def test_execute_page_lists_blocking_dependencies(self):
+        self.complete(self.outline)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('crew:execute_task', kwargs={'pk': self.script.pk}))
+        self.assertFalse(response.context['dependencies_complete'])
+        self.assertEqual(list(response.context['dependencies']), [self.research])
+
+    def test_executor_does_not_recheck_dependencies(self):
+        def complete(task, execution=None):
+            self.complete(task)
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=complete), \
+                mock.patch.object(Task, 'check_dependencies_complete') as check:
+            self.crew.execute()
+        check.assert_not_called()
+        self.assertEqual(Task.objects.filter(status='completed').count(), 3)
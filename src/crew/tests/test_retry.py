@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.contrib.auth import get_user_model
+from crew.models import CrewInstance, Agent, Task, Execution
+from crew.retry import RetryPolicy, is_transient_error
+
+User = get_user_model()
+
+
+class RetryPolicyTest(SimpleTestCase):
+    def test_later_configs_override_earlier(self):
+        policy = RetryPolicy.from_dict({'max_attempts': 3, 'base_delay': 1}, {'max_attempts': 5, 'unknown': 1})
+        self.assertEqual(policy.max_attempts, 5)
+        self.assertEqual(policy.base_delay, 1)
+
+    def test_only_transient_errors_are_retried(self):
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry(TimeoutError('slow'), 1))
+        self.assertFalse(policy.should_retry(TimeoutError('slow'), 3))
+        self.assertFalse(policy.should_retry(ValueError('bad'), 1))
+        self.assertTrue(is_transient_error(type('APIConnectionError', (Exception,), {})()))
+
+    def test_delay_is_capped_and_jittered(self):
+        policy = RetryPolicy(base_delay=2, max_delay=10, jitter=0.5)
+        self.assertTrue(2 <= policy.delay(1) <= 3)
+        self.assertTrue(10 <= policy.delay(6) <= 15)
+
+
+@override_settings(CREW_RETRY_POLICY={'max_attempts': 1})
+class TaskRetryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Test Crew',
+            owner=self.user,
+            config={'retry': {'max_attempts': 3, 'base_delay': 0}}
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.outline = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline',
+            expected_output='An outline'
+        )
+        self.script = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Script',
+            expected_output='A script'
+        )
+        self.script.depends_on.add(self.outline)
+
+    def _complete(self, task, execution=None):
+        task.status = 'completed'
+        task.output_data = {'result': task.name}
+        task.save()
+
+    def test_transient_failures_are_retried(self):
+        calls = []
+
+        def attempt(task, execution=None):
+            calls.append(task.attempts)
+            if len(calls) < 3:
+                raise TimeoutError('LLM timed out')
+            self._complete(task)
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=attempt), \
+                mock.patch('time.sleep'):
+            self.outline.execute()
+
+        self.assertEqual(calls, [1, 2, 3])
+        self.outline.refresh_from_db()
+        self.assertEqual(self.outline.status, 'completed')
+        self.assertEqual(self.outline.attempts, 3)
+
+    def test_each_run_gets_all_attempts(self):
+        calls = []
+
+        def attempt(task, execution=None):
+            calls.append(task.attempts)
+            raise TimeoutError('LLM timed out')
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=attempt), \
+                mock.patch('time.sleep'):
+            for _ in range(2):
+                with self.assertRaises(TimeoutError):
+                    self.outline.execute()
+        self.assertEqual(calls, [1, 2, 3, 1, 2, 3])
+
+    def test_permanent_failure_is_not_retried(self):
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=ValueError('bad')):
+            with self.assertRaises(ValueError):
+                self.outline.execute()
+        self.outline.refresh_from_db()
+        self.assertEqual(self.outline.status, 'failed')
+        self.assertEqual(self.outline.attempts, 1)
+
+    def test_resume_skips_completed_tasks(self):
+        ran = []
+
+        def fail_script(task, execution=None):
+            ran.append(task.name)
+            if task.name == 'Script':
+                raise ValueError('bad output')
+            self._complete(task)
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=fail_script):
+            results = self.crew.execute()
+        self.assertFalse(results['success'])
+        self.assertEqual(ran, ['Outline', 'Script'])
+        failed = Execution.objects.get(crew=self.crew)
+        self.assertEqual(failed.status, 'failed')
+        self.assertEqual(failed.results['failed_tasks'], [self.script.pk])
+
+        ran.clear()
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=self._complete):
+            results = failed.resume()
+        self.assertTrue(results['success'])
+        self.assertEqual(results['completed_tasks'], [self.outline.pk, self.script.pk])
+        resumed = Execution.objects.get(resumed_from=failed)
+        self.assertEqual(resumed.status, 'completed')
+        self.crew.refresh_from_db()
+        self.assertEqual(self.crew.status, 'completed')
+
+    def test_failed_dependency_blocks_dependents(self):
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=ValueError('bad')):
+            results = self.crew.execute()
+        self.assertEqual(results['failed_tasks'], [self.outline.pk])
+        self.assertEqual(results['blocked_tasks'], [self.script.pk])
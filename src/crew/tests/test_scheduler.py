@@ -0,0 +1,324 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from crew.models import CrewInstance, Agent, Task, Execution, DailyUsage
+from crew.scheduler import ExecutionScheduler
+from crew.usage import BudgetExceeded
+
+User = get_user_model()
+
+
+class ExecutionSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Batch Crew',
+            owner=self.user
+        )
+        self.other_crew = CrewInstance.objects.create(
+            name='Interactive Crew',
+            owner=self.other
+        )
+        for crew in (self.crew, self.other_crew):
+            agent = Agent.objects.create(
+                crew=crew,
+                name='Writer',
+                role='writer',
+                description='Writes'
+            )
+            Task.objects.create(
+                crew=crew,
+                agent=agent,
+                name='Script',
+                description='Script',
+                expected_output='A script'
+            )
+        self.other_task = self.other_crew.tasks.get()
+        self.scheduler = ExecutionScheduler({
+            'inline': False,
+            'max_concurrent': 2,
+            'max_concurrent_per_owner': 1,
+            'interactive_reserved': 0,
+        })
+
+    def _complete(self, task, execution=None):
+        task.status = 'completed'
+        task.output_data = {'result': task.name}
+        task.save()
+
+    def test_submit_queues_execution(self):
+        execution = self.scheduler.submit(self.crew)
+        self.assertEqual(execution.status, 'queued')
+        self.assertIsNotNone(execution.queued_at)
+
+    def test_owner_with_less_recent_usage_goes_first(self):
+        now = timezone.now()
+        Execution.objects.create(crew=self.crew, status='completed', ended_at=now)
+        Execution.objects.filter(crew=self.crew).update(started_at=now - timedelta(minutes=30))
+        for _ in range(3):
+            self.scheduler.submit(self.crew)
+        waiting = self.scheduler.submit(self.other_crew)
+        self.assertEqual(self.scheduler.next_execution(), waiting)
+
+    def test_weights_scale_usage(self):
+        now = timezone.now()
+        Execution.objects.create(crew=self.crew, status='completed', ended_at=now)
+        Execution.objects.create(crew=self.other_crew, status='completed', ended_at=now)
+        Execution.objects.filter(crew=self.crew).update(started_at=now - timedelta(minutes=30))
+        Execution.objects.filter(crew=self.other_crew).update(started_at=now - timedelta(minutes=10))
+        first = self.scheduler.submit(self.crew)
+        self.scheduler.submit(self.other_crew)
+        self.scheduler.config['owner_weights'] = {'testuser': 10}
+        self.assertEqual(self.scheduler.next_execution(), first)
+
+    def test_per_owner_and_global_limits(self):
+        Execution.objects.create(crew=self.crew, status='running')
+        self.scheduler.submit(self.crew)
+        self.assertIsNone(self.scheduler.next_execution())
+
+        waiting = self.scheduler.submit(self.other_crew)
+        self.assertEqual(self.scheduler.next_execution(), waiting)
+        Execution.objects.create(crew=self.other_crew, status='running')
+        self.assertIsNone(self.scheduler.next_execution())
+
+    def test_claim_only_succeeds_once(self):
+        execution = self.scheduler.submit(self.crew)
+        stale = Execution.objects.get(pk=execution.pk)
+        self.assertTrue(self.scheduler.claim(execution))
+        self.assertFalse(self.scheduler.claim(stale))
+        self.assertEqual(execution.status, 'running')
+
+    def test_competing_claims_for_one_slot(self):
+        self.scheduler.config['max_concurrent'] = 1
+        first = self.scheduler.submit(self.crew)
+        second = self.scheduler.submit(self.other_crew)
+        # Both were picked while the slot was free
+        self.assertEqual(self.scheduler.next_execution(), first)
+        self.assertTrue(self.scheduler.claim(first))
+        self.assertFalse(self.scheduler.claim(second))
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'queued')
+        self.assertEqual(Execution.objects.filter(status='running').count(), 1)
+
+    def test_claim_respects_owner_limit(self):
+        Execution.objects.create(crew=self.crew, status='running')
+        self.assertFalse(self.scheduler.claim(self.scheduler.submit(self.crew)))
+        self.assertTrue(self.scheduler.claim(self.scheduler.submit(self.other_crew)))
+
+    def test_run_next_executes_claimed_execution(self):
+        execution = self.scheduler.submit(self.crew)
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=self._complete):
+            self.assertEqual(self.scheduler.run_next(), execution)
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'completed')
+        self.assertIsNotNone(execution.wait_time)
+        self.assertEqual(Execution.objects.filter(crew=self.crew).count(), 1)
+        self.assertIsNone(self.scheduler.run_next())
+
+    def test_inline_runs_admitted_execution(self):
+        self.scheduler.config['inline'] = True
+        Execution.objects.create(crew=self.crew, status='running')
+        queued = self.scheduler.submit_and_run(self.crew)
+        self.assertEqual(queued.status, 'queued')
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=self._complete):
+            ran = self.scheduler.submit_and_run(self.other_crew)
+        self.assertEqual(ran.status, 'completed')
+
+    def test_owner_token_budget(self):
+        DailyUsage.objects.create(
+            date=timezone.localdate(),
+            owner=self.user,
+            crew=self.crew,
+            model='gpt-4o',
+            total_tokens=1000
+        )
+        self.scheduler.config['owner_token_budgets'] = {'testuser': 500}
+        with self.assertRaises(BudgetExceeded):
+            self.scheduler.submit(self.crew)
+        self.scheduler.submit(self.other_crew)
+
+    def test_interactive_lane_goes_first(self):
+        self.scheduler.submit(self.crew)
+        interactive = self.scheduler.submit(self.other_crew, task=self.other_task)
+        self.assertEqual(interactive.priority, 'interactive')
+        self.assertEqual(self.scheduler.next_execution(), interactive)
+
+    def test_priority_from_crew_config(self):
+        self.other_crew.config = {'priority': 'interactive'}
+        self.assertEqual(self.scheduler.submit(self.other_crew).priority, 'interactive')
+        self.assertEqual(self.scheduler.submit(self.other_crew, priority='batch').priority, 'batch')
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(self.crew, priority='urgent')
+
+    def test_reserved_capacity_is_kept_from_batch(self):
+        self.scheduler.config['interactive_reserved'] = 1
+        Execution.objects.create(crew=self.other_crew, status='running')
+        self.scheduler.submit(self.crew)
+        self.assertIsNone(self.scheduler.next_execution())
+        interactive = self.scheduler.submit(self.crew, priority='interactive')
+        self.assertEqual(self.scheduler.next_execution(), interactive)
+
+    def test_single_task_run(self):
+        Task.objects.create(
+            crew=self.other_crew,
+            agent=self.other_task.agent,
+            name='Outline',
+            description='Outline',
+            expected_output='An outline'
+        )
+        execution = self.scheduler.submit(self.other_crew, task=self.other_task)
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=self._complete):
+            self.scheduler.run_next()
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.results['completed_tasks'], [self.other_task.pk])
+        self.assertEqual(self.other_crew.tasks.get(name='Outline').status, 'pending')
+
+    def test_batch_run_yields_to_interactive_work(self):
+        self.scheduler.config.update({'max_concurrent': 1, 'poll_interval': 0})
+        Task.objects.create(
+            crew=self.crew,
+            agent=self.crew.agents.get(),
+            name='Outline',
+            description='Outline',
+            expected_output='An outline'
+        )
+        batch = self.scheduler.submit(self.crew)
+        order = []
+
+        def attempt(task, execution=None):
+            order.append(task.crew_id)
+            if len(order) == 1:
+                self.scheduler.submit(self.other_crew, task=self.other_task)
+            self._complete(task)
+
+        def sleep(seconds):
+            self.scheduler.run_next()
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=attempt), \
+                mock.patch('time.sleep', side_effect=sleep):
+            self.scheduler.run_next()
+
+        self.assertEqual(order, [self.crew.pk, self.other_crew.pk, self.crew.pk])
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'completed')
+        self.assertTrue(batch.keep_completed)
+        self.assertEqual(len(batch.results['completed_tasks']), 2)
+        self.assertEqual(self.other_crew.executions.get().status, 'completed')
+
+    def test_preempted_run_stops_waiting(self):
+        self.scheduler.config.update({'max_concurrent': 1, 'poll_interval': 0, 'preempt_wait': 0})
+        Task.objects.create(
+            crew=self.crew,
+            agent=self.crew.agents.get(),
+            name='Outline',
+            description='Outline',
+            expected_output='An outline'
+        )
+        batch = self.scheduler.submit(self.crew)
+
+        def attempt(task, execution=None):
+            self.scheduler.submit(self.other_crew, task=self.other_task)
+            self._complete(task)
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=attempt):
+            self.scheduler.run_next()
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'queued')
+        self.assertTrue(batch.keep_completed)
+
+    def _flow(self):
+        flow = CrewInstance.objects.create(name='Flow', owner=self.user, is_flow=True)
+        self.crew.parent_crew = flow
+        self.crew.save()
+        Task.objects.create(
+            crew=self.crew,
+            agent=self.crew.agents.get(),
+            name='Outline',
+            description='Outline',
+            expected_output='An outline'
+        )
+        return flow
+
+    def test_flow_runs_sub_crews_in_its_slot(self):
+        flow = self._flow()
+        execution = self.scheduler.submit(flow)
+        running = []
+
+        def attempt(task, execution=None):
+            running.append(self.scheduler.running())
+            self._complete(task)
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=attempt):
+            self.scheduler.run_next()
+
+        self.assertEqual(running, [({self.user.pk: 1}, {'batch': 1})] * 2)
+        child = self.crew.executions.get()
+        self.assertEqual((child.parent, child.status), (execution, 'completed'))
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'completed')
+
+    def test_flow_yields_between_sub_crew_tasks(self):
+        self.scheduler.config.update({'max_concurrent': 1, 'poll_interval': 0, 'preempt_wait': 0})
+        flow = self._flow()
+        execution = self.scheduler.submit(flow)
+
+        def attempt(task, execution=None):
+            self.scheduler.submit(self.other_crew, task=self.other_task)
+            self._complete(task)
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=attempt):
+            self.scheduler.run_next()
+
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'queued')
+        self.assertEqual(self.crew.executions.get().status, 'stopped')
+        self.assertEqual(self.crew.tasks.filter(status='completed').count(), 1)
+
+
+class ExecutionViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.other
+        )
+        self.client.login(username='otheruser', password='testpass123')
+
+    def test_stop_is_limited_to_own_crews(self):
+        queued = Execution.objects.create(crew=self.crew, status='queued')
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('crew:crew_stop', args=[self.crew.pk]))
+        self.assertEqual(response.status_code, 404)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'queued')
+
+    @override_settings(CREW_SCHEDULER={'inline': True, 'max_concurrent_per_owner': 1, 'interactive_wait': 0})
+    def test_resume_goes_through_the_scheduler(self):
+        Execution.objects.create(crew=self.crew, status='running')
+        failed = Execution.objects.create(crew=self.crew, status='failed', ended_at=timezone.now())
+        with mock.patch.object(Execution, 'resume') as resume:
+            self.client.post(reverse('crew:execution_resume', args=[failed.pk]))
+        resume.assert_not_called()
+        resumed = Execution.objects.get(resumed_from=failed)
+        self.assertEqual(resumed.status, 'queued')
+        self.assertTrue(resumed.keep_completed)
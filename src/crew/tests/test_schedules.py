@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, SimpleTestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from crew.cron import CronExpression
+from crew.models import CrewInstance, CrewSchedule, Execution
+from crew.schedules import run_due_schedules, run_schedule
+
+User = get_user_model()
+
+
+class CronExpressionTest(SimpleTestCase):
+    def test_next_after(self):
+        start = datetime(2026, 10, 16, 3, 0)  # a Friday
+        self.assertEqual(CronExpression('30 2 * * mon-fri').next_after(start), datetime(2026, 10, 19, 2, 30))
+        self.assertEqual(CronExpression('*/15 * * * *').next_after(start), datetime(2026, 10, 16, 3, 15))
+        self.assertEqual(CronExpression('@monthly').next_after(start), datetime(2026, 11, 1, 0, 0))
+
+    def test_day_of_month_or_weekday(self):
+        # Either the 1st or a Sunday, as in cron.
+        cron = CronExpression('0 0 1 * sun')
+        self.assertEqual(cron.next_after(datetime(2026, 10, 16)), datetime(2026, 10, 18))
+
+    def test_keeps_timezone(self):
+        start = datetime(2026, 10, 16, 3, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(CronExpression('0 4 * * *').next_after(start).tzinfo, dt_timezone.utc)
+
+    def test_invalid_expressions(self):
+        for expression in ('* * *', '61 * * * *', 'a * * * *', '*/0 * * * *'):
+            with self.assertRaises(ValueError):
+                CronExpression(expression)
+        with self.assertRaises(ValueError):
+            CronExpression('0 0 31 2 *').next_after(datetime(2026, 1, 1))
+
+
+class CrewScheduleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Nightly Crew',
+            owner=self.user
+        )
+        self.schedule = CrewSchedule.objects.create(
+            crew=self.crew,
+            cron_expression='0 2 * * *',
+            jitter_seconds=600
+        )
+
+    def test_next_run_is_jittered_after_slot(self):
+        slot = CronExpression('0 2 * * *').next_after(timezone.localtime())
+        next_run_at = self.schedule.next_run_at
+        self.assertTrue(slot <= next_run_at <= slot + timedelta(seconds=600))
+        self.assertEqual(self.schedule.compute_next_run(), next_run_at)
+
+    def test_rejects_invalid_expression(self):
+        with self.assertRaises(ValidationError):
+            CrewSchedule.objects.create(crew=self.crew, cron_expression='0 25 * * *')
+
+    def test_due_schedule_queues_execution(self):
+        due_at = timezone.now() - timedelta(minutes=1)
+        CrewSchedule.objects.filter(pk=self.schedule.pk).update(next_run_at=due_at)
+        executions = run_due_schedules()
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(executions[0].status, 'queued')
+        self.assertEqual(executions[0].priority, 'batch')
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.last_execution, executions[0])
+        self.assertGreater(self.schedule.next_run_at, timezone.now())
+        self.assertEqual(run_due_schedules(), [])
+
+    def test_slot_is_claimed_once(self):
+        due_at = timezone.now() - timedelta(minutes=1)
+        CrewSchedule.objects.filter(pk=self.schedule.pk).update(next_run_at=due_at)
+        first = CrewSchedule.objects.get(pk=self.schedule.pk)
+        second = CrewSchedule.objects.get(pk=self.schedule.pk)
+        self.assertIsNotNone(run_schedule(first))
+        self.assertIsNone(run_schedule(second))
+        self.assertEqual(Execution.objects.count(), 1)
+
+    def test_skips_overlapping_run(self):
+        Execution.objects.create(crew=self.crew, status='running')
+        CrewSchedule.objects.filter(pk=self.schedule.pk).update(next_run_at=timezone.now())
+        self.assertEqual(run_due_schedules(), [])
+        self.schedule.refresh_from_db()
+        self.assertGreater(self.schedule.next_run_at, timezone.now())
+
+        CrewSchedule.objects.filter(pk=self.schedule.pk).update(next_run_at=timezone.now(), allow_overlap=True)
+        self.assertEqual(len(run_due_schedules()), 1)
@@ -0,0 +1,70 @@
+from django.test import TestCase, SimpleTestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from crew.models import CrewInstance, Agent, Task
+from crew.search import HIGHLIGHT_START, HIGHLIGHT_STOP, highlight, search_agents, search_tasks
+
+User = get_user_model()
+
+
+class HighlightTest(SimpleTestCase):
+    def test_escapes_text_and_marks_matches(self):
+        self.assertEqual(
+            highlight(f'<b>the {HIGHLIGHT_START}talk{HIGHLIGHT_STOP} track</b>'),
+            '&lt;b&gt;the <mark>talk</mark> track&lt;/b&gt;'
+        )
+        self.assertEqual(highlight(None), '')
+
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Test Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes',
+            backstory='A former radio host'
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script',
+            status='completed',
+            output_data={'result': 'Welcome to the quarterly talk track'}
+        )
+        Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline the episode',
+            expected_output='An outline'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_searches_outputs_and_backstories(self):
+        self.assertEqual(list(search_tasks(Task.objects.all(), 'talk track')), [self.task])
+        self.assertEqual(list(search_tasks(Task.objects.all(), 'EPISODE')), [Task.objects.get(name='Outline')])
+        self.assertEqual(list(search_agents(Agent.objects.all(), 'radio')), [self.agent])
+        self.assertEqual(search_tasks(Task.objects.all(), '  ').count(), 2)
+
+    def test_api_search(self):
+        response = self.client.get(reverse('api:task-list'), {'search': 'quarterly'})
+        self.assertEqual([task['id'] for task in response.data], [self.task.id])
+        response = self.client.get(reverse('api:agent-list'), {'search': 'radio host'})
+        self.assertEqual([agent['id'] for agent in response.data], [self.agent.id])
+
+    def test_task_list_search(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('crew:task_list'), {'search': 'quarterly'})
+        self.assertEqual(list(response.context['task_list']), [self.task])
@@ -0,0 +1,122 @@
+import contextvars
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from crew import streaming
+from crew.models import CrewInstance, Agent, Task, TaskOutputChunk
+from crew.streaming import OutputStream, read_output, stream_output
+
+User = get_user_model()
+
+
+class StreamingTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script'
+        )
+
+
+class OutputStreamTest(StreamingTestMixin, TestCase):
+    def test_buffers_until_flush_size(self):
+        stream = OutputStream(self.task, flush_interval=3600, flush_size=10)
+        stream.write('Hello ')
+        self.assertFalse(TaskOutputChunk.objects.exists())
+        stream.write('world, ')
+        stream.write('again')
+        stream.flush()
+        chunks = list(self.task.output_chunks.values_list('sequence', 'start', 'end', 'content'))
+        self.assertEqual(chunks, [(1, 0, 13, 'Hello world, '), (2, 13, 18, 'again')])
+
+    def test_flushes_after_interval(self):
+        stream = OutputStream(self.task, flush_interval=0, flush_size=1000)
+        stream.write('a')
+        stream.write('b')
+        self.assertEqual(self.task.output_chunks.count(), 2)
+
+    def test_read_from_offset(self):
+        stream = OutputStream(self.task, flush_interval=0)
+        for text in ('The ', 'quick ', 'brown ', 'fox'):
+            stream.write(text)
+        self.assertEqual(read_output(self.task)['content'], 'The quick brown fox')
+        page = read_output(self.task, offset=6, limit=7)
+        self.assertEqual(page, {'offset': 6, 'next_offset': 13, 'content': 'ick bro'})
+        self.assertEqual(read_output(self.task, offset=page['next_offset'])['content'], 'wn fox')
+        self.assertEqual(read_output(self.task, offset=19), {'offset': 19, 'next_offset': 19, 'content': ''})
+
+    def test_stream_output_replaces_previous_run_and_keeps_partial_output(self):
+        with stream_output(self.task) as stream:
+            stream.write('First run')
+        with self.assertRaises(RuntimeError):
+            with stream_output(self.task) as stream:
+                streaming._on_stream_chunk(None, SimpleNamespace(chunk='Partial '))
+                streaming._on_stream_chunk(None, SimpleNamespace(chunk='second run'))
+                raise RuntimeError('worker died')
+        self.assertEqual(read_output(self.task)['content'], 'Partial second run')
+        # Outside a stream, chunks go nowhere
+        streaming._on_stream_chunk(None, SimpleNamespace(chunk='lost'))
+        self.assertEqual(read_output(self.task)['content'], 'Partial second run')
+
+    @override_settings(CREW_STREAMING={'flush_interval': 0})
+    def test_writes_after_the_run_are_dropped(self):
+        with stream_output(self.task):
+            # Like a hedged request still running after the run moved on
+            abandoned = contextvars.copy_context()
+            streaming._on_stream_chunk(None, SimpleNamespace(chunk='Primary'))
+        with stream_output(self.task) as stream:
+            stream.write('Rerun')
+            abandoned.run(streaming._on_stream_chunk, None, SimpleNamespace(chunk=' late'))
+        abandoned.run(streaming._on_stream_chunk, None, SimpleNamespace(chunk=' later'))
+        self.assertEqual(list(self.task.output_chunks.values_list('sequence', 'content')), [(1, 'Rerun')])
+
+    @override_settings(CREW_STREAMING={'enabled': False})
+    def test_disabled(self):
+        with stream_output(self.task) as stream:
+            self.assertIsNone(stream)
+
+
+class TaskOutputAPITest(StreamingTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:task-output', args=[self.task.pk])
+
+    def test_tail_output(self):
+        self.task.status = 'in_progress'
+        self.task.save()
+        stream = OutputStream(self.task, flush_interval=0)
+        stream.write('Scene one. ')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['content'], 'Scene one. ')
+        self.assertFalse(response.data['complete'])
+
+        stream.write('Scene two.')
+        Task.objects.filter(pk=self.task.pk).update(status='completed')
+        response = self.client.get(self.url, {'offset': response.data['next_offset']})
+        self.assertEqual(response.data['content'], 'Scene two.')
+        response = self.client.get(self.url, {'offset': response.data['next_offset']})
+        self.assertEqual(response.data['content'], '')
+        self.assertTrue(response.data['complete'])
+
+    def test_invalid_offset(self):
+        self.assertEqual(self.client.get(self.url, {'offset': 'end'}).status_code, 400)
@@ -0,0 +1,145 @@
+import gzip
+import io
+import json
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from crew.cloning import instantiate_template
+from crew.models import CrewInstance, Agent, Task
+from crew.transfer import CrewImportError, export_crew, import_crew, iter_export, iter_gzip
+
+User = get_user_model()
+
+
+class CrewTransferTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.flow = CrewInstance.objects.create(
+            name='Training Flow',
+            owner=self.user,
+            is_flow=True,
+            config={'execution_order': []}
+        )
+        self.subcrew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user,
+            parent_crew=self.flow
+        )
+        self.agent = Agent.objects.create(
+            crew=self.subcrew,
+            name='Writer',
+            role='writer',
+            description='Writes scripts',
+            goals=['Write'],
+            llm_config={'model': 'gpt-4'}
+        )
+        self.outline = Task.objects.create(
+            crew=self.subcrew,
+            agent=self.agent,
+            name='Outline',
+            description='Outline the module',
+            expected_output='An outline',
+            status='completed',
+            output_data={'result': 'outline'}
+        )
+        self.script = Task.objects.create(
+            crew=self.subcrew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script'
+        )
+        self.script.depends_on.add(self.outline)
+
+    def _export(self, **kwargs):
+        buffer = io.BytesIO()
+        export_crew(self.flow, buffer, **kwargs)
+        buffer.seek(0)
+        return buffer
+
+    def test_export_is_json_lines(self):
+        records = [json.loads(line) for line in iter_export(self.flow)]
+        self.assertEqual(records[0]['type'], 'header')
+        self.assertEqual(
+            [r['type'] for r in records[1:]],
+            ['crew', 'crew', 'agent', 'task', 'task', 'depends_on']
+        )
+        self.assertIsNone(records[1]['parent'])
+        self.assertNotIn('output_data', records[4]['fields'])
+
+    def test_round_trip_remaps_ids(self):
+        root, counts = import_crew(self._export(), self.other, name='Copy')
+        self.assertEqual(counts, {'crews': 2, 'agents': 1, 'tasks': 2, 'dependencies': 1})
+        self.assertEqual(root.name, 'Copy')
+        self.assertEqual(root.owner, self.other)
+        self.assertIsNone(root.parent_crew)
+
+        subcrew = root.sub_crews.get()
+        self.assertNotEqual(subcrew.pk, self.subcrew.pk)
+        script = subcrew.tasks.get(name='Script')
+        outline = subcrew.tasks.get(name='Outline')
+        self.assertEqual(list(script.depends_on.all()), [outline])
+        self.assertEqual(script.agent.crew, subcrew)
+        self.assertEqual(outline.status, 'pending')
+
+    def test_template_backed_crew_is_exported_with_its_rows(self):
+        self.subcrew.is_template = True
+        self.subcrew.save()
+        instance = instantiate_template(self.subcrew, self.user, name='Project A')
+        records = [json.loads(line) for line in iter_export(instance)]
+        self.assertEqual([r['type'] for r in records[1:]], ['crew', 'agent', 'task', 'task', 'depends_on'])
+        self.assertEqual({r['crew'] for r in records[2:5]}, {instance.pk})
+
+    def test_round_trip_with_outputs_and_gzip(self):
+        buffer = self._export(include_outputs=True, compress=True)
+        root, _ = import_crew(buffer, self.other, batch_size=1)
+        outline = Task.objects.get(crew__parent_crew=root, name='Outline')
+        self.assertEqual(outline.status, 'completed')
+        self.assertEqual(outline.output_data, {'result': 'outline'})
+
+    def test_iter_gzip_matches_export(self):
+        compressed = b''.join(iter_gzip(iter_export(self.flow), chunk_size=16))
+        lines = gzip.decompress(compressed).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 7)
+
+    def test_rejects_foreign_stream(self):
+        with self.assertRaises(CrewImportError):
+            import_crew(io.BytesIO(b'{"type": "crew"}\n'), self.other)
+        self.assertFalse(CrewInstance.objects.filter(owner=self.other).exists())
+
+    def test_rejects_unknown_references(self):
+        stream = io.BytesIO(
+            b'{"type": "header", "format": "scriptcrew.crew", "version": 1}\n'
+            b'{"type": "crew", "id": 1, "parent": null, "fields": {"name": "X"}}\n'
+            b'{"type": "agent", "id": 2, "crew": 99, "fields": {"name": "A"}}\n'
+        )
+        with self.assertRaises(CrewImportError):
+            import_crew(stream, self.other)
+        self.assertFalse(CrewInstance.objects.filter(owner=self.other).exists())
+
+    def test_rejects_fields_outside_the_format(self):
+        for fields in ('{"name": "X", "owner_id": %d}' % self.user.pk, '{"name": "X", "template_id": 1}'):
+            stream = io.BytesIO(
+                b'{"type": "header", "format": "scriptcrew.crew", "version": 1}\n'
+                b'{"type": "crew", "id": 1, "parent": null, "fields": ' + fields.encode() + b'}\n'
+            )
+            with self.assertRaisesMessage(CrewImportError, 'Unknown crew field'):
+                import_crew(stream, self.other)
+        self.assertFalse(CrewInstance.objects.filter(name='X').exists())
+
+    def test_invalid_values_are_import_errors(self):
+        stream = io.BytesIO(
+            b'{"type": "header", "format": "scriptcrew.crew", "version": 1}\n'
+            b'{"type": "crew", "id": 1, "parent": null, "fields": {"name": "X"}}\n'
+            b'{"type": "agent", "id": 2, "crew": 1, "fields": {"name": "A", "allow_delegation": "often"}}\n'
+        )
+        with self.assertRaises(CrewImportError):
+            import_crew(stream, self.other)
+        self.assertFalse(CrewInstance.objects.filter(owner=self.other).exists())
@@ -0,0 +1,121 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from crew.models import CrewInstance, Agent, Task, TaskUsage, DailyUsage
+from crew.usage import (
+    BudgetExceeded, calculate_cost, check_budget, extract_usage, record_abandoned_usage, record_usage
+)
+
+User = get_user_model()
+
+PRICING = {'gpt-4o': {'prompt': 2.5, 'completion': 10}}
+
+
+@override_settings(CREW_MODEL_PRICING=PRICING)
+class UsageAccountingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(name='Test Crew', owner=self.user)
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes',
+            llm_config={'model': 'openai/gpt-4o'}
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write a script',
+            expected_output='A script'
+        )
+
+    def test_extract_usage_from_crew_output(self):
+        result = SimpleNamespace(token_usage=SimpleNamespace(
+            prompt_tokens=100, completion_tokens=50, total_tokens=150, successful_requests=2
+        ))
+        self.assertEqual(extract_usage(result), {
+            'prompt_tokens': 100, 'completion_tokens': 50, 'total_tokens': 150, 'requests': 2
+        })
+        self.assertIsNone(extract_usage(['plain result']))
+
+    def test_calculate_cost(self):
+        self.assertEqual(calculate_cost('openai/gpt-4o', 1_000_000, 100_000), Decimal('3.500000'))
+        self.assertEqual(calculate_cost('unknown', 1000, 1000), Decimal('0'))
+
+    def test_record_usage_updates_rollup(self):
+        usage = {'prompt_tokens': 1000, 'completion_tokens': 500, 'total_tokens': 1500, 'requests': 1}
+        record_usage(self.task, usage)
+        record_usage(self.task, usage)
+
+        self.assertEqual(TaskUsage.objects.count(), 2)
+        row = TaskUsage.objects.first()
+        self.assertEqual(row.model, 'openai/gpt-4o')
+        self.assertEqual(row.owner, self.user)
+
+        daily = DailyUsage.objects.get()
+        self.assertEqual(daily.runs, 2)
+        self.assertEqual(daily.total_tokens, 3000)
+        self.assertEqual(daily.cost, Decimal('0.015000'))
+
+    def test_abandoned_requests_are_recorded(self):
+        result = SimpleNamespace(token_usage={'prompt_tokens': 1000, 'completion_tokens': 500})
+        self.assertEqual(record_abandoned_usage(self.task, result, None, {'model': 'openai/gpt-4o-mini'}), 1500)
+        # A failed request reports nothing, so its prompt is estimated
+        self.assertEqual(record_abandoned_usage(self.task, None, None, self.agent.llm_config, prompt='x' * 400), 100)
+        self.assertEqual(
+            list(TaskUsage.objects.order_by('pk').values_list('model', 'prompt_tokens', 'completion_tokens')),
+            [('openai/gpt-4o-mini', 1000, 500), ('openai/gpt-4o', 100, 0)],
+        )
+
+    def test_budget_blocks_runs(self):
+        check_budget(self.crew)
+        self.crew.config = {'budget': {'daily_tokens': 1000}}
+        self.crew.save()
+        record_usage(self.task, {'prompt_tokens': 900, 'completion_tokens': 200, 'total_tokens': 1100, 'requests': 1})
+        with self.assertRaises(BudgetExceeded):
+            check_budget(self.crew)
+        with self.assertRaises(BudgetExceeded):
+            self.crew.execute()
+
+
+class UsageAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.crew = CrewInstance.objects.create(name='Test Crew', owner=self.user)
+        other_crew = CrewInstance.objects.create(name='Other Crew', owner=self.other)
+        for owner, crew in ((self.user, self.crew), (self.other, other_crew)):
+            DailyUsage.objects.create(
+                date='2026-01-01', owner=owner, crew=crew, model='gpt-4o',
+                total_tokens=100, runs=1, cost=Decimal('0.5')
+            )
+
+    def test_daily_usage_is_scoped_to_owner(self):
+        response = self.client.get(reverse('api:dailyusage-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(reverse('api:dailyusage-totals'))
+        self.assertEqual(response.data['total_tokens'], 100)
+
+    def test_crew_usage(self):
+        response = self.client.get(reverse('api:crewinstance-usage', args=[self.crew.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['total_tokens'], 100)
+        self.assertEqual(response.data['by_model'][0]['model'], 'gpt-4o')
@@ -0,0 +1,165 @@
+import hashlib
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from crew import versions
+from crew.models import CrewInstance, Agent, Task, TaskOutputVersion
+from crew.versions import apply_delta, diff_versions, get_version, make_delta, record_version, rollback, serialize
+
+User = get_user_model()
+
+
+def _script(revision, paragraphs=200):
+    lines = [f"Step {index}: {hashlib.sha1(str(index).encode()).hexdigest()}" for index in range(paragraphs)]
+    lines[revision] = f"Paragraph {revision}: rewritten in revision {revision}."
+    return {'result': '\n'.join(lines)}
+
+
+class DeltaTest(SimpleTestCase):
+    def test_delta_rebuilds_target(self):
+        base = serialize({'result': 'one\ntwo\nthree', 'meta': {'model': 'gpt-4o'}})
+        target = serialize({'result': 'one\n2\nthree\nfour', 'meta': {'model': 'gpt-4o-mini'}})
+        self.assertEqual(apply_delta(base, make_delta(base, target)), target)
+        self.assertEqual(apply_delta(target, make_delta(target, base)), base)
+
+    def test_escaped_newlines_end_lines(self):
+        text = serialize({'result': 'one\ntwo'})
+        self.assertIn(' "result": "one\\n', versions.split_lines(text))
+
+
+class TaskOutputVersionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script'
+        )
+
+    def test_older_versions_are_stored_as_deltas(self):
+        outputs = [_script(revision) for revision in range(5)]
+        for output in outputs:
+            record_version(self.task, output)
+
+        stored = list(self.task.output_versions.order_by('number'))
+        self.assertEqual([version.number for version in stored], [1, 2, 3, 4, 5])
+        self.assertEqual([version.is_delta for version in stored], [True, True, True, True, False])
+        self.assertLess(max(len(version.data) for version in stored[:-1]) * 10, len(stored[-1].data))
+
+        self.assertEqual(get_version(self.task), outputs[-1])
+        for number, output in enumerate(outputs, 1):
+            self.assertEqual(get_version(self.task, number), output)
+
+    def test_snapshots_bound_reconstruction(self):
+        with mock.patch.object(versions, 'SNAPSHOT_INTERVAL', 2):
+            for revision in range(5):
+                record_version(self.task, _script(revision))
+        full = self.task.output_versions.filter(is_delta=False).values_list('number', flat=True)
+        self.assertEqual(sorted(full), [2, 4, 5])
+        self.assertEqual(get_version(self.task, 1), _script(0))
+
+    def test_unchanged_output_is_not_recorded(self):
+        first = record_version(self.task, {'result': 'Same'})
+        self.assertEqual(record_version(self.task, {'result': 'Same'}).pk, first.pk)
+        self.assertEqual(self.task.output_versions.count(), 1)
+
+    def test_missing_version(self):
+        record_version(self.task, {'result': 'Only'})
+        with self.assertRaises(TaskOutputVersion.DoesNotExist):
+            get_version(self.task, 2)
+
+    def test_diff_and_rollback(self):
+        record_version(self.task, {'result': 'Intro\nBody\nOutro'})
+        record_version(self.task, {'result': 'Intro\nNew body\nOutro'})
+        diff = diff_versions(self.task, 1, 2)
+        self.assertIn('-Body\n', diff)
+        self.assertIn('+New body\n', diff)
+
+        version = rollback(self.task, 1)
+        self.assertEqual(version.number, 3)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.output_data, {'result': 'Intro\nBody\nOutro'})
+
+    def test_execution_records_a_version(self):
+        runs = []
+
+        def complete(task, execution=None):
+            runs.append(task.attempts)
+            task.status = 'completed'
+            task.output_data = {'result': f'Run {len(runs)}'}
+            task.completed_at = timezone.now()
+            task.save()
+
+        with mock.patch.object(Task, '_execute_attempt', autospec=True, side_effect=complete):
+            self.task.execute()
+            self.task.execute()
+        self.assertEqual(runs, [1, 1])
+        self.assertEqual(get_version(self.task, 1), {'result': 'Run 1'})
+        self.assertEqual(get_version(self.task), {'result': 'Run 2'})
+
+
+class TaskOutputVersionAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.crew = CrewInstance.objects.create(
+            name='Script Crew',
+            owner=self.user
+        )
+        self.agent = Agent.objects.create(
+            crew=self.crew,
+            name='Writer',
+            role='writer',
+            description='Writes'
+        )
+        self.task = Task.objects.create(
+            crew=self.crew,
+            agent=self.agent,
+            name='Script',
+            description='Write the script',
+            expected_output='A script'
+        )
+        record_version(self.task, {'result': 'Draft'})
+        record_version(self.task, {'result': 'Final'})
+
+    def test_list_and_retrieve_versions(self):
+        response = self.client.get(reverse('api:task-versions', args=[self.task.pk]))
+        self.assertEqual([version['number'] for version in response.data], [2, 1])
+        response = self.client.get(reverse('api:task-version', args=[self.task.pk, 1]))
+        self.assertEqual(response.data['output_data'], {'result': 'Draft'})
+        response = self.client.get(reverse('api:task-version', args=[self.task.pk, 9]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_diff(self):
+        response = self.client.get(reverse('api:task-diff', args=[self.task.pk]), {'from': 1})
+        self.assertEqual(response.data['to'], 2)
+        self.assertIn('+Final', response.data['diff'])
+        self.assertEqual(self.client.get(reverse('api:task-diff', args=[self.task.pk])).status_code, 400)
+
+    def test_rollback(self):
+        response = self.client.post(reverse('api:task-rollback', args=[self.task.pk]), {'version': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version']['number'], 3)
+        self.assertEqual(response.data['task']['output_data'], {'result': 'Draft'})
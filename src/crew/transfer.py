@@ -0,0 +1,361 @@
+"""
+Streaming export/import of crew trees.
+
+A crew tree (a CrewInstance, its sub-crews, their agents, tasks and the
+``depends_on`` graph) is written as JSON Lines, one record per object, in
+an order that lets the importer insert every row in a single pass:
+
+    {"type": "header", "format": "scriptcrew.crew", "version": 1, "root": 12}
+    {"type": "crew", "id": 12, "parent": null, "fields": {...}}
+    {"type": "agent", "id": 40, "crew": 12, "fields": {...}}
+    {"type": "task", "id": 91, "crew": 12, "agent": 40, "fields": {...}}
+    {"type": "depends_on", "task": 92, "on": 91}
+
+Crews instantiated from a template that were not copied yet are
+materialized (see :func:`crew.cloning.materialize`) before they are
+exported, so the export holds their agents and tasks rather than none.
+
+Ids in the stream are the ids of the source database; the importer remaps
+them and inserts rows with ``bulk_create`` in fixed-size batches, so memory
+use does not grow with the size of the payload (only the id map does).
+"""
+import gzip
+import io
+import json
+import zlib
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .cloning import materialize
+from .models import CrewInstance, Agent, Task
+
+FORMAT_NAME = 'scriptcrew.crew'
+FORMAT_VERSION = 1
+BATCH_SIZE = 500
+GZIP_MAGIC = b'\x1f\x8b'
+
+CREW_FIELDS = ['name', 'description', 'is_flow', 'config']
+AGENT_FIELDS = [
+    'name', 'role', 'custom_role', 'description', 'goals', 'backstory',
+    'tools', 'allow_delegation', 'verbose', 'llm_config',
+]
+TASK_FIELDS = ['name', 'description', 'expected_output', 'context', 'input_data', 'output_file']
+TASK_OUTPUT_FIELDS = ['status', 'output_data', 'error_message', 'started_at', 'completed_at']
+
+
+class CrewImportError(ValueError):
+    """Raised when an import stream is malformed or references unknown ids."""
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _line(record):
+    return json.dumps(record, default=_json_default, separators=(',', ':')) + '\n'
+
+
+def _crew_tree_levels(root):
+    """Yield the ids of a crew tree level by level, parents before children."""
+    level = [root.pk]
+    while level:
+        yield level
+        level = list(
+            CrewInstance.objects.filter(parent_crew_id__in=level).values_list('pk', flat=True)
+        )
+
+
+def iter_export(root, include_outputs=False):
+    """
+    Yield the JSON Lines of an export of ``root`` and everything below it.
+
+    Args:
+        root: The CrewInstance at the top of the exported tree.
+        include_outputs: Also export task status, outputs and timestamps.
+            By default tasks are exported as fresh, pending tasks.
+
+    Yields:
+        str: One newline-terminated JSON record at a time.
+    """
+    levels = list(_crew_tree_levels(root))
+    crew_ids = [pk for level in levels for pk in level]
+    for crew in CrewInstance.objects.filter(pk__in=crew_ids, template__isnull=False, materialized=False):
+        materialize(crew)
+
+    yield _line({
+        'type': 'header',
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'root': root.pk,
+        'exported_at': timezone.now(),
+        'include_outputs': include_outputs,
+    })
+
+    for level in levels:
+        crews = CrewInstance.objects.filter(pk__in=level).order_by('pk')
+        for row in crews.values('pk', 'parent_crew_id', *CREW_FIELDS).iterator(chunk_size=BATCH_SIZE):
+            pk = row.pop('pk')
+            parent = row.pop('parent_crew_id')
+            if pk == root.pk:
+                parent = None
+            yield _line({'type': 'crew', 'id': pk, 'parent': parent, 'fields': row})
+
+    agents = Agent.objects.filter(crew_id__in=crew_ids).order_by('pk')
+    for row in agents.values('pk', 'crew_id', *AGENT_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        yield _line({'type': 'agent', 'id': row.pop('pk'), 'crew': row.pop('crew_id'), 'fields': row})
+
+    task_fields = TASK_FIELDS + (TASK_OUTPUT_FIELDS if include_outputs else [])
+    tasks = Task.objects.filter(crew_id__in=crew_ids).order_by('pk')
+    for row in tasks.values('pk', 'crew_id', 'agent_id', *task_fields).iterator(chunk_size=BATCH_SIZE):
+        yield _line({
+            'type': 'task',
+            'id': row.pop('pk'),
+            'crew': row.pop('crew_id'),
+            'agent': row.pop('agent_id'),
+            'fields': row,
+        })
+
+    through = Task.depends_on.through
+    edges = through.objects.filter(from_task__crew_id__in=crew_ids).order_by('pk')
+    for from_id, to_id in edges.values_list('from_task_id', 'to_task_id').iterator(chunk_size=BATCH_SIZE):
+        yield _line({'type': 'depends_on', 'task': from_id, 'on': to_id})
+
+
+def iter_gzip(lines, chunk_size=64 * 1024):
+    """
+    Gzip an iterable of text lines on the fly.
+
+    Yields compressed chunks of roughly ``chunk_size`` bytes, so exports can
+    be streamed compressed without buffering the whole document.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    pending = []
+    size = 0
+    for line in lines:
+        chunk = compressor.compress(line.encode('utf-8'))
+        if chunk:
+            pending.append(chunk)
+            size += len(chunk)
+        if size >= chunk_size:
+            yield b''.join(pending)
+            pending, size = [], 0
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+
+def export_crew(root, stream, include_outputs=False, compress=False):
+    """
+    Write an export of ``root`` to a binary ``stream``.
+
+    Args:
+        root: The CrewInstance at the top of the exported tree.
+        stream: A writable binary file object.
+        include_outputs: Also export task status, outputs and timestamps.
+        compress: Gzip the output.
+    """
+    target = gzip.GzipFile(fileobj=stream, mode='wb') if compress else stream
+    try:
+        for line in iter_export(root, include_outputs=include_outputs):
+            target.write(line.encode('utf-8'))
+    finally:
+        if compress:
+            target.close()
+
+
+class _RawReader(io.RawIOBase):
+    """Adapt any object with a ``read`` method to ``io.RawIOBase``."""
+
+    def __init__(self, source):
+        self._source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._source.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def _open_lines(stream):
+    """Return a text iterator over ``stream``, transparently un-gzipping it."""
+    buffered = io.BufferedReader(_RawReader(stream))
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        buffered = gzip.GzipFile(fileobj=buffered, mode='rb')
+    return io.TextIOWrapper(buffered, encoding='utf-8')
+
+
+class _Importer:
+    """Holds the id map and pending batches of a single import."""
+
+    def __init__(self, owner, batch_size):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.crew_ids = {}
+        self.agent_ids = {}
+        self.task_ids = {}
+        self.pending = []
+        self.pending_model = None
+        self.pending_edges = []
+        self.root = None
+        self.counts = {'crews': 0, 'agents': 0, 'tasks': 0, 'dependencies': 0}
+
+    def _lookup(self, mapping, old_id, kind):
+        try:
+            return mapping[old_id]
+        except KeyError:
+            raise CrewImportError(f"Record references unknown {kind} id {old_id}")
+
+    def _switch(self, model):
+        # Rows of the previous model must be inserted before their ids are looked up.
+        if self.pending_model is not model:
+            self.flush()
+            self.pending_model = model
+
+    def _queue(self, model, old_id, obj):
+        self._switch(model)
+        self.pending.append((old_id, obj))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            model = self.pending_model
+            mapping = {CrewInstance: self.crew_ids, Agent: self.agent_ids, Task: self.task_ids}[model]
+            created = model.objects.bulk_create([obj for _, obj in self.pending])
+            for (old_id, _), obj in zip(self.pending, created):
+                mapping[old_id] = obj.pk
+            self.pending = []
+        if self.pending_edges:
+            Task.depends_on.through.objects.bulk_create(self.pending_edges)
+            self.pending_edges = []
+
+    def _fields(self, record, allowed):
+        """Return the record's fields, refusing any that are not part of the export format."""
+        fields = record['fields']
+        if not isinstance(fields, dict):
+            raise CrewImportError(f"{record['type']} record fields must be an object")
+        unknown = sorted(set(fields) - set(allowed))
+        if unknown:
+            raise CrewImportError(f"Unknown {record['type']} field(s): {', '.join(unknown)}")
+        return dict(fields)
+
+    def add_crew(self, record, name=None):
+        parent = record.get('parent')
+        if parent is not None and parent not in self.crew_ids:
+            # The parent may still be sitting in the current batch.
+            self.flush()
+        fields = self._fields(record, CREW_FIELDS)
+        if self.root is None and name:
+            fields['name'] = name
+        obj = CrewInstance(
+            owner=self.owner,
+            parent_crew_id=self._lookup(self.crew_ids, parent, 'crew') if parent is not None else None,
+            **fields
+        )
+        self._queue(CrewInstance, record['id'], obj)
+        if self.root is None:
+            self.flush()
+            self.root = CrewInstance.objects.get(pk=self.crew_ids[record['id']])
+        self.counts['crews'] += 1
+
+    def add_agent(self, record):
+        self._switch(Agent)
+        obj = Agent(
+            crew_id=self._lookup(self.crew_ids, record['crew'], 'crew'),
+            **self._fields(record, AGENT_FIELDS)
+        )
+        self._queue(Agent, record['id'], obj)
+        self.counts['agents'] += 1
+
+    def add_task(self, record):
+        self._switch(Task)
+        obj = Task(
+            crew_id=self._lookup(self.crew_ids, record['crew'], 'crew'),
+            agent_id=self._lookup(self.agent_ids, record['agent'], 'agent'),
+            **self._fields(record, TASK_FIELDS + TASK_OUTPUT_FIELDS)
+        )
+        self._queue(Task, record['id'], obj)
+        self.counts['tasks'] += 1
+
+    def add_dependency(self, record):
+        if self.pending:
+            # Both ends of the edge must have been inserted first.
+            self.flush()
+        through = Task.depends_on.through
+        self.pending_edges.append(through(
+            from_task_id=self._lookup(self.task_ids, record['task'], 'task'),
+            to_task_id=self._lookup(self.task_ids, record['on'], 'task'),
+        ))
+        if len(self.pending_edges) >= self.batch_size:
+            self.flush()
+        self.counts['dependencies'] += 1
+
+
+def import_crew(stream, owner, name=None, batch_size=BATCH_SIZE):
+    """
+    Import a crew tree written by :func:`export_crew`.
+
+    The whole import runs in one transaction; rows are inserted with
+    ``bulk_create`` in batches of ``batch_size`` and never held in memory
+    beyond the current batch.
+
+    Args:
+        stream: A readable binary file object, plain or gzipped JSON Lines.
+        owner: The user who will own every imported crew.
+        name: Optional new name for the root crew.
+        batch_size: Number of rows per bulk insert.
+
+    Returns:
+        tuple: The new root CrewInstance and a dict of imported object counts.
+
+    Raises:
+        CrewImportError: If the stream is not a valid crew export.
+    """
+    importer = _Importer(owner, batch_size)
+    handlers = {
+        'crew': lambda record: importer.add_crew(record, name=name),
+        'agent': importer.add_agent,
+        'task': importer.add_task,
+        'depends_on': importer.add_dependency,
+    }
+
+    with transaction.atomic():
+        lines = _open_lines(stream)
+        header = None
+        for lineno, raw in enumerate(lines, start=1):
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError as e:
+                raise CrewImportError(f"Line {lineno}: invalid JSON ({e})")
+            kind = record.get('type')
+            if header is None:
+                if kind != 'header' or record.get('format') != FORMAT_NAME:
+                    raise CrewImportError("Stream is not a ScriptCrew crew export")
+                if record.get('version', 0) > FORMAT_VERSION:
+                    raise CrewImportError(f"Unsupported export version {record['version']}")
+                header = record
+                continue
+            handler = handlers.get(kind)
+            if handler is None:
+                raise CrewImportError(f"Line {lineno}: unknown record type {kind!r}")
+            try:
+                handler(record)
+            except CrewImportError as e:
+                raise CrewImportError(f"Line {lineno}: {e}")
+            except (KeyError, TypeError, ValueError, ValidationError) as e:
+                raise CrewImportError(f"Line {lineno}: malformed {kind} record ({e})")
+        try:
+            importer.flush()
+        except (TypeError, ValueError, ValidationError) as e:
+            raise CrewImportError(f"Malformed record ({e})")
+
+    if importer.root is None:
+        raise CrewImportError("Export contains no crews")
+    return importer.root, importer.counts
@@ -4,7 +4,8 @@ from .views import (
     CrewListView, CrewCreateView, CrewDetailView, CrewUpdateView, CrewDeleteView,
     AgentListView, AgentCreateView, AgentDetailView, AgentUpdateView, AgentDeleteView,
     TaskListView, TaskCreateView, TaskDetailView, TaskUpdateView, TaskDeleteView,
-    PipelineView, ExecuteCrewView, StopCrewExecutionView, ExecutionHistoryView
+    PipelineView, ExecuteCrewView, StopCrewExecutionView, ExecutionHistoryView,
+    ResumeExecutionView, ExecuteTaskView
     # Include other views here
 )
 
@@ -34,12 +35,14 @@ urlpatterns = [
     path('tasks/<int:pk>/', TaskDetailView.as_view(), name='task_detail'),
     path('tasks/<int:pk>/update/', TaskUpdateView.as_view(), name='task_update'),
     path('tasks/<int:pk>/delete/', TaskDeleteView.as_view(), name='task_delete'),
+    path('tasks/<int:pk>/execute/', ExecuteTaskView.as_view(), name='execute_task'),
     
     # Pipeline URLs
     path('pipeline/', PipelineView.as_view(), name='pipeline_view'),
     path('crews/<int:pk>/execute/', ExecuteCrewView.as_view(), name='crew_execute'),
     path('crews/<int:pk>/stop/', StopCrewExecutionView.as_view(), name='crew_stop'),
     path('crews/<int:pk>/history/', ExecutionHistoryView.as_view(), name='execution_history'),
+    path('executions/<int:pk>/resume/', ResumeExecutionView.as_view(), name='execution_resume'),
     
     # Include your other URL patterns here
 ] 
\ No newline at end of file
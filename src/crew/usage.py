@@ -0,0 +1,184 @@
+"""
+Token and cost accounting for LLM calls.
+
+Every successful task run records a :class:`~crew.models.TaskUsage` row with
+the token counts CrewAI reports, priced with ``settings.CREW_MODEL_PRICING``
+(USD per million tokens)::
+
+    CREW_MODEL_PRICING = {
+        'gpt-4o': {'prompt': 2.50, 'completion': 10.00},
+    }
+
+and adds the same numbers to the :class:`~crew.models.DailyUsage` rollup,
+which is what reports and budget checks read. Crews can set a daily budget
+in ``config['budget']``, e.g. ``{"daily_cost": 5, "daily_tokens": 2000000}``.
+
+A request that lost a hedge (see :mod:`crew.hedging`) is paid for as well;
+:func:`record_abandoned_usage` records it once it finishes, estimating its
+tokens from the prompt when it reports none.
+"""
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .llm import estimate_tokens
+from .models import DailyUsage, TaskUsage
+from .ratelimit import limit_key
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ('prompt_tokens', 'completion_tokens', 'total_tokens', 'requests')
+
+
+class BudgetExceeded(Exception):
+    """Raised when a run would start although its budget is used up."""
+
+
+def extract_usage(result, crew=None):
+    """
+    Return the token usage of a ``Crew.kickoff()`` as a dict.
+
+    Reads ``result.token_usage`` (CrewOutput) or, failing that,
+    ``crew.usage_metrics``; either may be a pydantic model or a dict.
+    """
+    usage = getattr(result, 'token_usage', None) or getattr(crew, 'usage_metrics', None)
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, 'model_dump') else vars(usage)
+    prompt = int(usage.get('prompt_tokens') or 0)
+    completion = int(usage.get('completion_tokens') or 0)
+    return {
+        'prompt_tokens': prompt,
+        'completion_tokens': completion,
+        'total_tokens': int(usage.get('total_tokens') or prompt + completion),
+        'requests': int(usage.get('successful_requests') or usage.get('requests') or 1),
+    }
+
+
+def model_name(llm_config):
+    provider, model = limit_key(llm_config)
+    return f'{provider}/{model}' if provider else model
+
+
+def calculate_cost(model, prompt_tokens, completion_tokens):
+    """Price a call in USD using ``CREW_MODEL_PRICING``; unknown models cost 0."""
+    pricing = getattr(settings, 'CREW_MODEL_PRICING', {})
+    prices = pricing.get(model) or pricing.get(model.split('/', 1)[-1])
+    if not prices:
+        return Decimal('0')
+    cost = (
+        Decimal(str(prices.get('prompt', 0))) * prompt_tokens
+        + Decimal(str(prices.get('completion', 0))) * completion_tokens
+    ) / Decimal(1_000_000)
+    return cost.quantize(Decimal('0.000001'))
+
+
+def _add_to_rollup(usage):
+    key = {
+        'date': timezone.localdate(usage.created_at),
+        'owner_id': usage.owner_id,
+        'crew_id': usage.crew_id,
+        'model': usage.model,
+    }
+    increments = {name: F(name) + getattr(usage, name) for name in USAGE_FIELDS}
+    increments.update(cost=F('cost') + usage.cost, runs=F('runs') + 1)
+    if DailyUsage.objects.filter(**key).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailyUsage.objects.create(
+                **key, runs=1, cost=usage.cost, **{name: getattr(usage, name) for name in USAGE_FIELDS}
+            )
+    except IntegrityError:
+        # Another worker created today's row first.
+        DailyUsage.objects.filter(**key).update(**increments)
+
+
+def record_usage(task, usage, execution=None, model=None):
+    """
+    Store the usage of one run of ``task`` and add it to the daily rollup.
+
+    Args:
+        task: The Task that ran.
+        usage: A dict as returned by :func:`extract_usage`.
+        execution: The Execution the run was part of, if any.
+        model: The model that answered, if not the agent's own.
+
+    Returns:
+        TaskUsage: The stored row, or None if there was nothing to record.
+    """
+    if not usage:
+        return None
+    model = model or model_name(task.agent.llm_config)
+    with transaction.atomic():
+        row = TaskUsage.objects.create(
+            task=task,
+            execution=execution,
+            crew_id=task.crew_id,
+            agent_id=task.agent_id,
+            owner_id=task.crew.owner_id,
+            model=model,
+            cost=calculate_cost(model, usage['prompt_tokens'], usage['completion_tokens']),
+            **{name: usage[name] for name in USAGE_FIELDS}
+        )
+        _add_to_rollup(row)
+    return row
+
+
+def record_abandoned_usage(task, result, crew, llm_config, prompt='', execution=None):
+    """
+    Store the usage of a request of ``task`` that lost a hedge.
+
+    Args:
+        task: The Task the request was made for.
+        result: What the request returned, or None if it failed.
+        crew: The ``crewai.Crew`` that made the request, if known.
+        llm_config: The ``llm_config`` the request went to.
+        prompt: The request's prompt, to estimate its tokens from.
+        execution: The Execution the run was part of, if any.
+
+    Returns:
+        int: The tokens recorded.
+    """
+    usage = extract_usage(result, crew)
+    if not usage:
+        tokens = estimate_tokens(prompt)
+        usage = {'prompt_tokens': tokens, 'completion_tokens': 0, 'total_tokens': tokens, 'requests': 1}
+    record_usage(task, usage, execution=execution, model=model_name(llm_config))
+    return usage['total_tokens']
+
+
+def usage_totals(queryset):
+    """Sum tokens, requests and cost over a DailyUsage or TaskUsage queryset."""
+    totals = queryset.aggregate(
+        **{name: Sum(name) for name in USAGE_FIELDS}, cost=Sum('cost')
+    )
+    return {name: value or 0 for name, value in totals.items()}
+
+
+def check_budget(crew):
+    """
+    Refuse to start a run when the crew has used up today's budget.
+
+    Raises:
+        BudgetExceeded: If ``config['budget']`` limits are already reached.
+    """
+    budget = crew.config.get('budget') if isinstance(crew.config, dict) else None
+    if not budget:
+        return
+    today = usage_totals(DailyUsage.objects.filter(crew=crew, date=timezone.localdate()))
+    daily_cost = budget.get('daily_cost')
+    if daily_cost is not None and today['cost'] >= Decimal(str(daily_cost)):
+        raise BudgetExceeded(
+            f"Crew '{crew.name}' has spent ${today['cost']:.2f} today (budget ${daily_cost})"
+        )
+    daily_tokens = budget.get('daily_tokens')
+    if daily_tokens is not None and today['total_tokens'] >= daily_tokens:
+        raise BudgetExceeded(
+            f"Crew '{crew.name}' has used {today['total_tokens']} tokens today (budget {daily_tokens})"
+        )
@@ -0,0 +1,63 @@
+"""
+Helpers shared by crew execution, the views and the API.
+"""
+
+
+def format_task_context(task):
+    """
+    Return the prompt of ``task``: its description, context entries and the
+    outputs of its completed dependencies, fitted to the context budget.
+
+    See :func:`crew.context.assemble_context`.
+    """
+    from .context import assemble_context
+
+    return assemble_context(task).text
+
+
+def resolve_dependencies(tasks):
+    """
+    Order tasks so that every task comes after the tasks it depends on.
+
+    Only dependencies between the given tasks are considered; tasks keep
+    their relative input order where the graph allows it.
+
+    Args:
+        tasks: An iterable of Task instances.
+
+    Returns:
+        list: The tasks in a valid execution order.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle.
+    """
+    from .models import Task
+
+    tasks = list(tasks)
+    by_id = {task.pk: task for task in tasks}
+    edges = Task.depends_on.through.objects.filter(
+        from_task_id__in=by_id, to_task_id__in=by_id
+    ).values_list('from_task_id', 'to_task_id')
+
+    waiting_on = {pk: set() for pk in by_id}
+    dependents = {pk: [] for pk in by_id}
+    for task_id, dependency_id in edges:
+        waiting_on[task_id].add(dependency_id)
+        dependents[dependency_id].append(task_id)
+
+    position = {task.pk: index for index, task in enumerate(tasks)}
+    ready = [task.pk for task in tasks if not waiting_on[task.pk]]
+    order = []
+    while ready:
+        ready.sort(key=position.get)
+        pk = ready.pop(0)
+        order.append(by_id[pk])
+        for dependent in dependents[pk]:
+            waiting_on[dependent].discard(pk)
+            if not waiting_on[dependent]:
+                ready.append(dependent)
+
+    if len(order) != len(tasks):
+        cyclic = sorted(by_id[pk].name for pk, deps in waiting_on.items() if deps)
+        raise ValueError(f"Circular task dependencies between: {', '.join(cyclic)}")
+    return order
@@ -0,0 +1,200 @@
+"""
+Versioned task outputs.
+
+Every completed run of a task records its ``output_data`` as a
+:class:`~crew.models.TaskOutputVersion`, numbered from 1. Outputs are
+serialized as indented JSON with sorted keys and stored zlib-compressed.
+
+Storage uses reverse deltas, as RCS does: the latest version is stored in
+full, and when a newer one arrives the previous latest is rewritten as a
+delta that rebuilds it from its successor. Reading the latest version is a
+single row; an older one is rebuilt by walking back from the nearest full
+version above it. Every ``SNAPSHOT_INTERVAL``-th version stays full to
+bound that walk, as does any version whose delta would not be smaller.
+
+Deltas work on lines of the JSON text, where escaped newlines inside
+strings also end a line, so a long LLM result that changed in one
+paragraph costs about that paragraph. A delta is a JSON list of
+``[start, end]`` ranges of the newer version's lines to copy and strings
+to insert.
+"""
+import difflib
+import hashlib
+import json
+import re
+import zlib
+
+from django.db import transaction
+
+from .models import Task, TaskOutputVersion
+
+SNAPSHOT_INTERVAL = 20
+
+_LINES = re.compile(r'.*?(?:\\n|\n)|.+', re.S)
+
+
+def serialize(output_data):
+    return json.dumps(output_data, sort_keys=True, indent=1, ensure_ascii=False, default=str)
+
+
+def checksum(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def compress(text):
+    return zlib.compress(text.encode('utf-8'))
+
+
+def decompress(data):
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+def split_lines(text):
+    """Split serialized output into lines, keeping the line ends so joining restores it."""
+    return _LINES.findall(text)
+
+
+def make_delta(base, target):
+    """Return a delta that rebuilds the text ``target`` from the text ``base``."""
+    base_lines = split_lines(base)
+    target_lines = split_lines(target)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(''.join(target_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(base, delta):
+    """Rebuild a text from ``base`` and a delta made by :func:`make_delta`."""
+    base_lines = split_lines(base)
+    return ''.join(
+        ''.join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in delta
+    )
+
+
+def record_version(task, output_data, execution=None):
+    """
+    Record ``output_data`` as the newest output version of ``task``.
+
+    An output equal to the latest version is not recorded again.
+
+    Args:
+        task: The Task whose output this is.
+        output_data: The output to store.
+        execution: The Execution that produced it, if any.
+
+    Returns:
+        TaskOutputVersion: The new version, or the latest one if unchanged.
+    """
+    text = serialize(output_data)
+    digest = checksum(text)
+    with transaction.atomic():
+        # Serializes concurrent writers of the same task's versions
+        Task.objects.select_for_update().filter(pk=task.pk).values_list('pk').first()
+        previous = task.output_versions.order_by('-number').first()
+        if previous is not None and previous.checksum == digest:
+            return previous
+
+        number = previous.number + 1 if previous else 1
+        version = TaskOutputVersion.objects.create(
+            task=task,
+            execution=execution,
+            number=number,
+            data=compress(text),
+            size=len(text.encode('utf-8')),
+            checksum=digest,
+        )
+        if previous is not None and not previous.is_delta and previous.number % SNAPSHOT_INTERVAL:
+            _to_delta(previous, text)
+    return version
+
+
+def _to_delta(version, successor):
+    """Rewrite a full version as a delta from ``successor`` if that is smaller."""
+    delta = compress(json.dumps(make_delta(successor, decompress(version.data)), separators=(',', ':')))
+    if len(delta) < len(version.data):
+        version.data = delta
+        version.is_delta = True
+        version.save(update_fields=['data', 'is_delta'])
+
+
+def get_text(task, number):
+    """
+    Return the serialized output of version ``number`` of ``task``.
+
+    Raises:
+        TaskOutputVersion.DoesNotExist: If the task has no such version.
+    """
+    full = task.output_versions.filter(number__gte=number, is_delta=False).order_by('number').first()
+    if full is None:
+        raise TaskOutputVersion.DoesNotExist(f"Task {task.pk} has no output version {number}")
+    deltas = task.output_versions.filter(number__gte=number, number__lt=full.number).order_by('-number')
+    text = decompress(full.data)
+    current = full.number
+    for version in deltas.only('number', 'data', 'checksum'):
+        if version.number != current - 1:
+            break
+        text = apply_delta(text, json.loads(decompress(version.data)))
+        current = version.number
+    if current != number:
+        raise TaskOutputVersion.DoesNotExist(f"Task {task.pk} has no output version {number}")
+    return text
+
+
+def get_version(task, number=None):
+    """
+    Return the output of version ``number`` of ``task``, or of its latest version.
+
+    Raises:
+        TaskOutputVersion.DoesNotExist: If the task has no such version.
+    """
+    if number is None:
+        latest = task.output_versions.order_by('-number').first()
+        if latest is None:
+            raise TaskOutputVersion.DoesNotExist(f"Task {task.pk} has no output versions")
+        number = latest.number
+    return json.loads(get_text(task, number))
+
+
+def diff_text(output_data):
+    """The text diffs compare: the result when it is a string, otherwise the output as JSON."""
+    result = output_data.get('result') if isinstance(output_data, dict) else None
+    if isinstance(result, str):
+        return result
+    return json.dumps(output_data, sort_keys=True, indent=2, ensure_ascii=False, default=str)
+
+
+def diff_versions(task, old, new, context=3):
+    """
+    Return a unified diff between two output versions of ``task``.
+
+    Raises:
+        TaskOutputVersion.DoesNotExist: If either version does not exist.
+    """
+    return ''.join(difflib.unified_diff(
+        diff_text(get_version(task, old)).splitlines(keepends=True),
+        diff_text(get_version(task, new)).splitlines(keepends=True),
+        fromfile=f"{task.name} v{old}",
+        tofile=f"{task.name} v{new}",
+        n=context,
+    ))
+
+
+def rollback(task, number):
+    """
+    Restore the output of version ``number`` of ``task``.
+
+    The restored output is recorded as a new version, so the rollback
+    itself can be undone.
+
+    Returns:
+        TaskOutputVersion: The new version.
+    """
+    task.output_data = get_version(task, number)
+    task.save(update_fields=['output_data', 'updated_at'])
+    return record_version(task, task.output_data)
@@ -4,9 +4,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.utils import timezone
 import json
 from django.core.exceptions import ValidationError
-from .models import CrewInstance, Agent, Task
+from .models import CrewInstance, Agent, Task, Execution
+from .filters import CrewInstanceFilter, AgentFilter, TaskFilter
+from .scheduler import ExecutionScheduler
 
 
 class JSONFormMixin:
@@ -61,16 +64,42 @@ class JSONFormMixin:
         return super().form_valid(form)
 
 
-class CrewListView(LoginRequiredMixin, ListView):
+class FilteredListMixin:
+    """
+    Paginate a list view and filter it with the API's filterset, so the page
+    accepts the same query parameters (``search``, ``status``, ...) as the API.
+    """
+    paginate_by = 25
+    filterset_class = None
+
+    def filter_queryset(self, queryset):
+        self.filterset = self.filterset_class(self.request.GET, queryset=queryset, request=self.request)
+        return self.filterset.qs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        context['filters'] = self.request.GET
+        context['query_string'] = params.urlencode()
+        return context
+
+
+class CrewListView(LoginRequiredMixin, FilteredListMixin, ListView):
     model = CrewInstance
     template_name = 'crew/crew_list.html'
     context_object_name = 'crew_list'
+    filterset_class = CrewInstanceFilter
 
     def get_queryset(self):
-        return CrewInstance.objects.filter(owner=self.request.user)
+        queryset = CrewInstance.objects.filter(owner=self.request.user).only(
+            'name', 'description', 'status', 'created_at'
+        )
+        return self.filter_queryset(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['status_choices'] = CrewInstance.STATUS_CHOICES
         context['view_type'] = 'crew'
         context['title'] = 'Crews'
         context['list_display'] = ['name', 'is_flow', 'created_at']
@@ -97,9 +126,9 @@ class CrewDetailView(LoginRequiredMixin, DetailView):
         context['delete_url'] = reverse_lazy('crew:crew_delete', kwargs={'pk': self.object.pk})
         context['list_url'] = reverse_lazy('crew:crew_list')
         
-        # Add related objects
-        context['agents'] = self.object.agents.all()
-        context['tasks'] = self.object.tasks.all()
+        # Add related objects (resolved through the template for template-backed crews)
+        context['agents'] = self.object.get_agents()
+        context['tasks'] = self.object.get_tasks()
         context['sub_crews'] = self.object.sub_crews.all() if self.object.is_flow else None
         
         return context
@@ -108,7 +137,7 @@ class CrewDetailView(LoginRequiredMixin, DetailView):
 class CrewCreateView(LoginRequiredMixin, JSONFormMixin, CreateView):
     model = CrewInstance
     template_name = 'crew/crew_form.html'
-    fields = ['name', 'description', 'config', 'is_flow', 'parent_crew']
+    fields = ['name', 'description', 'config', 'is_flow', 'is_template', 'parent_crew']
     success_url = reverse_lazy('crew:crew_list')
 
     def get_context_data(self, **kwargs):
@@ -128,7 +157,7 @@ class CrewCreateView(LoginRequiredMixin, JSONFormMixin, CreateView):
 class CrewUpdateView(LoginRequiredMixin, JSONFormMixin, UpdateView):
     model = CrewInstance
     template_name = 'crew/crew_form.html'
-    fields = ['name', 'description', 'config', 'is_flow', 'parent_crew']
+    fields = ['name', 'description', 'config', 'is_flow', 'is_template', 'parent_crew']
 
     def get_queryset(self):
         return CrewInstance.objects.filter(owner=self.request.user)
@@ -169,17 +198,22 @@ class CrewDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-class AgentListView(LoginRequiredMixin, ListView):
+class AgentListView(LoginRequiredMixin, FilteredListMixin, ListView):
     model = Agent
     template_name = 'crew/agent_list.html'
     context_object_name = 'agent_list'
+    filterset_class = AgentFilter
 
     def get_queryset(self):
         # Get agents associated with the user's crews
-        return Agent.objects.filter(crew__owner=self.request.user)
+        queryset = Agent.objects.filter(crew__owner=self.request.user).select_related('crew').only(
+            'name', 'role', 'custom_role', 'crew', 'crew__name'
+        )
+        return self.filter_queryset(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['role_choices'] = Agent.ROLE_CHOICES
         context['view_type'] = 'agent'
         context['title'] = 'Agents'
         context['list_display'] = ['name', 'crew', 'role', 'created_at']
@@ -222,7 +256,9 @@ class AgentCreateView(LoginRequiredMixin, JSONFormMixin, CreateView):
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         # Limit crew choices to those owned by the user
-        form.fields['crew'].queryset = CrewInstance.objects.filter(owner=self.request.user)
+        form.fields['crew'].queryset = (
+            CrewInstance.objects.filter(owner=self.request.user).light().select_related('parent_crew')
+        )
         return form
 
     def form_valid(self, form):
@@ -242,7 +278,9 @@ class AgentUpdateView(LoginRequiredMixin, JSONFormMixin, UpdateView):
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         # Limit crew choices to those owned by the user
-        form.fields['crew'].queryset = CrewInstance.objects.filter(owner=self.request.user)
+        form.fields['crew'].queryset = (
+            CrewInstance.objects.filter(owner=self.request.user).light().select_related('parent_crew')
+        )
         return form
 
     def get_success_url(self):
@@ -266,16 +304,21 @@ class AgentDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-class TaskListView(LoginRequiredMixin, ListView):
+class TaskListView(LoginRequiredMixin, FilteredListMixin, ListView):
     model = Task
     template_name = 'crew/task_list.html'
     context_object_name = 'task_list'
+    filterset_class = TaskFilter
 
     def get_queryset(self):
-        return Task.objects.filter(crew__owner=self.request.user)
+        queryset = Task.objects.filter(crew__owner=self.request.user).select_related('crew', 'agent').only(
+            'name', 'status', 'created_at', 'crew', 'crew__name', 'agent', 'agent__name'
+        )
+        return self.filter_queryset(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['status_choices'] = Task.STATUS_CHOICES
         context['view_type'] = 'task'
         context['title'] = 'Tasks'
         context['list_display'] = ['name', 'crew', 'agent', 'status', 'created_at']
@@ -326,14 +369,18 @@ class TaskCreateView(LoginRequiredMixin, JSONFormMixin, CreateView):
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         # Limit crew choices to those owned by the current user
-        form.fields['crew'].queryset = CrewInstance.objects.filter(owner=self.request.user)
+        form.fields['crew'].queryset = (
+            CrewInstance.objects.filter(owner=self.request.user).light().select_related('parent_crew')
+        )
         
         # Initially disable agent field - will be populated via AJAX when crew is selected
         form.fields['agent'].queryset = Agent.objects.none()
         
         # If crew is already selected, populate agent choices
         if form.instance.crew_id:
-            form.fields['agent'].queryset = Agent.objects.filter(crew_id=form.instance.crew_id)
+            form.fields['agent'].queryset = (
+                Agent.objects.filter(crew_id=form.instance.crew_id).light().select_related('crew')
+            )
             
         return form
 
@@ -373,11 +420,15 @@ class TaskUpdateView(LoginRequiredMixin, JSONFormMixin, UpdateView):
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         # Limit crew choices to those owned by the current user
-        form.fields['crew'].queryset = CrewInstance.objects.filter(owner=self.request.user)
+        form.fields['crew'].queryset = (
+            CrewInstance.objects.filter(owner=self.request.user).light().select_related('parent_crew')
+        )
         
         # Limit agent choices to those in the selected crew
         if form.instance.crew_id:
-            form.fields['agent'].queryset = Agent.objects.filter(crew_id=form.instance.crew_id)
+            form.fields['agent'].queryset = (
+                Agent.objects.filter(crew_id=form.instance.crew_id).light().select_related('crew')
+            )
         else:
             form.fields['agent'].queryset = Agent.objects.none()
             
@@ -385,7 +436,7 @@ class TaskUpdateView(LoginRequiredMixin, JSONFormMixin, UpdateView):
         if form.instance.pk:
             form.fields['depends_on'].queryset = Task.objects.filter(
                 crew__owner=self.request.user
-            ).exclude(pk=form.instance.pk)
+            ).exclude(pk=form.instance.pk).light().select_related('agent')
         
         return form
 
@@ -467,7 +518,8 @@ class ExecuteTaskView(LoginRequiredMixin, DetailView):
     context_object_name = 'task'
     
     def get_queryset(self):
-        return Task.objects.filter(crew__owner=self.request.user)
+        # dependencies_complete is annotated onto the task in the same query
+        return Task.objects.filter(crew__owner=self.request.user).with_readiness()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -477,7 +529,8 @@ class ExecuteTaskView(LoginRequiredMixin, DetailView):
         
         # Check if dependencies are complete
         context['dependencies_complete'] = self.object.check_dependencies_complete()
-        context['dependencies'] = self.object.depends_on.all()
+        if not context['dependencies_complete']:
+            context['dependencies'] = self.object.depends_on.exclude(status='completed').light()
         
         return context
     
@@ -491,21 +544,23 @@ class ExecuteTaskView(LoginRequiredMixin, DetailView):
             return redirect('crew:execute_task', pk=self.object.pk)
         
         try:
-            # Update task status
-            self.object.status = 'in_progress'
-            self.object.save()
-            
-            # Execute the task (will be implemented in CrewAI integration)
-            self.object.execute()
-            
-            messages.success(request, f"Task '{self.object.name}' executed successfully.")
+            # Single-task runs go through the interactive lane unless asked otherwise
+            execution = ExecutionScheduler().submit_and_run(
+                self.object.crew,
+                task=self.object,
+                priority=request.POST.get('priority'),
+            )
         except Exception as e:
-            # Update task status and error message
-            self.object.status = 'failed'
-            self.object.error_message = str(e)
-            self.object.save()
-            
             messages.error(request, f"Error executing task: {str(e)}")
+            return redirect('crew:task_detail', pk=self.object.pk)
+
+        self.object.refresh_from_db()
+        if execution.status == 'queued':
+            messages.info(request, f"Task '{self.object.name}' is queued and will start when capacity is available.")
+        elif self.object.status == 'completed':
+            messages.success(request, f"Task '{self.object.name}' executed successfully.")
+        else:
+            messages.error(request, f"Error executing task: {self.object.error_message}")
         
         return redirect('crew:task_detail', pk=self.object.pk)
 
@@ -546,7 +601,7 @@ class PipelineView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         # Return only crews owned by the current user
-        return CrewInstance.objects.filter(owner=self.request.user)
+        return CrewInstance.objects.filter(owner=self.request.user).light()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -562,13 +617,22 @@ class ExecuteCrewView(LoginRequiredMixin, DetailView):
     template_name = 'crew/execute_crew.html'
     context_object_name = 'crew'
     
+    def get_queryset(self):
+        return CrewInstance.objects.filter(owner=self.request.user)
+
     def post(self, request, *args, **kwargs):
-        # Handle the POST request to execute the crew
+        # Queue the run; the scheduler starts it right away if there is capacity
         crew = self.get_object()
-        # Add logic to start crew execution
-        # This would integrate with your CrewAI logic
-        
-        messages.success(request, f"Crew '{crew.name}' execution started.")
+        try:
+            execution = ExecutionScheduler().submit_and_run(crew, priority=request.POST.get('priority'))
+        except Exception as e:
+            messages.error(request, f"Error executing crew: {str(e)}")
+            return redirect('crew:pipeline_view')
+
+        if execution.status == 'queued':
+            messages.info(request, f"Crew '{crew.name}' is queued and will start when capacity is available.")
+        else:
+            messages.success(request, f"Crew '{crew.name}' execution started.")
         return redirect('crew:pipeline_view')
 
 
@@ -579,16 +643,61 @@ class StopCrewExecutionView(LoginRequiredMixin, DetailView):
     model = CrewInstance
     template_name = 'crew/stop_execution.html'
     context_object_name = 'crew'
+
+    def get_queryset(self):
+        return CrewInstance.objects.filter(owner=self.request.user)
     
     def post(self, request, *args, **kwargs):
         # Handle the POST request to stop the crew execution
         crew = self.get_object()
-        # Add logic to stop crew execution
-        
-        messages.success(request, f"Crew '{crew.name}' execution stopped.")
+        # Queued runs are cancelled; running ones finish their current task
+        cancelled = crew.executions.filter(status='queued').update(status='stopped', ended_at=timezone.now())
+        if cancelled:
+            messages.success(request, f"Cancelled {cancelled} queued execution(s) of crew '{crew.name}'.")
+        else:
+            messages.success(request, f"Crew '{crew.name}' execution stopped.")
         return redirect('crew:pipeline_view')
 
 
+class ResumeExecutionView(LoginRequiredMixin, DetailView):
+    """
+    Resume a failed or stopped execution, re-running only the tasks
+    that did not complete.
+    """
+    model = Execution
+    context_object_name = 'execution'
+
+    def get_queryset(self):
+        return Execution.objects.filter(crew__owner=self.request.user).select_related('crew')
+
+    def get(self, request, *args, **kwargs):
+        return redirect('crew:execution_history', pk=self.get_object().crew_id)
+
+    def post(self, request, *args, **kwargs):
+        execution = self.get_object()
+        if not execution.can_resume:
+            messages.error(request, f"Execution {execution.id} cannot be resumed.")
+            return redirect('crew:execution_history', pk=execution.crew_id)
+
+        try:
+            # Resumed runs are subject to the same limits as new ones
+            resumed = ExecutionScheduler().submit_and_run(
+                execution.crew, resume=True, resumed_from=execution, priority=request.POST.get('priority')
+            )
+            if resumed.status == 'queued':
+                messages.info(
+                    request, f"Crew '{execution.crew.name}' is queued and will resume when capacity is available."
+                )
+            elif resumed.status == 'completed':
+                messages.success(request, f"Crew '{execution.crew.name}' resumed and completed.")
+            else:
+                messages.warning(request, f"Crew '{execution.crew.name}' resumed but some tasks failed.")
+        except Exception as e:
+            messages.error(request, f"Error resuming execution: {str(e)}")
+
+        return redirect('crew:execution_history', pk=execution.crew_id)
+
+
 class ExecutionHistoryView(LoginRequiredMixin, DetailView):
     """
     View for displaying execution history of a specific crew.
@@ -596,9 +705,14 @@ class ExecutionHistoryView(LoginRequiredMixin, DetailView):
     model = CrewInstance
     template_name = 'crew/execution_history.html'
     context_object_name = 'crew'
+
+    def get_queryset(self):
+        # The history shows execution profiles, which hold task names and prompt details
+        return CrewInstance.objects.filter(owner=self.request.user)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        crew = self.get_object()
-        context['executions'] = crew.executions.all().order_by('-started_at')
+        crew = self.object
+        # The timeline needs the profile; can_resume checks for a batch
+        context['executions'] = crew.executions.light('profile').select_related('batch').order_by('-started_at')
         return context
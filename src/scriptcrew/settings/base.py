@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -114,6 +116,134 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Django REST framework
+REST_FRAMEWORK = {
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+}
+
+# LLM rate limits, keyed by 'provider/model', 'model', 'provider' or 'default'.
+# Each entry may set rpm, tpm, burst, max_concurrency and max_wait (seconds).
+CREW_RATE_LIMITS = {
+    'default': {'max_concurrency': int(os.getenv('CREW_LLM_MAX_CONCURRENCY', 8))},
+}
+# 'local' limits each process; 'cache' shares limits across workers via the cache.
+CREW_RATE_LIMIT_BACKEND = os.getenv('CREW_RATE_LIMIT_BACKEND', 'local')
+
+# Default retry policy for task execution; crews override it with config['retry']
+# and tasks with their retry_policy field.
+CREW_RETRY_POLICY = {
+    'max_attempts': int(os.getenv('CREW_TASK_MAX_ATTEMPTS', 3)),
+    'base_delay': 2.0,
+    'max_delay': 60.0,
+    'jitter': 0.5,
+}
+
+# LLM prices in USD per million tokens, keyed by model name, for usage accounting.
+CREW_MODEL_PRICING = {
+    'gpt-4o': {'prompt': 2.50, 'completion': 10.00},
+    'gpt-4o-mini': {'prompt': 0.15, 'completion': 0.60},
+    'gpt-4': {'prompt': 30.00, 'completion': 60.00},
+}
+
+# Execution scheduling: global and per-owner concurrency, slots reserved for
+# the interactive lane, the fair-share window in seconds, owner weights and
+# daily token budgets keyed by username. With inline set, admitted runs start
+# in the request; queued ones wait for the run_executions worker.
+CREW_SCHEDULER = {
+    'inline': os.getenv('CREW_SCHEDULER_INLINE', 'True') == 'True',
+    'max_concurrent': int(os.getenv('CREW_MAX_CONCURRENT_EXECUTIONS', 4)),
+    'max_concurrent_per_owner': int(os.getenv('CREW_MAX_CONCURRENT_EXECUTIONS_PER_OWNER', 2)),
+    'interactive_reserved': int(os.getenv('CREW_INTERACTIVE_RESERVED', 1)),
+    'interactive_wait': 30,
+    'preempt_batch': True,
+    'preempt_wait': 60,
+    'fair_share_window': 3600,
+    'owner_weights': {},
+    'owner_daily_tokens': None,
+    'owner_token_budgets': {},
+}
+
+# Prompts built from dependency outputs: the token budget the outputs share
+# (agents with max_context_tokens in llm_config get their own), how outputs
+# over budget are trimmed (quota, summary or recent), and the cache and
+# lifetime of assembled prompts.
+CREW_CONTEXT = {
+    'max_tokens': int(os.getenv('CREW_CONTEXT_MAX_TOKENS', 8000)),
+    'strategy': os.getenv('CREW_CONTEXT_STRATEGY', 'quota'),
+    'cache': 'default',
+    'cache_timeout': 3600,
+}
+
+# Streamed LLM output is written to TaskOutputChunk rows when this many
+# characters are buffered or this many seconds have passed.
+CREW_STREAMING = {
+    'enabled': os.getenv('CREW_STREAMING', 'True') == 'True',
+    'flush_interval': float(os.getenv('CREW_STREAMING_FLUSH_INTERVAL', 1.0)),
+    'flush_size': int(os.getenv('CREW_STREAMING_FLUSH_SIZE', 2048)),
+}
+
+# Hedged LLM requests: a call running longer than the model's recent
+# percentile latency gets a duplicate (to fallback_model if set) and the
+# first answer wins. Agents opt in with llm_config['hedge']; enabled hedges
+# every agent. max_ratio and max_tokens cap the extra spend.
+CREW_HEDGING = {
+    'enabled': os.getenv('CREW_HEDGING', 'False') == 'True',
+    'percentile': 95,
+    'min_samples': 20,
+    'min_delay': 2.0,
+    'max_ratio': float(os.getenv('CREW_HEDGING_MAX_RATIO', 0.1)),
+    'max_tokens': 32000,
+}
+
+# Running executions refresh a heartbeat every heartbeat_interval seconds.
+# The reap_executions command fails ('fail') or requeues ('requeue', at most
+# max_requeues times) those not heard from in stale_after seconds, e.g.
+# after gunicorn killed their worker; keep it well above heartbeat_interval.
+CREW_REAPER = {
+    'heartbeat_interval': int(os.getenv('CREW_HEARTBEAT_INTERVAL', 30)),
+    'stale_after': int(os.getenv('CREW_REAPER_STALE_AFTER', 180)),
+    'policy': os.getenv('CREW_REAPER_POLICY', 'fail'),
+    'max_requeues': int(os.getenv('CREW_REAPER_MAX_REQUEUES', 1)),
+}
+
+# Batch runs: the most input records one batch may run at once, whatever
+# concurrency the client asks for.
+CREW_BATCH = {
+    'max_concurrency': int(os.getenv('CREW_BATCH_MAX_CONCURRENCY', 8)),
+}
+
+# Document exports of crew outputs. With inline set they render in the
+# request; otherwise the render_exports worker renders them. Renders still
+# running after stale_after seconds are assumed dead and redone.
+CREW_EXPORTS = {
+    'inline': os.getenv('CREW_EXPORTS_INLINE', 'True') == 'True',
+    'stale_after': 600,
+}
+
+# Record per-phase timing spans of every execution, and optionally append
+# them as OTLP/JSON to a file an OpenTelemetry collector can read.
+CREW_PROFILING = os.getenv('CREW_PROFILING', 'True') == 'True'
+CREW_PROFILE_EXPORT_PATH = os.getenv('CREW_PROFILE_EXPORT_PATH')
+
+# Prometheus metrics at /metrics. With METRICS_DIR set, gunicorn workers
+# write snapshots there and a scrape adds them up; clear it on deploy.
+# Scrapes need METRICS_TOKEN as a bearer token, or else must connect
+# directly (not through nginx) from one of METRICS_ALLOWED_IPS.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Per-request SQL budgets; requests over budget are logged to
+# 'scriptcrew.queries' with their duplicated queries and call stacks.
+# Views can be given their own budget under 'views' by URL name.
+QUERY_BUDGET = {
+    'queries': int(os.getenv('QUERY_BUDGET_QUERIES', 50)),
+    'time': float(os.getenv('QUERY_BUDGET_TIME', 0.5)),
+    'slow_query': float(os.getenv('QUERY_SLOW_THRESHOLD', 0.1)),
+    'views': {},
+}
+
 # Email settings
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
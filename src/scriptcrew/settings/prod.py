@@ -28,4 +28,7 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
     }
-} 
\ No newline at end of file
+}
+
+# Share LLM rate limits between gunicorn workers
+CREW_RATE_LIMIT_BACKEND = os.getenv('CREW_RATE_LIMIT_BACKEND', 'cache')